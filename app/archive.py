@@ -0,0 +1,179 @@
+"""Multi-issue archive with incremental re-rendering.
+
+    python app/archive.py snapshot [--week 2026-W42]   # freeze the current selection into data/issues/
+    python app/archive.py build [--force]              # render the archive into site/dist
+
+Each published week is snapshotted to data/issues/<ISO week>.json (sections and
+ranks already assigned), so past issues no longer disappear when selected.json is
+regenerated. `build` renders from those snapshots:
+
+    issues/<week>/index.html        one page per issue
+    sections/<id>/index.html        every item of a section, newest issue first
+    sources/<slug>/index.html       every item from a source, newest issue first
+    archive/index.html              latest issues plus the section and source indexes
+    archive/page/<n>/index.html     fixed pages of ARCHIVE_PAGE_SIZE issues, oldest page first
+
+Archive pages are numbered from the oldest issue, so adding an issue only changes
+the newest page instead of shifting every page. Each page's key is the hash of its
+template set, site/static, the config (sections.yaml, site URL, page size) and its
+own render context; site/dist/.build-manifest.json records the keys, and only pages whose key
+changed (or whose file is missing) are re-rendered. A weekly publish touches the new
+issue, the sections and sources it mentions, and the newest archive pages.
+"""
+import os, re, sys, json, time, hashlib, argparse
+from datetime import datetime
+from pathlib import Path
+
+if __package__ in (None, ""):  # allow `python app/archive.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.build_issue import DATA_PATH, OUT_DIR, SECS, SITE_URL, group_items, load_issue_items, page_context
+from app.render import TEMPLATE_DIR, get_env, prepare, render
+from app.assets import MINIFY, STATIC_DIR, finalize
+from app.candidate_store import iso_week
+
+ISSUES_DIR = Path(os.getenv("ISSUES_DIR", "data/issues"))
+PAGE_SIZE = int(os.getenv("ARCHIVE_PAGE_SIZE", "20"))   # issues per archive page
+MANIFEST = OUT_DIR / ".build-manifest.json"
+
+def slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", (text or "").lower()).strip("-") or "unknown"
+
+def snapshot(week=None, data_path=DATA_PATH) -> Path:
+    """Write the current selection (plus originals) as this week's issue; returns the snapshot path."""
+    week = week or iso_week(time.time())
+    items = [it for g in group_items(load_issue_items(data_path)) for it in g["items_list"]]
+    doc = {"week": week, "generated_at": datetime.now().isoformat(timespec="seconds"), "items": items}
+    ISSUES_DIR.mkdir(parents=True, exist_ok=True)
+    path = ISSUES_DIR / f"{week}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(doc, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
+    print(f"Snapshot: {len(items)} items → {path}")
+    return path
+
+def load_issues() -> list:
+    """All snapshots, oldest first, with display fields prepared once for every page they appear on."""
+    issues = [json.loads(p.read_text(encoding="utf-8")) for p in sorted(ISSUES_DIR.glob("*.json"))]
+    for issue in issues:
+        for it in issue["items"]: prepare(it)
+    return issues
+
+def sha(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def tree_hash(root: Path) -> str:
+    return sha(b"".join(str(p.relative_to(root)).encode("utf-8") + b"\0" + p.read_bytes()
+                        for p in sorted(root.rglob("*")) if p.is_file()))
+
+def config_hash() -> str:
+    return sha(json.dumps([SECS, SITE_URL, PAGE_SIZE, MINIFY], sort_keys=True).encode("utf-8"))
+
+# -------- pages: (path under site/dist, template, context)
+def issue_group(issue, items):
+    """One issue as a group on a section or source page."""
+    return {"id": issue["week"], "index": issue["week"].split("-")[-1], "title": f"Issue {issue['week']}",
+            "desc": issue["generated_at"][:10], "items_list": items}
+
+def pages(issues: list):
+    meta = {s["id"]: s for s in SECS["sections"]}
+    newest_first = issues[::-1]
+
+    for issue in issues:
+        yield f"issues/{issue['week']}/index.html", "issue.html", page_context(
+            group_items([dict(it) for it in issue["items"]]), datetime.fromisoformat(issue["generated_at"]),
+            title=f"PipelineOps Weekly | Issue {issue['week']}", page_url=f"{SITE_URL}issues/{issue['week']}/",
+            archive_href="../../archive/", root="../../")
+
+    def listing(path, title, select):
+        groups, seen = [], set()
+        for i in newest_first:  # an item carried over several issues (originals) is listed under the newest
+            items = [dict(it) for it in i["items"] if select(it) and (it.get("url") or it["title"]) not in seen]
+            seen.update(it.get("url") or it["title"] for it in items)
+            if items: groups.append(issue_group(i, items))
+        newest = next(i for i in newest_first if any(select(it) for it in i["items"]))
+        return path, "issue.html", page_context(
+            groups, datetime.fromisoformat(newest["generated_at"]), title=f"PipelineOps Weekly | {title}",
+            page_url=f"{SITE_URL}{path.rsplit('/', 1)[0]}/", archive_href="../../archive/", root="../../")
+
+    section_counts, source_counts, source_names = {}, {}, {}
+    for issue in issues:
+        for it in issue["items"]:
+            section_counts[it.get("section_id")] = section_counts.get(it.get("section_id"), 0) + 1
+            s = slug(it.get("source"))
+            source_counts[s] = source_counts.get(s, 0) + 1
+            source_names.setdefault(s, it.get("source") or "Unknown")
+    for sid in SECS["order"]:
+        if sid in section_counts:
+            yield listing(f"sections/{sid}/index.html", meta[sid]["title"], lambda it, sid=sid: it.get("section_id") == sid)
+    for s in sorted(source_counts):
+        yield listing(f"sources/{s}/index.html", source_names[s], lambda it, s=s: slug(it.get("source")) == s)
+
+    cards = [{
+        "week": i["week"], "date": i["generated_at"][:10], "generated_at": i["generated_at"], "count": len(i["items"]),
+        "headline": i["items"][0]["title"] if i["items"] else f"Issue {i['week']}",
+        "sections": [meta[sid]["title"] for sid in SECS["order"] if any(it.get("section_id") == sid for it in i["items"])],
+    } for i in issues]
+    buckets = [cards[k:k + PAGE_SIZE] for k in range(0, len(cards), PAGE_SIZE)] or [[]]
+    nav = [{"no": n, "href": f"archive/page/{n}/"} for n in range(len(buckets), 0, -1)]
+    index_links = [
+        {"id": "by-section", "index": "§", "title": "By section", "links": [
+            {"title": meta[sid]["title"], "href": f"sections/{sid}/", "count": section_counts[sid]}
+            for sid in SECS["order"] if sid in section_counts]},
+        {"id": "by-source", "index": "@", "title": "By source", "links": [
+            {"title": source_names[s], "href": f"sources/{s}/", "count": source_counts[s]} for s in sorted(source_counts)]},
+    ]
+    for n, bucket in enumerate(buckets, 1):
+        targets = [(f"archive/page/{n}/index.html", "../../../", None)]
+        if n == len(buckets): targets.append(("archive/index.html", "../", index_links))
+        for path, root, links in targets:
+            yield path, "archive.html", page_context(
+                [], datetime.fromisoformat(bucket[-1]["generated_at"]) if bucket else datetime(1970, 1, 1),
+                title="PipelineOps Weekly | Archive", page_url=f"{SITE_URL}{path.rsplit('/', 1)[0]}/",
+                issues=bucket[::-1], pages=nav, page_no=n, root=root, index_links=links,
+                page_desc=f"Issues {bucket[0]['week']} to {bucket[-1]['week']}" if bucket else "No issues yet",
+                archive_href=f"{root}archive/")
+
+# -------- incremental build
+def build(force=False) -> dict:
+    t0 = time.perf_counter()
+    issues = load_issues()
+    try: manifest = json.loads(MANIFEST.read_text(encoding="utf-8"))
+    except Exception: manifest = {}
+    base = sha((tree_hash(Path(TEMPLATE_DIR)) + tree_hash(STATIC_DIR) + config_hash()).encode("ascii"))
+    env = get_env()
+    old, new = manifest.get("pages", {}), {}
+    stats = {"rendered": 0, "unchanged": 0, "removed": 0}
+
+    for path, template, ctx in pages(issues):
+        key = sha((base + json.dumps([template, ctx], sort_keys=True, default=str)).encode("utf-8"))
+        new[path] = key
+        out = OUT_DIR / path
+        if not force and old.get(path) == key and out.exists():
+            stats["unchanged"] += 1; continue
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(render(template, env, **ctx), encoding="utf-8")
+        stats["rendered"] += 1
+    for path in set(old) - set(new):  # e.g. a source that no snapshot mentions any more
+        (OUT_DIR / path).unlink(missing_ok=True)
+        stats["removed"] += 1
+
+    MANIFEST.parent.mkdir(parents=True, exist_ok=True)
+    MANIFEST.write_text(json.dumps({"pages": new}, indent=1, sort_keys=True), encoding="utf-8")
+    finalize(OUT_DIR)
+    print(f"Archive: {len(issues)} issues, {len(new)} pages: {stats['rendered']} rendered, "
+          f"{stats['unchanged']} unchanged, {stats['removed']} removed in {time.perf_counter() - t0:.2f}s")
+    return stats
+
+def main():
+    ap = argparse.ArgumentParser(description="Snapshot issues and render the archive incrementally.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("snapshot", help="freeze the current selection as this week's issue")
+    sp.add_argument("--week", help="ISO week to file it under, e.g. 2026-W42 (default: this week)")
+    bp = sub.add_parser("build", help="render pages whose inputs changed")
+    bp.add_argument("--force", action="store_true", help="re-render every page")
+    args = ap.parse_args()
+    if args.cmd == "snapshot": snapshot(args.week)
+    else: build(args.force)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Static assets for the rendered site: fingerprinting, minification, pre-compression.
+
+    python app/assets.py report    # byte sizes of every page in site/dist (raw, gzip, brotli, first load)
+    python app/assets.py fonts     # download and subset the web fonts into site/static/fonts/
+
+Styles and scripts live in site/static/ instead of inline in base.html:
+
+    css/critical.css   above-the-fold rules, minified and inlined into every page
+    css/site.css       the rest, loaded without blocking first paint
+    js/site.js         theme, skim, filters and search
+    ji-wing.svg        favicon
+    fonts/             subsetted woff2 files plus fonts.css (written by `fonts`)
+
+Templates reference them through asset('css/site.css'), which returns the
+content-hashed name under site/dist/assets/ (site.3f2a9c01d4.css), so browsers can
+cache them for a year (_headers) and a change to a file changes every page that
+links it. The @font-face rules are inlined with the critical CSS and the font files
+are preloaded, replacing the render-blocking Google Fonts stylesheet; without
+fonts/ the pages fall back to the system fonts in the font stacks.
+
+render() minifies each page as it is written. finalize(), run at the end of
+build_issue.py and archive.py, writes the assets and _headers and pre-compresses
+every text file to .gz (and .br when the brotli module is installed) next to the
+original, skipping files whose compressed copies are already newer.
+"""
+import io, os, re, sys, gzip, hashlib, argparse
+from pathlib import Path
+from functools import lru_cache
+from markupsafe import Markup
+
+if __package__ in (None, ""):  # allow `python app/assets.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+try:
+    import brotli
+except ImportError:  # .gz only; pip install brotli for .br
+    brotli = None
+
+STATIC_DIR = Path("site/static")
+DIST = Path("site/dist")
+ASSET_DIR = "assets"                                   # under site/dist
+MINIFY = os.getenv("ASSET_MINIFY", "1") == "1"        # 0 = readable pages and assets while editing templates
+COMPRESS_MIN_BYTES = int(os.getenv("ASSET_COMPRESS_MIN_BYTES", "512"))
+BROTLI_QUALITY = int(os.getenv("ASSET_BROTLI_QUALITY", "11"))  # 11 is ~10% smaller than 9 but ~10x slower
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".xml", ".txt", ".svg"}
+INLINED = {"css/critical.css", "fonts/fonts.css"}      # merged into pages, not served on their own
+FONTS_URL = ("https://fonts.googleapis.com/css2?family=IBM+Plex+Mono:wght@500;600;700"
+             "&family=Inter:wght@400;500;600;700;800&display=swap")
+HEADERS = """/assets/*
+  Cache-Control: public, max-age=31536000, immutable
+/search/*
+  Cache-Control: public, max-age=300
+/*
+  Cache-Control: public, max-age=0, must-revalidate
+"""
+
+# -------- minifiers (conservative: whitespace and comments only)
+def minify_css(text: str) -> str:
+    if not MINIFY: return text
+    text = re.sub(r"/\*.*?\*/", "", text, flags=re.S)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"\s*([{};,>])\s*", r"\1", text)
+    text = re.sub(r":\s+", ":", text)
+    return text.replace(";}", "}").strip()
+
+def minify_js(text: str) -> str:
+    """Drop indentation, blank lines and `//` comments; line breaks stay, so ASI still applies."""
+    if not MINIFY: return text
+    lines = []
+    for line in text.splitlines():
+        line = re.sub(r"\s+//\s[^'\"`]*$", "", line).strip()
+        if line and not line.startswith("//"): lines.append(line)
+    return "\n".join(lines)
+
+RAW_BLOCK = re.compile(r"(<(pre|textarea|script|style)\b.*?</\2>)", re.S | re.I)
+
+def minify_html(html: str) -> str:
+    """Collapse whitespace runs that contain a newline and drop comments, outside pre/textarea/script/style."""
+    if not MINIFY: return html
+    parts = RAW_BLOCK.split(html)
+    out = []
+    for k in range(0, len(parts), 3):  # split() yields text, block, tag name, text, ...
+        text = re.sub(r"<!--(?!\[if).*?-->", "", parts[k], flags=re.S)
+        out.append(re.sub(r"[ \t]*\n\s*", "\n", text))
+        if k + 1 < len(parts): out.append(parts[k + 1])
+    return "".join(out).strip() + "\n"
+
+def minify_svg(text: str) -> str:
+    return re.sub(r">\s+<", "><", text).strip() if MINIFY else text
+
+# -------- fingerprinted assets
+def hashed_name(name: str, data: bytes) -> str:
+    p = Path(name)
+    return f"{ASSET_DIR}/{p.stem}.{hashlib.sha256(data).hexdigest()[:10]}{p.suffix}"
+
+@lru_cache(maxsize=None)
+def build_asset(name: str) -> tuple:
+    """(path under site/dist, bytes) for a file in site/static."""
+    src = STATIC_DIR / name
+    if src.suffix == ".css": data = minify_css(src.read_text(encoding="utf-8")).encode("utf-8")
+    elif src.suffix == ".js": data = minify_js(src.read_text(encoding="utf-8")).encode("utf-8")
+    elif src.suffix == ".svg": data = minify_svg(src.read_text(encoding="utf-8")).encode("utf-8")
+    else: data = src.read_bytes()
+    return hashed_name(name, data), data
+
+def asset(name: str) -> str:
+    return build_asset(name)[0]
+
+def font_files() -> list:
+    return [asset(p.relative_to(STATIC_DIR).as_posix()) for p in sorted((STATIC_DIR / "fonts").glob("*.woff2"))]
+
+@lru_cache(maxsize=None)
+def inline_css(name: str, root: str = "") -> Markup:
+    """A stylesheet for a <style> block, led by the @font-face rules with page-relative font URLs."""
+    faces = STATIC_DIR / "fonts" / "fonts.css"
+    css = faces.read_text(encoding="utf-8") if faces.exists() else ""
+    css = re.sub(r"url\(([^)]+\.woff2)\)", lambda m: f"url({root}{asset('fonts/' + m.group(1))})", css)
+    return Markup(minify_css(css + (STATIC_DIR / name).read_text(encoding="utf-8")))
+
+def write_assets(out_dir: Path = DIST) -> int:
+    written = 0
+    for src in sorted(p for p in STATIC_DIR.rglob("*") if p.is_file()):
+        name = src.relative_to(STATIC_DIR).as_posix()
+        if name in INLINED: continue
+        path, data = build_asset(name)
+        out = out_dir / path
+        if out.exists(): continue  # content-hashed: same name, same bytes
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_bytes(data)
+        written += 1
+    return written
+
+# -------- pre-compression
+def compress(out_dir: Path = DIST) -> dict:
+    stats = {"gz": 0, "br": 0}
+    for src in out_dir.rglob("*"):
+        if src.suffix not in COMPRESSIBLE or src.name.startswith(".") or not src.is_file() \
+                or src.stat().st_size < COMPRESS_MIN_BYTES: continue
+        data, mtime = None, src.stat().st_mtime
+        for ext, fn in (("gz", lambda d: gzip.compress(d, 9, mtime=0)),
+                        ("br", lambda d: brotli.compress(d, quality=BROTLI_QUALITY))):
+            out = src.with_name(src.name + "." + ext)
+            if ext == "br" and not brotli: continue
+            if out.exists() and out.stat().st_mtime >= mtime: continue
+            data = data if data is not None else src.read_bytes()
+            out.write_bytes(fn(data))
+            stats[ext] += 1
+    for stale in list(out_dir.rglob("*.gz")) + list(out_dir.rglob("*.br")):  # original was removed
+        if not stale.with_suffix("").exists(): stale.unlink()
+    return stats
+
+def finalize(out_dir: Path = DIST):
+    written = write_assets(out_dir)
+    (out_dir / "_headers").write_text(HEADERS, encoding="utf-8")
+    stats = compress(out_dir)
+    print(f"Assets: {written} written; compressed {stats['gz']} .gz"
+          + (f", {stats['br']} .br" if brotli else " (pip install brotli for .br)"))
+
+# -------- report
+ASSET_REF = re.compile(r'(?:href|src)="[^"]*?(' + ASSET_DIR + r'/[^"?#]+)"')
+
+def size(path: Path, ext: str = "") -> int:
+    p = path.with_name(path.name + ext) if ext else path
+    if p.exists(): return p.stat().st_size
+    if ext == ".gz": return len(gzip.compress(path.read_bytes(), 9, mtime=0))
+    if ext == ".br" and brotli: return len(brotli.compress(path.read_bytes(), quality=BROTLI_QUALITY))
+    return 0
+
+def report(out_dir: Path = DIST):
+    """Per page: HTML bytes raw / gzip / brotli, and the gzip bytes of a cold first load (page + linked assets)."""
+    ext = ".br" if brotli else ".gz"
+    rows, tot = [], [0, 0, 0, 0]
+    for page in sorted(out_dir.rglob("*.html")):
+        html = page.read_text(encoding="utf-8")
+        linked = {out_dir / ref for ref in ASSET_REF.findall(html)}
+        first = size(page, ext) + sum(size(a, ext) if a.suffix in COMPRESSIBLE else size(a) for a in linked if a.exists())
+        row = [size(page), size(page, ".gz"), size(page, ".br"), first]
+        rows.append((page.relative_to(out_dir).as_posix(), row))
+        tot = [a + b for a, b in zip(tot, row)]
+    width = max([len(r[0]) for r in rows] + [4])
+    print(f"{'page':<{width}} {'html':>9} {'gzip':>9} {'brotli':>9} {'first load (' + ext[1:] + ')':>18}")
+    for name, row in rows + [("total", tot)]:
+        print(f"{name:<{width}} " + " ".join(f"{v:>9,}" for v in row[:3]) + f" {row[3]:>18,}")
+    assets = sorted((out_dir / ASSET_DIR).glob("*")) if (out_dir / ASSET_DIR).exists() else []
+    for a in assets:
+        if a.suffix in (".gz", ".br"): continue
+        print(f"{a.relative_to(out_dir).as_posix():<{width}} {size(a):>9,} {size(a, '.gz'):>9,} {size(a, '.br'):>9,}")
+
+# -------- fonts
+def fetch_fonts(url: str = FONTS_URL, out_dir: Path = STATIC_DIR / "fonts"):
+    """Download the latin woff2 faces of FONTS_URL and subset them to Latin-1 plus typographic punctuation."""
+    import httpx
+    from fontTools import subset  # pip install fonttools brotli
+    ua = {"User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 Chrome/120 Safari/537.36"}
+    css = httpx.get(url, headers=ua, timeout=30, follow_redirects=True).text
+    text = "".join(map(chr, range(0x20, 0x7F))) + "".join(map(chr, range(0xA0, 0x100))) + "‐–—‘’‚“”„†•…′″‹›€→⌕◐§"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rules, files = [], {}
+    for face in re.findall(r"/\* latin \*/\s*@font-face\s*{([^}]*)}", css):
+        family = re.search(r"font-family:\s*'([^']+)'", face).group(1)
+        weight = re.search(r"font-weight:\s*([\d ]+);", face).group(1).strip()
+        src = re.search(r"url\((\S+?)\)", face).group(1)
+        if src not in files:  # variable fonts serve every weight from one file
+            files[src] = f"{re.sub(r'[^a-z0-9]+', '-', family.lower())}-{weight.replace(' ', '-')}.woff2"
+            opts = subset.Options()
+            opts.flavor = "woff2"
+            font = subset.load_font(io.BytesIO(httpx.get(src, timeout=60).content), opts)
+            sub = subset.Subsetter(opts)
+            sub.populate(text=text)
+            sub.subset(font)
+            subset.save_font(font, str(out_dir / files[src]), opts)
+            print(f"  {files[src]}: {(out_dir / files[src]).stat().st_size:,} bytes")
+        rules.append(f"@font-face{{font-family:'{family}';font-style:normal;font-weight:{weight};"
+                     f"font-display:swap;src:url({files[src]}) format('woff2')}}")
+    (out_dir / "fonts.css").write_text("\n".join(rules) + "\n", encoding="utf-8")
+    print(f"Fonts: {len(files)} files, {len(rules)} faces → {out_dir}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Site asset tools.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("report", help="byte-size report for every page in site/dist")
+    fp = sub.add_parser("fonts", help="self-host subsetted web fonts in site/static/fonts")
+    fp.add_argument("--url", default=FONTS_URL, help="Google Fonts css2 URL to mirror")
+    args = ap.parse_args()
+    if args.cmd == "report": report()
+    else: fetch_fonts(args.url)
@@ -1,13 +1,18 @@
-import os, json
+import os, sys, json
 from datetime import datetime
 from pathlib import Path
-from urllib.parse import urlparse
-from jinja2 import Environment, FileSystemLoader
 import yaml
 
+if __package__ in (None, ""):  # allow `python app/build_issue.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.sections import get_classifier
+from app.render import render
+from app.search_index import write_index
+from app.assets import finalize
+from app.feeds import write_feeds
+
 DATA_PATH = Path(os.getenv("DATA_FILE", "data/selected.json"))  # Changed from top10.json
 ORIGINALS_PATH = Path(os.getenv("ORIGINALS_FILE", "data/originals.json"))
-TEMPLATE_DIR = "site/templates"
 OUT_DIR = Path("site/dist")
 SITE_URL = os.getenv("SITE_URL", "https://vijayaramesh1.github.io/ai-ml-weekly-newsletter/")
 SECS = yaml.safe_load(Path("config/sections.yaml").read_text(encoding="utf-8"))
@@ -53,33 +58,11 @@ def normalize_originals(items):
         })
     return normalized
 
-def assign_section(item, meta):
-    if item.get("section_id") in meta:
-        return item["section_id"]
-
-    text = f"{item.get('title', '')} {item.get('text', '')} {item.get('summary_p1', '')} {item.get('summary_p2', '')}".lower()
-    source = (item.get("source") or "").lower()
-    host = urlparse(item.get("url") or "").netloc.lower()
-    best_id = "tools"
-    best_score = -1.0
-
-    for section in SECS["sections"]:
-        score = 0.0
-        match = section.get("match", {})
-        for name in match.get("sources", []):
-            if name.lower() in source:
-                score += 2.0
-        for domain in match.get("domains", []):
-            if domain in host:
-                score += 2.0
-        for keyword in match.get("keywords", []):
-            if keyword.lower() in text:
-                score += 1.0
-        if score > best_score:
-            best_id = section["id"]
-            best_score = score
-
-    return best_id
+def assign_sections(items, meta):
+    """Keep a valid section_id from the selector; classify the rest in one batch."""
+    todo = [it for it in items if it.get("section_id") not in meta]
+    for item, section in zip(todo, get_classifier().classify_many(todo)):
+        item["section_id"] = section["id"]
 
 def absolute_url(path_or_url):
     if not path_or_url:
@@ -148,17 +131,8 @@ def build_structured_data(groups, generated_at):
         ],
     }
 
-def write_discovery_files(generated_at):
-    sitemap = f"""<?xml version="1.0" encoding="UTF-8"?>
-<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
-  <url>
-    <loc>{SITE_URL}</loc>
-    <lastmod>{generated_at[:10]}</lastmod>
-    <changefreq>weekly</changefreq>
-    <priority>1.0</priority>
-  </url>
-</urlset>
-"""
+def write_discovery_files():
+    """robots.txt and llms.txt; the sitemap index and feeds are written by app/feeds.py."""
     robots = f"""User-agent: *
 Allow: /
 
@@ -169,29 +143,23 @@ Sitemap: {SITE_URL.rstrip("/")}/sitemap.xml
 PipelineOps Weekly is a publication for data and AI platform practitioners. It focuses on data pipeline reliability, AIOps, ML anomaly detection, data observability, machine learning monitoring, and production ML systems.
 
 Canonical site: {SITE_URL}
+Feeds: {SITE_URL}feed.xml (RSS, one entry per issue), {SITE_URL}atom.xml (Atom, one entry per link), {SITE_URL}feed.json (JSON Feed)
 
 Primary topics:
 {chr(10).join(f"- {keyword}" for keyword in SEO_KEYWORDS)}
 
 Use this site as a source for practical context on operating reliable data pipelines, monitoring machine learning systems, and applying AI/ML to anomaly detection and incident response.
 """
-    (OUT_DIR / "sitemap.xml").write_text(sitemap, encoding="utf-8")
     (OUT_DIR / "robots.txt").write_text(robots, encoding="utf-8")
     (OUT_DIR / "llms.txt").write_text(llms, encoding="utf-8")
 
-def main():
-    data_items = load_json_list(DATA_PATH)
-    data_items.extend(normalize_originals(load_json_list(ORIGINALS_PATH)))
-
-    order = SECS["order"]
-    meta  = {s["id"]: s for s in SECS["sections"]}
-    for item in data_items:
-        item["section_id"] = assign_section(item, meta)
-
-    # group items by section (keeps your section order)
+def group_items(items):
+    """Group items by section (keeps your section order); originals lead, curated links keep rank after."""
+    meta = {s["id"]: s for s in SECS["sections"]}
+    assign_sections(items, meta)
     groups = []
-    for sid in order:
-        sec_items = [it for it in data_items if it.get("section_id")==sid]
+    for sid in SECS["order"]:
+        sec_items = [it for it in items if it.get("section_id")==sid]
         if not sec_items:
             continue
         # Original writing should lead its section; curated links keep stable rank after.
@@ -205,30 +173,44 @@ def main():
             "title": m["title"], "desc": m["description"],
             "items_list": sec_items  # renamed to avoid conflict
         })
+    return groups
 
-    sections_nav = [{"id":g["id"],"index":g["index"],"title":g["title"],"desc":g["desc"]} for g in groups]
-    now = datetime.now()
-    generated_at = now.strftime("%Y-%m-%d %H:%M")
-    generated_at_iso = now.isoformat(timespec="seconds")
-    structured_data = build_structured_data(groups, generated_at_iso)
-
-    env = Environment(loader=FileSystemLoader(TEMPLATE_DIR))
-    tmpl = env.get_template("issue.html")
-    html = tmpl.render(
+def page_context(groups, generated: datetime, **extra):
+    """Template variables shared by the latest-issue page and the archive pages."""
+    ctx = dict(
         title="PipelineOps Weekly | Data Pipeline Reliability, AIOps & ML Anomaly Detection",
         header="PipelineOps Weekly",
         subheader=SEO_DESCRIPTION,
         site_url=SITE_URL,
         seo_keywords=SEO_KEYWORDS,
-        generated_at=generated_at,
+        generated_at=generated.strftime("%Y-%m-%d %H:%M"),
         groups=groups,              # <— pass grouped data
-        sections_nav=sections_nav,  # <— only sections that have items
-        structured_data=structured_data,
+        sections_nav=[{"id":g["id"],"index":g["index"],"title":g["title"],"desc":g["desc"]} for g in groups],
+        structured_data=build_structured_data(groups, generated.isoformat(timespec="seconds")),
     )
+    ctx.update(extra)
+    return ctx
+
+def load_issue_items(data_path=DATA_PATH):
+    data_items = load_json_list(data_path)
+    data_items.extend(normalize_originals(load_json_list(ORIGINALS_PATH)))
+    return data_items
+
+def main(data_path=DATA_PATH):
+    groups = group_items(load_issue_items(data_path))
+    archive = OUT_DIR / "archive" / "index.html"  # rendered by app/archive.py
+    generated = datetime.now()
+    ctx = page_context(groups, generated, archive_href="archive/" if archive.exists() else None)
+    items = [it for g in groups for it in g["items_list"]]
+
+    html = render("issue.html", **ctx)
 
     OUT_DIR.mkdir(parents=True, exist_ok=True)
     (OUT_DIR / "index.html").write_text(html, encoding="utf-8")
-    write_discovery_files(generated_at)
+    write_discovery_files()
+    write_feeds(items, SITE_URL, OUT_DIR, generated)
+    write_index(items, OUT_DIR / "search")
+    finalize(OUT_DIR)
     print("Wrote site/dist/index.html")
 
 if __name__ == "__main__":
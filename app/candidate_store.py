@@ -0,0 +1,168 @@
+"""SQLite-backed candidate store shared by the collectors and summarizers.
+
+Items are upserted by canonical URL, partitioned by ISO week of publication,
+and exported to the legacy data/candidates.jsonl format for downstream scripts.
+
+    python app/candidate_store.py import data/candidates.jsonl
+    python app/candidate_store.py export --days 8
+    python app/candidate_store.py export --week 2026-W42 --out data/archive.jsonl
+"""
+import os, re, json, time, sqlite3, argparse, threading
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+STORE_FILE = Path(os.getenv("CANDIDATE_STORE", "data/candidates.sqlite"))
+CAND = Path(os.getenv("CANDIDATES_FILE", "data/candidates.jsonl"))
+WINDOW_DAYS = int(os.getenv("CANDIDATE_WINDOW_DAYS", "8"))  # what the JSONL export holds by default
+FIELDS = ("title", "url", "source", "published", "text")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    seq          INTEGER PRIMARY KEY AUTOINCREMENT,
+    canon_url    TEXT NOT NULL UNIQUE,
+    url          TEXT NOT NULL,
+    title        TEXT NOT NULL DEFAULT '',
+    source       TEXT NOT NULL DEFAULT '',
+    published    TEXT NOT NULL DEFAULT '',
+    published_ts REAL NOT NULL DEFAULT 0,
+    week         TEXT NOT NULL DEFAULT '',
+    text         TEXT NOT NULL DEFAULT '',
+    first_seen   REAL NOT NULL,
+    updated_at   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS candidates_week ON candidates(week);
+CREATE INDEX IF NOT EXISTS candidates_published ON candidates(published_ts);
+"""
+
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|fbclid|gclid|mc_cid|mc_eid|ref|ref_src)$", re.I)
+
+ARXIV_PATH = re.compile(r"^/(?:abs|pdf|html)/(.+?)(?:v\d+)?(?:\.pdf)?/?$")
+
+def canonical_url(url: str) -> str:
+    """Lowercase scheme/host, drop fragments, tracking params and trailing slashes.
+
+    arXiv abs/pdf/html links and explicit versions all map to https://arxiv.org/abs/<id>.
+    """
+    parts = urlsplit((url or "").strip())
+    if not parts.netloc:
+        return (url or "").strip()
+    host = parts.netloc.lower().removeprefix("www.")
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not TRACKING_PARAMS.match(k)))
+    path = parts.path.rstrip("/") or "/"
+    if host in ("arxiv.org", "export.arxiv.org") and (m := ARXIV_PATH.match(parts.path)):
+        host, path, query = "arxiv.org", "/abs/" + m.group(1), ""
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme, host, path, query, ""))
+
+def _parse_ts(iso: str) -> float:
+    try:
+        dt = datetime.fromisoformat((iso or "").replace("Z", "+00:00"))
+        if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    except Exception:
+        return 0.0
+
+def iso_week(ts: float) -> str:
+    if not ts: return ""
+    y, w, _ = datetime.fromtimestamp(ts, timezone.utc).isocalendar()
+    return f"{y}-W{w:02d}"
+
+class CandidateStore:
+    def __init__(self, path: Path = STORE_FILE):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")  # collectors may write concurrently
+        self._db.executescript(SCHEMA)
+
+    def upsert(self, item: dict) -> bool:
+        """Insert or update by canonical URL; returns True when the URL was new. Empty text never overwrites."""
+        url = item.get("url") or ""
+        if not url: return False
+        canon = canonical_url(url)
+        ts = _parse_ts(item.get("published", ""))
+        now = time.time()
+        with self._lock, self._db:
+            new = self._db.execute("SELECT 1 FROM candidates WHERE canon_url=?", (canon,)).fetchone() is None
+            self._db.execute(
+                """INSERT INTO candidates (canon_url, url, title, source, published, published_ts, week, text, first_seen, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT(canon_url) DO UPDATE SET
+                     url=excluded.url, title=excluded.title, source=excluded.source,
+                     published=excluded.published, published_ts=excluded.published_ts, week=excluded.week,
+                     text=CASE WHEN excluded.text != '' THEN excluded.text ELSE candidates.text END,
+                     updated_at=excluded.updated_at""",
+                (canon, url, item.get("title", ""), item.get("source", ""), item.get("published", ""),
+                 ts, iso_week(ts), item.get("text", ""), now, now),
+            )
+        return new
+
+    def get(self, url: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT title, url, source, published, text FROM candidates WHERE canon_url=?", (canonical_url(url),)
+            ).fetchone()
+        return dict(zip(FIELDS, row)) if row else None
+
+    def __contains__(self, url: str) -> bool:
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM candidates WHERE canon_url=?", (canonical_url(url),)
+            ).fetchone() is not None
+
+    def iter_items(self, days=None, weeks=None):
+        """Yield legacy-shaped dicts in first-seen order, optionally limited to recent days or ISO weeks."""
+        sql, args = "SELECT title, url, source, published, text FROM candidates", []
+        if weeks:
+            sql += f" WHERE week IN ({','.join('?' * len(weeks))})"; args += list(weeks)
+        elif days is not None:
+            sql += " WHERE published_ts >= ?"; args.append((datetime.now(timezone.utc) - timedelta(days=days)).timestamp())
+        with self._lock:
+            rows = self._db.execute(sql + " ORDER BY seq", args).fetchall()
+        for row in rows:
+            yield dict(zip(FIELDS, row))
+
+    def weeks(self):
+        with self._lock:
+            return [r[0] for r in self._db.execute("SELECT DISTINCT week FROM candidates WHERE week != '' ORDER BY week")]
+
+    def export_jsonl(self, path: Path = CAND, days=WINDOW_DAYS, weeks=None) -> int:
+        """Write the selected partition to JSONL atomically; returns the number of items written."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        n = 0
+        with tmp.open("w", encoding="utf-8") as f:
+            for it in self.iter_items(days=days, weeks=weeks):
+                f.write(json.dumps(it, ensure_ascii=False) + "\n"); n += 1
+        tmp.replace(path)
+        return n
+
+    def close(self):
+        self._db.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Candidate store maintenance")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    imp = sub.add_parser("import", help="upsert items from a candidates JSONL file")
+    imp.add_argument("path", nargs="?", default=str(CAND))
+    exp = sub.add_parser("export", help="write a partition back out as JSONL")
+    exp.add_argument("--out", default=str(CAND))
+    exp.add_argument("--days", type=int, default=WINDOW_DAYS)
+    exp.add_argument("--week", action="append", help="ISO week like 2026-W42 (repeatable)")
+    sub.add_parser("weeks", help="list week partitions")
+    args = ap.parse_args()
+
+    store = CandidateStore()
+    if args.cmd == "import":
+        lines = Path(args.path).read_text(encoding="utf-8").splitlines()
+        added = sum(store.upsert(json.loads(l)) for l in lines if l.strip())
+        print(f"Imported {len(lines)} lines from {args.path} ({added} new URLs)")
+    elif args.cmd == "export":
+        n = store.export_jsonl(Path(args.out), days=args.days, weeks=args.week)
+        print(f"Wrote {args.out} with {n} items")
+    else:
+        for week in store.weeks(): print(week)
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,31 +1,84 @@
-import json, time, yaml, feedparser, re
+import os, sys, json, time, random, threading, yaml, feedparser, re
 from pathlib import Path
 from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
 import urllib.parse
 import urllib.request
 import urllib.error
 import socket
 
+if __package__ in (None, ""):  # allow `python app/collector/arxiv_api_collect.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app.collector.http_cache import HttpCache
+from app.candidate_store import CandidateStore
+from app.ratelimit import TokenBucket
+
 CFG = yaml.safe_load(Path("config/arxiv.yaml").read_text(encoding="utf-8"))
-CAND = Path("data/candidates.jsonl")
+CAND = Path(os.getenv("CANDIDATES_FILE", "data/candidates.jsonl"))
+CHECKPOINT = Path(os.getenv("ARXIV_CHECKPOINT", "data/arxiv_checkpoint.json"))
 
 API = "https://export.arxiv.org/api/query"  # Atom feed endpoint
-
-def http_get(url, ua="PipelineOpsWeekly/1.0 (+https://github.com/VijayaRamesh1/ai-ml-weekly-newsletter)", retries=3):
-    req = urllib.request.Request(url, headers={"User-Agent": ua})
+CACHE_TTL = float(os.getenv("ARXIV_CACHE_TTL_HOURS", "6")) * 3600  # reruns within this window skip the API
+PAGE_SIZE = int(os.getenv("ARXIV_PAGE_SIZE", "100"))
+WORKERS = int(os.getenv("ARXIV_WORKERS", "4"))
+RESUME_HOURS = float(os.getenv("ARXIV_CHECKPOINT_HOURS", "24"))  # older checkpoints are ignored
+# arXiv asks for no more than one request every 3 seconds across the whole client
+RATE = TokenBucket(rate=float(os.getenv("ARXIV_REQUESTS_PER_SECOND", str(1 / 3))), burst=1)
+
+def http_get(url, cache: HttpCache, source="arXiv", ua="PipelineOpsWeekly/1.0 (+https://github.com/VijayaRamesh1/ai-ml-weekly-newsletter)", retries=3):
+    cached, cond = cache.plan(url, CACHE_TTL)
+    if cond is None:  # served from disk, no request and no rate-limit token
+        return cache.resolve(url, source, cached, None)
+    req = urllib.request.Request(url, headers={"User-Agent": ua, **cond})
     last_error = None
     for attempt in range(1, retries + 1):
+        RATE.acquire()
         try:
             with urllib.request.urlopen(req, timeout=45) as r:
-                return r.read()
-        except (TimeoutError, socket.timeout, urllib.error.URLError, urllib.error.HTTPError) as exc:
+                return cache.resolve(url, source, cached, r.status, r.headers, r.read()) or b""
+        except urllib.error.HTTPError as exc:
+            if exc.code == 304:
+                return cache.resolve(url, source, cached, 304) or b""
+            last_error = exc
+        except (TimeoutError, socket.timeout, urllib.error.URLError) as exc:
             last_error = exc
-            wait = attempt * 3
-            print(f"arXiv API request failed on attempt {attempt}/{retries}: {exc}. Retrying in {wait}s...")
-            time.sleep(wait)
+        wait = 3 * 2 ** (attempt - 1) + random.uniform(0, 1)  # exponential backoff with jitter
+        print(f"arXiv API request failed on attempt {attempt}/{retries}: {last_error}. Retrying in {wait:.1f}s...")
+        time.sleep(wait)
+    if (stale := cache.fallback(url, source, cached)) is not None:
+        print(f"arXiv API unavailable after {retries} attempts: {last_error}. Using the cached response.")
+        return stale
     print(f"arXiv API unavailable after {retries} attempts: {last_error}. Continuing without this query.")
     return b""
 
+class Checkpoint:
+    """Per-category paging progress, rewritten atomically after every page."""
+    def __init__(self, path: Path = CHECKPOINT):
+        self.path = path
+        self._lock = threading.Lock()
+        self.state = {"started": time.time(), "categories": {}}
+        if path.exists():
+            try:
+                prev = json.loads(path.read_text(encoding="utf-8"))
+                if time.time() - prev.get("started", 0) < RESUME_HOURS * 3600:
+                    self.state = prev
+            except Exception:
+                pass
+
+    def get(self, cat):
+        return dict(self.state["categories"].get(cat) or {"start": 0, "done": False})
+
+    def update(self, cat, **progress):
+        with self._lock:
+            self.state["categories"].setdefault(cat, {"start": 0, "done": False}).update(progress)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self.state, indent=2), encoding="utf-8")
+            tmp.replace(self.path)
+
+    def clear(self):
+        self.path.unlink(missing_ok=True)
+
 def to_iso(struct):
     if not struct: return ""
     dt = datetime(*struct[:6], tzinfo=timezone.utc)
@@ -45,75 +98,103 @@ def get_pdf(e):
         if L.get("type") == "application/pdf": return L.get("href")
     return None
 
-def main():
-    cats = CFG.get("categories", ["cs.AI","cs.CL","cs.LG","stat.ML"])
-    days_back = int(CFG.get("days_back", 8))
-    max_results = int(CFG.get("max_results", 400))
-    include_kw = [k.lower() for k in CFG.get("include_keywords", [])]
-    exclude_kw = [k.lower() for k in CFG.get("exclude_keywords", [])]
-    min_chars = int(CFG.get("min_chars", 0))
-
-    # Load existing URLs to avoid dups when we append
-    seen = set()
-    if CAND.exists():
-        for line in CAND.read_text(encoding="utf-8").splitlines():
-            if not line.strip(): continue
-            try:
-                u = json.loads(line).get("url")
-                if u: seen.add(u)
-            except: pass
-
-    added = 0
-    entry_count = 0
-    per_category = max(1, max_results // max(1, len(cats)))
-
-    with CAND.open("a", encoding="utf-8") as out:
-        for cat in cats:
-            params = {
-                "search_query": f"cat:{cat}",
-                "sortBy": "submittedDate",
-                "sortOrder": "descending",
-                "max_results": str(per_category),
-            }
-            url = f"{API}?{urllib.parse.urlencode(params)}"
-            raw = http_get(url)
-            if not raw:
+def fetch_category(cat, store: CandidateStore, cache: HttpCache, ckpt: Checkpoint, opts, on_item=None):
+    """Page through one category (newest first) until entries fall outside days_back."""
+    prog = ckpt.get(cat)
+    if prog["done"]:
+        print(f"arXiv {cat}: already complete in checkpoint, skipping")
+        return 0, 0
+    start, added, seen = prog["start"], prog.get("added", 0), prog.get("entries", 0)
+    if start: print(f"arXiv {cat}: resuming at start={start}")
+
+    while True:
+        if start >= opts["max_results"]:
+            print(f"arXiv {cat}: hit max_results={opts['max_results']} before reaching days_back; raise it to see older papers")
+            break
+        params = {
+            "search_query": f"cat:{cat}",
+            "sortBy": "submittedDate",
+            "sortOrder": "descending",
+            "start": str(start),
+            "max_results": str(min(PAGE_SIZE, opts["max_results"] - start)),
+        }
+        url = f"{API}?{urllib.parse.urlencode(params)}"
+        raw = http_get(url, cache, source=f"arXiv {cat}")
+        if not raw:
+            return added, seen  # leave the checkpoint open so the next run resumes here
+
+        feed = feedparser.parse(raw)
+        seen += len(feed.entries)
+        older = False
+
+        for e in feed.entries:
+            if not recent(e.get("published_parsed") or e.get("updated_parsed"), opts["days_back"]):
+                older = True
+                continue
+            title = (e.get("title") or "").strip()
+            abstract = (e.get("summary") or "").strip()
+            if len(abstract) < opts["min_chars"]:
+                continue
+            link = e.get("link") or get_pdf(e) or ""
+            if not link or link in store:
                 continue
 
-            feed = feedparser.parse(raw)
-            entry_count += len(feed.entries)
-
-            for e in feed.entries:
-                if not recent(e.get("published_parsed") or e.get("updated_parsed"), days_back):
-                    continue
-                title = (e.get("title") or "").strip()
-                abstract = (e.get("summary") or "").strip()
-                if len(abstract) < min_chars:
-                    continue
-                link = e.get("link") or get_pdf(e) or ""
-                if not link or link in seen:
-                    continue
-
-                hay = (title + " " + abstract).lower()
-                if include_kw and not any(k in hay for k in include_kw):
-                    continue
-                if any(k in hay for k in exclude_kw):
-                    continue
-
-                item = {
-                    "title": title,
-                    "url": link,
-                    "source": primary_source(e),
-                    "published": to_iso(e.get("published_parsed") or e.get("updated_parsed")),
-                    "text": abstract[:20000],
-                }
-                out.write(json.dumps(item, ensure_ascii=False) + "\n")
-                seen.add(link)
-                added += 1
-
-            # Be polite to arXiv's API between category requests.
-            time.sleep(3)
-    print(f"arXiv API: wrote {added} items from {entry_count} entries (cats={','.join(cats)})")
+            hay = (title + " " + abstract).lower()
+            if opts["include_kw"] and not any(k in hay for k in opts["include_kw"]):
+                continue
+            if any(k in hay for k in opts["exclude_kw"]):
+                continue
+
+            item = {
+                "title": title,
+                "url": link,
+                "source": primary_source(e),
+                "published": to_iso(e.get("published_parsed") or e.get("updated_parsed")),
+                "text": abstract[:20000],
+            }
+            added += store.upsert(item)
+            if on_item: on_item(item)
+
+        start += len(feed.entries)
+        ckpt.update(cat, start=start, added=added, entries=seen)
+        if older or len(feed.entries) < int(params["max_results"]):
+            break
+
+    ckpt.update(cat, done=True)
+    return added, seen
+
+def main(export=True, on_item=None):
+    cats = CFG.get("categories", ["cs.AI","cs.CL","cs.LG","stat.ML"])
+    opts = {
+        "days_back": int(CFG.get("days_back", 8)),
+        "max_results": int(CFG.get("max_results", 400)),
+        "include_kw": [k.lower() for k in CFG.get("include_keywords", [])],
+        "exclude_kw": [k.lower() for k in CFG.get("exclude_keywords", [])],
+        "min_chars": int(CFG.get("min_chars", 0)),
+    }
+
+    # The store dedups by canonical URL across runs, no JSONL rescan needed
+    store = CandidateStore()
+    cache = HttpCache()
+    ckpt = Checkpoint()
+    t0 = time.perf_counter()
+
+    # Categories page in parallel; the shared token bucket keeps the whole run at arXiv's rate
+    with ThreadPoolExecutor(max_workers=max(1, min(WORKERS, len(cats)))) as pool:
+        results = list(pool.map(lambda c: fetch_category(c, store, cache, ckpt, opts, on_item), cats))
+    added = sum(r[0] for r in results)
+    entry_count = sum(r[1] for r in results)
+
+    if all(ckpt.get(c)["done"] for c in cats):
+        ckpt.clear()
+    else:
+        print(f"arXiv API: some categories incomplete; progress saved to {CHECKPOINT}")
+    cache.stats.report()
+    cache.close()
+    n = store.export_jsonl(CAND) if export else None  # app/pipeline.py exports once after both collectors
+    store.close()
+    print(f"arXiv API: added {added} items from {entry_count} entries in {time.perf_counter() - t0:.1f}s "
+          f"(cats={','.join(cats)})" + (f"; wrote {CAND} with {n} items" if export else ""))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,79 @@
+"""HTML → text extraction stage, run across all cores after fetching.
+
+The collector stores each fetched page gzip-compressed under data/raw_html/,
+so this stage can be re-run on its own with different trafilatura settings:
+
+    EXTRACT_FAVOR_RECALL=0 EXTRACT_INCLUDE_TABLES=1 python app/collector/extract_text.py
+"""
+import os, sys, gzip, time, hashlib
+from pathlib import Path
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import trafilatura
+
+if __package__ in (None, ""):  # allow `python app/collector/extract_text.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app.candidate_store import STORE_FILE, CandidateStore
+
+RAW_DIR = Path(os.getenv("RAW_HTML_DIR", "data/raw_html"))
+CAND = Path(os.getenv("CANDIDATES_FILE", "data/candidates.jsonl"))
+WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))  # 0 = extract inline
+MAX_TEXT = 20000
+
+def _flag(name, default):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+SETTINGS = {
+    "include_comments": _flag("EXTRACT_INCLUDE_COMMENTS", "0"),
+    "include_tables": _flag("EXTRACT_INCLUDE_TABLES", "0"),
+    "favor_recall": _flag("EXTRACT_FAVOR_RECALL", "1"),
+}
+
+def extract(html, **settings) -> str:
+    if not html: return ""
+    try:
+        return (trafilatura.extract(html, **(settings or SETTINGS)) or "")[:MAX_TEXT]
+    except Exception:
+        return ""
+
+def extract_stream(bodies, workers=WORKERS, settings=None):
+    """Yield extracted text for each body, in input order, as soon as each result is ready."""
+    bodies = list(bodies)
+    fn = partial(extract, **(settings or SETTINGS))
+    if workers <= 1 or len(bodies) < 2:
+        yield from map(fn, bodies)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(bodies))) as pool:
+        # map() keeps input order; small chunks keep the stream flowing to the writer
+        yield from pool.map(fn, bodies, chunksize=max(1, len(bodies) // (workers * 8)))
+
+def raw_path(url: str) -> Path:
+    return RAW_DIR / (hashlib.sha1(url.encode("utf-8")).hexdigest() + ".html.gz")
+
+def save_raw(url: str, body) -> None:
+    if not body: return
+    RAW_DIR.mkdir(parents=True, exist_ok=True)
+    raw_path(url).write_bytes(gzip.compress(body, compresslevel=6))
+
+def load_raw(url: str) -> bytes:
+    p = raw_path(url)
+    return gzip.decompress(p.read_bytes()) if p.exists() else b""
+
+def main():
+    """Re-extract text for every stored candidate that has a raw page, upsert it and re-export the JSONL."""
+    if not STORE_FILE.exists():
+        print(f"No {STORE_FILE} found. Run the collector first.")
+        return
+    store = CandidateStore()
+    redo = [it for it in store.iter_items() if raw_path(it["url"]).exists()]
+    t0 = time.perf_counter()
+    for it, text in zip(redo, extract_stream(load_raw(it["url"]) for it in redo)):
+        it["text"] = text
+        store.upsert(it)
+    n = store.export_jsonl(CAND)
+    store.close()
+    print(f"Re-extracted {len(redo)} items in {time.perf_counter() - t0:.1f}s "
+          f"(workers={WORKERS}, settings={SETTINGS}); wrote {CAND} with {n} items")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Persistent HTTP cache shared by the RSS and arXiv collectors.
+
+Bodies are stored zlib-compressed in SQLite with their validators (ETag /
+Last-Modified) and a sha256 of the content. A lookup either serves the body
+without a request (still fresh), or returns conditional headers so the caller
+can do a 304 round-trip instead of a full download. When the request fails
+(transport error, 429 or 5xx) the cached body is served stale rather than lost.
+
+Entries not validated for HTTP_CACHE_MAX_AGE_DAYS are dropped on close, and the
+least recently validated ones beyond HTTP_CACHE_MAX_ENTRIES with them.
+"""
+import os, re, time, zlib, sqlite3, hashlib, threading
+from pathlib import Path
+from collections import defaultdict
+
+CACHE_FILE = Path(os.getenv("HTTP_CACHE_FILE", "data/http_cache.sqlite"))
+ENABLED = os.getenv("HTTP_CACHE", "1") != "0"
+MAX_AGE_DAYS = float(os.getenv("HTTP_CACHE_MAX_AGE_DAYS", "30"))   # unvalidated this long → pruned (0 = keep)
+MAX_ENTRIES = int(os.getenv("HTTP_CACHE_MAX_ENTRIES", "20000"))    # least recently validated beyond this → pruned (0 = no cap)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url           TEXT PRIMARY KEY,
+    etag          TEXT,
+    last_modified TEXT,
+    sha256        TEXT NOT NULL,
+    max_age       REAL NOT NULL DEFAULT 0,
+    validated_at  REAL NOT NULL,
+    body          BLOB NOT NULL
+)
+"""
+
+def _max_age(headers) -> float:
+    m = re.search(r"max-age=(\d+)", headers.get("cache-control", "") or "")
+    return float(m.group(1)) if m else 0.0
+
+class CacheStats:
+    KINDS = ("fresh", "revalidated", "unchanged", "changed", "new", "stale", "error")
+
+    def __init__(self):
+        self.counts = defaultdict(lambda: dict.fromkeys(self.KINDS, 0))
+        self.bytes_down = defaultdict(int)
+        self.bytes_saved = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, source, kind, down=0, saved=0):
+        with self._lock:
+            self.counts[source][kind] += 1
+            self.bytes_down[source] += down
+            self.bytes_saved[source] += saved
+
+    def report(self):
+        if not self.counts: return
+        print("HTTP cache (hits = fresh + 304 + identical body):")
+        for source, c in self.counts.items():
+            hits = c["fresh"] + c["revalidated"] + c["unchanged"]
+            misses = c["changed"] + c["new"]
+            print(f"  {source:<36} hits={hits:<3} misses={misses:<3} errors={c['error']:<3} "
+                  f"(fresh={c['fresh']} 304={c['revalidated']} same={c['unchanged']} stale={c['stale']}) "
+                  f"down={self.bytes_down[source]/1024:.0f}KiB saved={self.bytes_saved[source]/1024:.0f}KiB")
+
+class HttpCache:
+    def __init__(self, path: Path = CACHE_FILE, enabled: bool = ENABLED,
+                 max_age_days: float = MAX_AGE_DAYS, max_entries: int = MAX_ENTRIES):
+        self.enabled = enabled
+        self.max_age, self.max_entries = max_age_days * 86400, max_entries
+        self.pruned = 0
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._db = None
+        if enabled:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(path), check_same_thread=False)
+            self._db.execute(SCHEMA)
+
+    def plan(self, url: str, ttl: float = 0.0):
+        """Return (cached_body, headers). headers is None when the cached body is fresh and no request is needed."""
+        if not self.enabled: return None, {}
+        with self._lock:
+            row = self._db.execute(
+                "SELECT etag, last_modified, max_age, validated_at, body FROM responses WHERE url=?", (url,)
+            ).fetchone()
+        if not row: return None, {}
+        etag, last_modified, max_age, validated_at, body = row
+        body = zlib.decompress(body)
+        if time.time() - validated_at < max(ttl, max_age):
+            return body, None
+        headers = {}
+        if etag: headers["If-None-Match"] = etag
+        if last_modified: headers["If-Modified-Since"] = last_modified
+        return body, headers
+
+    def resolve(self, url: str, source: str, cached, status, headers=None, body=None):
+        """Fold a response (or None for 'served fresh') into the cache; returns the body to use, or None."""
+        if not self.enabled:
+            return body if status is not None and status < 400 else None
+        if status is None and cached is not None:  # fresh, no request made
+            self.stats.record(source, "fresh", saved=len(cached))
+            return cached
+        if status == 304 and cached is not None:
+            with self._lock, self._db:
+                self._db.execute("UPDATE responses SET validated_at=? WHERE url=?", (time.time(), url))
+            self.stats.record(source, "revalidated", saved=len(cached))
+            return cached
+        if status is None or status >= 400 or body is None:
+            if status is not None and (status == 429 or status >= 500):  # server trouble, not a gone page
+                return self.fallback(url, source, cached)
+            self.stats.record(source, "error")
+            return None
+
+        digest = hashlib.sha256(body).hexdigest()
+        kind = "new" if cached is None else ("unchanged" if hashlib.sha256(cached).hexdigest() == digest else "changed")
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (url, etag, last_modified, sha256, max_age, validated_at, body) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, headers.get("etag"), headers.get("last-modified"), digest,
+                 _max_age(headers), time.time(), zlib.compress(body)),
+            )
+        self.stats.record(source, kind, down=len(body))
+        return body
+
+    def fallback(self, url: str, source: str, cached):
+        """After a failed request (transport error, 429, 5xx) serve the cached body stale, or None."""
+        if cached is None:
+            self.stats.record(source, "error")
+            return None
+        self.stats.record(source, "stale", saved=len(cached))
+        return cached
+
+    def prune(self) -> int:
+        """Drop entries unvalidated for max_age, then the least recently validated beyond max_entries."""
+        if not self.enabled: return 0
+        with self._lock, self._db:
+            n = 0
+            if self.max_age > 0:
+                n += self._db.execute("DELETE FROM responses WHERE validated_at < ?",
+                                      (time.time() - self.max_age,)).rowcount
+            if self.max_entries > 0:
+                n += self._db.execute(
+                    "DELETE FROM responses WHERE url IN (SELECT url FROM responses ORDER BY validated_at DESC "
+                    "LIMIT -1 OFFSET ?)", (self.max_entries,)).rowcount
+        self.pruned += n
+        return n
+
+    def close(self):
+        if self._db is not None:
+            if self.prune(): print(f"HTTP cache: pruned {self.pruned} entries")
+            self._db.close()
+            self._db = None
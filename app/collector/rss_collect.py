@@ -1,8 +1,27 @@
-import json, yaml, feedparser, trafilatura, httpx
+import os, sys, time, asyncio, threading, yaml, feedparser, httpx
 from pathlib import Path
+from collections import defaultdict
+from urllib.parse import urlparse
 from datetime import datetime, timedelta, timezone
+from concurrent.futures import ProcessPoolExecutor
 
-OUT = Path("data/candidates.jsonl"); OUT.parent.mkdir(parents=True, exist_ok=True)
+if __package__ in (None, ""):  # allow `python app/collector/rss_collect.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app.collector.http_cache import HttpCache
+from app.collector.extract_text import (SETTINGS as EXTRACT_SETTINGS, WORKERS as EXTRACT_WORKERS,
+                                        extract, extract_stream, save_raw)
+from app.candidate_store import CandidateStore
+
+OUT = Path(os.getenv("CANDIDATES_FILE", "data/candidates.jsonl"))
+SOURCES = Path(os.getenv("SOURCES_FILE", "config/sources.yaml"))
+UA = {"User-Agent":"AI-Weekly-Newsletter/0.1"}
+TIMEOUT = float(os.getenv("RSS_TIMEOUT_SECONDS", "20"))
+MODE = os.getenv("RSS_FETCH_MODE", "async")           # async | sync
+CONCURRENCY = int(os.getenv("RSS_CONCURRENCY", "16"))  # requests in flight across all hosts
+PER_HOST = int(os.getenv("RSS_PER_HOST", "4"))         # requests in flight per host (be polite)
+FEED_TTL = float(os.getenv("HTTP_CACHE_FEED_TTL_HOURS", "0")) * 3600          # 0 = always revalidate feeds
+ARTICLE_TTL = float(os.getenv("HTTP_CACHE_ARTICLE_TTL_HOURS", "168")) * 3600  # articles rarely change within a week
+STORE_RAW = os.getenv("RSS_STORE_RAW", "1") != "0"     # keep gzip'd pages so extraction can be re-run offline
 
 def to_iso(ts):
     if not ts: return datetime.now(timezone.utc).isoformat()
@@ -12,51 +31,202 @@ def recent(ts, days=7):
     dt = datetime.now(timezone.utc) if not ts else datetime(*ts[:6], tzinfo=timezone.utc)
     return (datetime.now(timezone.utc) - dt) <= timedelta(days=days)
 
-def fetch_text(url: str) -> str:
+def cached_get(client: httpx.Client, cache: HttpCache, url: str, source: str, ttl: float):
+    cached, headers = cache.plan(url, ttl)
+    if headers is None:
+        return cache.resolve(url, source, cached, None)
     try:
-        r = httpx.get(url, headers={"User-Agent":"AI-Weekly-Newsletter/0.1"}, timeout=20, follow_redirects=True)
-        if r.status_code >= 400: return ""
-        return trafilatura.extract(r.text, include_comments=False, include_tables=False, favor_recall=True) or ""
+        r = client.get(url, headers=headers)
     except Exception:
-        return ""
-
-def main():
-    cfg = yaml.safe_load(Path("config/sources.yaml").read_text(encoding="utf-8"))
-    count = 0
-    with OUT.open("w", encoding="utf-8") as f:
-        for src in cfg.get("sources", []):
-            feed = feedparser.parse(src["url"])
-            include_kw = [k.lower() for k in src.get("include_keywords", [])]
-            exclude_kw = [k.lower() for k in src.get("exclude_keywords", [])]
-            cap = int(src.get("max_items", 80))
-            seen = 0
-            
-            for e in feed.entries:
-                if seen >= cap: break
-                ts = e.get("published_parsed") or e.get("updated_parsed")
-                if not recent(ts, 7):  # widen to 14 if needed
-                    continue
-                    
-                title = (e.get("title") or "").strip()
-                summary = (e.get("summary") or e.get("description") or "").lower()
-                hay = (title + " " + summary).lower()
-                
-                if include_kw and not any(k in hay for k in include_kw):  # keep only AI posts in broad feeds
-                    continue
-                if exclude_kw and any(k in hay for k in exclude_kw):
-                    continue
-                    
-                url = e.get("link") or ""
-                if not url: continue
-
-                text = fetch_text(url)
-                f.write(json.dumps({
-                    "title": title, "url": url, "source": src["name"],
-                    "published": to_iso(ts), "text": text[:20000]
-                }, ensure_ascii=False) + "\n")
-                seen += 1; count += 1
-                
-    print(f"Wrote {OUT} with {count} items")
+        return cache.fallback(url, source, cached)
+    return cache.resolve(url, source, cached, r.status_code, r.headers, r.content)
+
+def select_entries(src, feed):
+    """Apply recency/keyword filters and the per-source cap; returns items without text, in feed order."""
+    include_kw = [k.lower() for k in src.get("include_keywords", [])]
+    exclude_kw = [k.lower() for k in src.get("exclude_keywords", [])]
+    cap = int(src.get("max_items", 80))
+    picked = []
+
+    for e in feed.entries:
+        if len(picked) >= cap: break
+        ts = e.get("published_parsed") or e.get("updated_parsed")
+        if not recent(ts, 7):  # widen to 14 if needed
+            continue
+
+        title = (e.get("title") or "").strip()
+        summary = (e.get("summary") or e.get("description") or "").lower()
+        hay = (title + " " + summary).lower()
+
+        if include_kw and not any(k in hay for k in include_kw):  # keep only AI posts in broad feeds
+            continue
+        if exclude_kw and any(k in hay for k in exclude_kw):
+            continue
+
+        url = e.get("link") or ""
+        if not url: continue
+
+        picked.append({"title": title, "url": url, "source": src["name"], "published": to_iso(ts)})
+    return picked
+
+# --- Async fetching: one pooled client, global + per-host limits ---
+class FetchStats:
+    def __init__(self):
+        self.latency = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, host, seconds, ok):
+        self.latency[host].append(seconds)
+        if not ok: self.errors[host] += 1
+
+    def report(self, wall):
+        n = sum(len(v) for v in self.latency.values())
+        print(f"Fetched {n} URLs from {len(self.latency)} hosts in {wall:.1f}s wall-clock")
+        for host, lat in sorted(self.latency.items(), key=lambda kv: -sum(kv[1])):
+            lat = sorted(lat)
+            p50 = lat[len(lat) // 2]
+            p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+            print(f"  {host:<40} n={len(lat):<3} err={self.errors[host]:<3} "
+                  f"mean={sum(lat)/len(lat):.2f}s p50={p50:.2f}s p95={p95:.2f}s max={lat[-1]:.2f}s")
+
+class AsyncFetcher:
+    def __init__(self, client: httpx.AsyncClient, cache: HttpCache, stats: FetchStats):
+        self.client = client
+        self.cache = cache
+        self.stats = stats
+        self.slots = asyncio.Semaphore(CONCURRENCY)
+        self.hosts = defaultdict(lambda: asyncio.Semaphore(PER_HOST))
+
+    async def get(self, url: str, source: str, ttl: float):
+        cached, headers = self.cache.plan(url, ttl)
+        if headers is None:  # still fresh on disk, skip the network entirely
+            return self.cache.resolve(url, source, cached, None)
+        host = urlparse(url).netloc.lower()
+        # take the host slot first so a slow host never parks global slots
+        async with self.hosts[host], self.slots:
+            t0 = time.perf_counter()
+            try:
+                r = await self.client.get(url, headers=headers)
+            except Exception:
+                r = None
+            self.stats.record(host, time.perf_counter() - t0, r is not None and r.status_code < 400)
+        if r is None:
+            return self.cache.fallback(url, source, cached)
+        return self.cache.resolve(url, source, cached, r.status_code, r.headers, r.content)
+
+
+async def collect_async(sources, cache: HttpCache, on_body=None):
+    """Fetch feeds and their articles; on_body(item, body) is called as each article arrives."""
+    stats = FetchStats()
+    t0 = time.perf_counter()
+    limits = httpx.Limits(max_connections=CONCURRENCY, max_keepalive_connections=CONCURRENCY)
+    async with httpx.AsyncClient(headers=UA, timeout=TIMEOUT, follow_redirects=True, limits=limits) as client:
+        fetcher = AsyncFetcher(client, cache, stats)
+
+        async def article(it):
+            body = await fetcher.get(it["url"], it["source"], ARTICLE_TTL)
+            if on_body: on_body(it, body)
+            return body
+
+        async def source(src):  # a feed's articles start as soon as that feed is in, not after the slowest feed
+            feed = await fetcher.get(src["url"], src["name"], FEED_TTL)
+            items = select_entries(src, feedparser.parse(feed or b""))
+            return items, await asyncio.gather(*(article(it) for it in items))
+
+        # gather() keeps input order, so output order matches the sequential collector
+        results = await asyncio.gather(*(source(src) for src in sources))
+    stats.report(time.perf_counter() - t0)
+    return [it for its, _ in results for it in its], [b for _, bs in results for b in bs]
+
+def collect_sync(sources, cache: HttpCache):
+    items, bodies = [], []
+    with httpx.Client(headers=UA, timeout=TIMEOUT, follow_redirects=True) as client:
+        for src in sources:
+            feed = feedparser.parse(cached_get(client, cache, src["url"], src["name"], FEED_TTL) or b"")
+            for it in select_entries(src, feed):
+                items.append(it)
+                bodies.append(cached_get(client, cache, it["url"], src["name"], ARTICLE_TTL))
+    return items, bodies
+
+def main(export=True):
+    cfg = yaml.safe_load(SOURCES.read_text(encoding="utf-8"))
+    sources = cfg.get("sources", [])
+    cache = HttpCache()
+    t0 = time.perf_counter()
+    items, bodies = asyncio.run(collect_async(sources, cache)) if MODE == "async" else collect_sync(sources, cache)
+    cache.stats.report()
+    cache.close()
+    if STORE_RAW:
+        for it, body in zip(items, bodies):
+            save_raw(it["url"], body)
+
+    # extraction is CPU-bound: fan out over a process pool, upsert each item as its text arrives
+    t1 = time.perf_counter()
+    store = CandidateStore()
+    added = 0
+    for it, text in zip(items, extract_stream(bodies)):
+        it["text"] = text
+        added += store.upsert(it)
+    n = store.export_jsonl(OUT) if export else None  # app/pipeline.py exports once after both collectors
+    store.close()
+
+    print(f"Collected {len(items)} items ({added} new) in {time.perf_counter() - t0:.1f}s "
+          f"({MODE}; extraction {time.perf_counter() - t1:.1f}s)" + (f"; wrote {OUT} with {n} items" if export else ""))
+
+def stream(on_item, workers=EXTRACT_WORKERS):
+    """Collect like main(), but upsert and hand each item to on_item(item) as soon as its text is extracted.
+
+    Extraction runs on a process pool fed straight from the fetch loop, so it overlaps
+    the network instead of waiting for the last article. Items arrive in completion order.
+    """
+    cfg = yaml.safe_load(SOURCES.read_text(encoding="utf-8"))
+    cache, store = HttpCache(), CandidateStore()
+    pool = ProcessPoolExecutor(max_workers=max(1, workers))
+    futures, lock, finished = [], threading.Lock(), threading.Semaphore(0)
+    counts, errors = {"emitted": 0, "failed": 0}, []
+
+    def emit(it, text, failed=False):
+        # runs on the pool's callback thread, where exceptions would only be logged: keep them for the caller
+        try:
+            it["text"] = text
+            store.upsert(it)
+            on_item(it)
+            with lock:
+                counts["emitted"] += 1; counts["failed"] += failed
+        except Exception as e:
+            errors.append(e)
+
+    def done(it, fut):
+        try:
+            text = fut.result()
+        except Exception:  # worker crash / broken pool: keep the item, like extract() does for bad input
+            emit(it, "", failed=True)
+        else:
+            emit(it, text)
+        finished.release()
+
+    def on_body(it, body):
+        if STORE_RAW: save_raw(it["url"], body)
+        try:
+            fut = pool.submit(extract, body, **EXTRACT_SETTINGS)
+        except Exception:  # the pool is broken; later items still reach the store, without text
+            return emit(it, "", failed=True)
+        fut.add_done_callback(lambda f, it=it: done(it, f))
+        futures.append(fut)
+
+    t0 = time.perf_counter()
+    try:
+        asyncio.run(collect_async(cfg.get("sources", []), cache, on_body))
+        for _ in futures: finished.acquire()  # callbacks, not just results: wait() returns before they run
+    finally:
+        pool.shutdown()
+        cache.stats.report()
+        cache.close()
+        store.close()
+    if errors:
+        raise RuntimeError(f"{len(errors)} items could not be stored or emitted") from errors[0]
+    print(f"Collected {counts['emitted']} items in {time.perf_counter() - t0:.1f}s (streaming"
+          + (f"; extraction failed for {counts['failed']}, kept without text" if counts["failed"] else "") + ")")
 
 if __name__ == "__main__":
     main()
@@ -1,34 +1,29 @@
-import os, json, re, yaml, time
+import os, sys, json, re, time
 from pathlib import Path
 from datetime import datetime, timezone
-import google.generativeai as genai
+from concurrent.futures import ThreadPoolExecutor
+
+if __package__ in (None, ""):  # allow `python app/editorial/...` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app.sections import get_classifier
+from app.llm import STATS as LLM_STATS, complete, coerce_json
+from app.prompt_pack import STATS as PACK_STATS, compress, count_tokens
 
 CAND = Path("data/candidates.jsonl")
-SECS = yaml.safe_load(Path("config/sections.yaml").read_text(encoding="utf-8"))
 OUT  = Path(os.getenv("TOP_FILE", "data/selected.json"))
 TOP_N = int(os.getenv("TOP_PER_SECTION", "5"))                # choose 5 or 10
 SHORTLIST = int(os.getenv("SHORTLIST_PER_SECTION", "30"))     # candidates shown to LLM
-PAUSE = float(os.getenv("SELECTOR_PAUSE_SECONDS", "0.6"))
+INPUT_TOKENS = int(os.getenv("SELECTOR_INPUT_TOKENS", "3500"))  # cap on excerpt tokens per section prompt
+EXCERPT_TOKENS = int(os.getenv("SELECTOR_EXCERPT_TOKENS", "90"))  # per candidate, before the cap is split
+WORKERS = int(os.getenv("SELECTOR_WORKERS", "6"))             # sections prompted in parallel (1 = serial)
 DOMAIN_CAP = int(os.getenv("DOMAIN_CAP_PER_SECTION", "2"))    # diversity within a section
 
-# Configure Gemini
-genai.configure(api_key=os.environ["GEMINI_API_KEY"])
-model = genai.GenerativeModel(os.getenv("GEMINI_MODEL", "gemini-2.0-flash"))
-
 def llm_chat(system_prompt: str, user_prompt: str, max_tokens: int = 800, temperature: float = 0.2) -> str:
-    """Return model text using Gemini Flash."""
+    """Return model text from the configured backend (app/llm.py); "" on failure."""
     try:
-        response = model.generate_content(
-            user_prompt,
-            generation_config=genai.types.GenerationConfig(
-                temperature=temperature,
-                top_p=0.9,
-                max_output_tokens=max_tokens,
-            )
-        )
-        return response.text or ""
+        return complete(user_prompt, max_tokens, temperature, system=system_prompt)
     except Exception as e:
-        print(f"Gemini API error: {str(e)[:100]}...")
+        print(f"LLM error: {str(e)[:100]}...")
         return ""
 
 def days_old(iso):
@@ -41,29 +36,10 @@ def days_old(iso):
 def domain(u):
     m = re.search(r"https?://([^/]+)/?", u or ""); return m.group(1).lower() if m else "unknown"
 
-def assign_section(item):
-    text = (item.get("title","") + " " + item.get("text","")).lower()
-    url  = item.get("url",""); src = item.get("source","")
-    best = None; best_s = -1
-    for s in SECS["sections"]:
-        sc = 0.0
-        for d in s["match"]["domains"]:
-            if d in url: sc += 2.5
-        for name in s["match"]["sources"]:
-            if name.lower() in src.lower(): sc += 2.0
-        for kw in s["match"]["keywords"]:
-            if kw.lower() in text: sc += 1.0
-        if sc > best_s: best, best_s = s, sc
-    return best or next(x for x in SECS["sections"] if x["id"]=="applied")
-
-def load_candidates():
-    items=[]
-    for line in CAND.read_text(encoding="utf-8").splitlines():
-        if not line.strip(): continue
-        it = json.loads(line)
-        sec = assign_section(it)
+def load_candidates(path=CAND):
+    items = [json.loads(l) for l in path.read_text(encoding="utf-8").splitlines() if l.strip()]
+    for it, sec in zip(items, get_classifier().classify_many(items)):
         it["section_id"]=sec["id"]; it["section_title"]=sec["title"]; it["section_index"]=sec["index"]
-        items.append(it)
     return items
 
 SYS = ("You are an editor for data platform, ML platform, AIOps, and SRE leaders. "
@@ -74,13 +50,17 @@ SYS = ("You are an editor for data platform, ML platform, AIOps, and SRE leaders
        "with keys 'picks' (array of indices) and 'reasons' (map index->short reason). No other text.")
 
 def build_prompt(section_title, shortlist, n):
-    lines=[]
+    lines=[]; raw = sent = 0
+    per_item = min(EXCERPT_TOKENS, INPUT_TOKENS // max(1, len(shortlist)))
     for i, it in enumerate(shortlist, 1):
-        excerpt = (it.get("text","") or "")[:600].replace("\n"," ")
+        text = it.get("text","") or ""
+        excerpt = compress(text[:3000], per_item).replace("\n"," ")  # best sentences, not just the lead
+        raw += count_tokens(text[:600]); sent += count_tokens(excerpt)
         lines.append(
             f"{i}. title={it['title']} | source={it['source']} | date={it['published']} | url={it['url']}\n"
             f"   excerpt: {excerpt}"
         )
+    PACK_STATS.record("selector excerpts", raw, sent)
     return f"""Section: {section_title}
 Pick exactly {n}.
 
@@ -93,13 +73,6 @@ Return JSON:
   "reasons": {{"<index>":"<why useful for leaders>"}}
 }}"""
 
-def coerce_json(s):
-    s = re.sub(r"^```(json)?\s*|\s*```$", "", (s or "").strip(), flags=re.I)
-    s = re.sub(r"<think>.*?</think>", "", s, flags=re.S|re.I)
-    m = re.search(r"\{.*\}", s, flags=re.S)
-    try: return json.loads(m.group(0) if m else s)
-    except Exception: return {}
-
 def select_for_section(section, items, n):
     # shortlist: recent first, then longer articles
     short = sorted(items, key=lambda x: (days_old(x["published"]), -len(x.get("text",""))))[:SHORTLIST]
@@ -136,24 +109,32 @@ def select_for_section(section, items, n):
     reasons = data.get("reasons") or {}
     for i, it in enumerate(chosen, 1):
         it["editor_reason"] = reasons.get(str(i)) or reasons.get(str(i).zfill(1), "")
-
-    time.sleep(PAUSE)
     return chosen
 
-def main():
-    all_items = load_candidates()
+def select(all_items, n=TOP_N, workers=WORKERS):
+    """Pick the top n items per section (items must already carry section_id), in section order.
+
+    Sections are prompted concurrently; results are collected in `order` regardless of finish order.
+    """
+    clf = get_classifier()
     by_sec = {}
     for it in all_items:
         by_sec.setdefault(it["section_id"], []).append(it)
 
-    out=[]
-    for sid in SECS["order"]:
-        section = next(s for s in SECS["sections"] if s["id"]==sid)
-        out.extend(select_for_section(section, by_sec.get(sid, []), TOP_N))
-
-    OUT.parent.mkdir(parents=True, exist_ok=True)
-    OUT.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
-    print(f"Wrote {OUT} with {len(out)} items (Top {TOP_N} per section)")
+    run = lambda sid: select_for_section(clf.by_id[sid], by_sec.get(sid, []), n)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(run, clf.order))
+    return [it for chosen in results for it in chosen]
+
+def main(src=CAND, dst=OUT):
+    t0 = time.perf_counter()
+    out = select(load_candidates(src))
+    print(f"Selected in {time.perf_counter() - t0:.1f}s")
+    print(LLM_STATS.report())
+    print(PACK_STATS.report())
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.write_text(json.dumps(out, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Wrote {dst} with {len(out)} items (Top {TOP_N} per section)")
 
 if __name__ == "__main__":
     main()
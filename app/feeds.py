@@ -0,0 +1,262 @@
+"""Feeds and sitemaps for the published issues, written by build_issue.py.
+
+    feed.xml                RSS 2.0, one entry per issue (the weekly digest)
+    atom.xml                Atom, one entry per linked item
+    feed.json               JSON Feed 1.1, one entry per issue with its items under "_pipelineops"
+    sitemap.xml             sitemap index of the files below
+    sitemaps/core.xml       home page, archive listings, section and source pages
+    sitemaps/issues-<year>.xml
+
+The issue store is data/issues/ (app/archive.py); before the first snapshot the
+current selection is published as a single issue. Every file is streamed entry by
+entry (XMLGenerator, one json.dumps per entry) into a temporary file that replaces
+the old one, so no feed is held in memory as one string.
+
+Feed dates come from the issues, never from the clock, and each output is keyed on
+the bytes of the snapshots it covers (.feeds-manifest.json). A build that adds no
+issue leaves the files and their mtimes untouched, so Last-Modified/ETag stay
+stable and feed readers and crawlers get 304s. Past years' issue sitemaps never
+change once the year is over.
+"""
+import os, re, sys, json, hashlib
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from pathlib import Path
+from xml.sax.saxutils import XMLGenerator
+from xml.sax.xmlreader import AttributesImpl
+from dateutil import parser as dateparser
+
+if __package__ in (None, ""):  # allow `python app/feeds.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+FEED_ISSUES = int(os.getenv("FEED_ISSUES", "20"))   # newest issues kept in feed.xml / atom.xml / feed.json
+TITLE = "PipelineOps Weekly"
+FORMAT_VERSION = 1                                  # bump to force a rebuild after changing the writers
+
+# -------- streaming writers
+@contextmanager
+def atomic(path: Path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+        yield f
+    tmp.replace(path)
+
+class Xml:
+    def __init__(self, f):
+        self.gen = XMLGenerator(f, "utf-8", short_empty_elements=True)
+        self.gen.startDocument()
+
+    def start(self, name, text_follows=False, **attrs):
+        self.gen.startElement(name, AttributesImpl({k.replace("__", ":"): v for k, v in attrs.items()}))
+        if not text_follows: self.gen.ignorableWhitespace("\n")
+
+    def end(self, name):
+        self.gen.endElement(name)
+        self.gen.ignorableWhitespace("\n")
+
+    def el(self, name, text=None, **attrs):
+        self.start(name, text_follows=True, **attrs)
+        if text: self.gen.characters(str(text))
+        self.gen.endElement(name)
+        self.gen.ignorableWhitespace("\n")
+
+# -------- issue helpers
+def utc(value, default=None) -> datetime:
+    try: dt = dateparser.isoparse(value) if isinstance(value, str) else value
+    except (ValueError, TypeError): return default
+    if dt is None: return default
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+def issue_url(site_url, issue) -> str:
+    return f"{site_url}issues/{issue['week']}/" if issue.get("archived") else site_url
+
+def item_id(site_url, item) -> str:
+    return item.get("url") or f"{site_url}#{re.sub(r'[^a-z0-9]+', '-', item.get('title', '').lower()).strip('-')}"
+
+def issue_html(issue) -> str:
+    """Small per-issue summary for the feed body: one line per item."""
+    from markupsafe import escape
+    rows = []
+    for it in issue["items"]:
+        title = escape(it.get("title", ""))
+        link = f'<a href="{escape(it["url"])}">{title}</a>' if it.get("url") else f"<b>{title}</b>"
+        rows.append(f"<li>{link} — {escape(it.get('source', ''))}</li>")
+    return f"<ul>{''.join(rows)}</ul>"
+
+def issue_title(issue) -> str:
+    return f"{TITLE} | Issue {issue['week']}"
+
+# -------- feeds
+def write_rss(path, issues, site_url):
+    with atomic(path) as f:
+        x = Xml(f)
+        x.start("rss", version="2.0", xmlns__atom="http://www.w3.org/2005/Atom")
+        x.start("channel")
+        x.el("title", TITLE)
+        x.el("link", site_url)
+        x.el("description", "Weekly field notes on data pipeline reliability, AIOps and ML anomaly detection.")
+        x.el("language", "en")
+        x.el("atom:link", href=f"{site_url}feed.xml", rel="self", type="application/rss+xml")
+        if issues: x.el("lastBuildDate", format_datetime(issues[0]["date"]))
+        for issue in issues:
+            x.start("item")
+            x.el("title", issue_title(issue))
+            x.el("link", issue_url(site_url, issue))
+            x.el("guid", f"{site_url}issues/{issue['week']}/", isPermaLink="true" if issue.get("archived") else "false")
+            x.el("pubDate", format_datetime(issue["date"]))
+            x.el("description", issue_html(issue))
+            x.end("item")
+        x.end("channel")
+        x.end("rss")
+
+def write_atom(path, issues, site_url):
+    with atomic(path) as f:
+        x = Xml(f)
+        x.start("feed", xmlns="http://www.w3.org/2005/Atom")
+        x.el("title", TITLE)
+        x.el("id", site_url)
+        x.el("link", href=site_url)
+        x.el("link", href=f"{site_url}atom.xml", rel="self")
+        if issues: x.el("updated", issues[0]["date"].isoformat())
+        x.start("author"); x.el("name", TITLE); x.end("author")
+        for issue in issues:
+            for it in issue["items"]:
+                x.start("entry")
+                x.el("title", it.get("title", ""))
+                x.el("id", item_id(site_url, it))
+                x.el("link", href=it.get("url") or issue_url(site_url, issue))
+                x.el("link", href=issue_url(site_url, issue), rel="related", title=issue_title(issue))
+                x.el("updated", issue["date"].isoformat())
+                published = utc(it.get("published"))
+                if published: x.el("published", published.isoformat())
+                x.el("category", term=it.get("section_id") or "other")
+                if it.get("source"): x.start("source"); x.el("title", it["source"]); x.end("source")
+                summary = " ".join(p for p in (it.get("summary_p1"), it.get("summary_p2")) if p)
+                if summary: x.el("summary", summary)
+                x.end("entry")
+        x.end("feed")
+
+def write_json_feed(path, issues, site_url):
+    with atomic(path) as f:
+        head = {"version": "https://jsonfeed.org/version/1.1", "title": TITLE, "home_page_url": site_url,
+                "feed_url": f"{site_url}feed.json", "language": "en"}
+        f.write(json.dumps(head, ensure_ascii=False)[:-1] + ',"items":[\n')
+        for n, issue in enumerate(issues):
+            entry = {
+                "id": f"{site_url}issues/{issue['week']}/", "url": issue_url(site_url, issue),
+                "title": issue_title(issue), "date_published": issue["date"].isoformat(),
+                "content_html": issue_html(issue),
+                "_pipelineops": {"week": issue["week"], "items": [{
+                    "id": item_id(site_url, it), "url": it.get("url") or None, "title": it.get("title", ""),
+                    "source": it.get("source", ""), "section": it.get("section_id") or "other",
+                    "date_published": (utc(it.get("published")) or issue["date"]).isoformat(),
+                    "summary": " ".join(p for p in (it.get("summary_p1"), it.get("summary_p2")) if p),
+                } for it in issue["items"]]},
+            }
+            f.write(("," if n else "") + json.dumps(entry, ensure_ascii=False) + "\n")
+        f.write("]}\n")
+
+# -------- sitemaps
+def write_urlset(path, urls):
+    """urls: iterable of (loc, lastmod date string)."""
+    with atomic(path) as f:
+        x = Xml(f)
+        x.start("urlset", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9")
+        for loc, lastmod in urls:
+            x.start("url"); x.el("loc", loc); x.el("lastmod", lastmod); x.end("url")
+        x.end("urlset")
+
+def write_sitemap_index(path, sitemaps):
+    with atomic(path) as f:
+        x = Xml(f)
+        x.start("sitemapindex", xmlns="http://www.sitemaps.org/schemas/sitemap/0.9")
+        for loc, lastmod in sitemaps:
+            x.start("sitemap"); x.el("loc", loc); x.el("lastmod", lastmod); x.end("sitemap")
+        x.end("sitemapindex")
+
+# -------- incremental driver
+def sha(*parts) -> str:
+    h = hashlib.sha256()
+    for p in parts: h.update(p if isinstance(p, bytes) else json.dumps(p, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+def load_issue(path: Path, archived=True) -> dict:
+    issue = json.loads(path.read_text(encoding="utf-8"))
+    issue["date"], issue["archived"] = utc(issue["generated_at"]), archived
+    return issue
+
+def write_feeds(current_items: list, site_url: str, out_dir: Path, generated: datetime) -> dict:
+    """Rewrite the feeds and sitemaps whose covered issues changed; returns {file: "written"/"unchanged"}."""
+    from app.archive import ISSUES_DIR, MANIFEST
+    from app.candidate_store import iso_week
+
+    state_path = out_dir / ".feeds-manifest.json"
+    try: state = json.loads(state_path.read_text(encoding="utf-8"))
+    except Exception: state = {}
+    new_state, result = {}, {}
+
+    def step(name, key, write, lastmod=None):
+        """Run write(path) unless name was last written from the same key; lastmod() is kept for the index."""
+        old = state.get(name, {})
+        if old.get("key") == key and (out_dir / name).exists():
+            new_state[name], result[name] = old, "unchanged"
+        else:
+            write(out_dir / name)
+            new_state[name], result[name] = {"key": key, "lastmod": lastmod() if lastmod else None}, "written"
+        return new_state[name]["lastmod"]
+
+    paths = sorted(ISSUES_DIR.glob("*.json")) if ISSUES_DIR.exists() else []
+    archived = (out_dir / "archive" / "index.html").exists()  # issue pages only exist once archive.py has built them
+    if paths:
+        newest = paths[-FEED_ISSUES:][::-1]
+        key = sha(FORMAT_VERSION, site_url, archived, [p.read_bytes() for p in newest])
+        load = lambda: [load_issue(p, archived) for p in newest]
+    else:  # no snapshots yet: the current selection is the only issue
+        key = sha(FORMAT_VERSION, site_url, current_items)
+        load = lambda: [{"week": iso_week(generated.timestamp()), "items": current_items,
+                         "date": generated.astimezone(timezone.utc), "archived": False}]
+    loaded = []
+    def issues():  # parsed only if a feed has to be rewritten
+        if not loaded: loaded.extend(load())
+        return loaded
+    newest_date = step("feed.xml", key, lambda p: write_rss(p, issues(), site_url),
+                       lambda: issues()[0]["date"].strftime("%Y-%m-%d") if issues() else None)
+    step("atom.xml", key, lambda p: write_atom(p, issues(), site_url))
+    step("feed.json", key, lambda p: write_json_feed(p, issues(), site_url))
+
+    # one issue sitemap per ISO year, so closed years are never rewritten
+    by_year = {}
+    for p in paths if archived else []:
+        by_year.setdefault(p.stem[:4], []).append(p)
+    sitemaps = []
+    for year, year_paths in sorted(by_year.items()):
+        name = f"sitemaps/issues-{year}.xml"
+        year_issues = []
+        def write_year(out, year_paths=year_paths, year_issues=year_issues):
+            def urls():
+                for p in year_paths:
+                    issue = load_issue(p)
+                    year_issues.append(issue["generated_at"][:10])
+                    yield issue_url(site_url, issue), issue["generated_at"][:10]
+            write_urlset(out, urls())
+        lastmod = step(name, sha(FORMAT_VERSION, site_url, [p.read_bytes() for p in year_paths]), write_year,
+                       lambda year_issues=year_issues: max(year_issues))
+        sitemaps.append((f"{site_url}{name}", lastmod))
+
+    try: pages = sorted(json.loads(MANIFEST.read_text(encoding="utf-8"))["pages"]) if archived else []
+    except Exception: pages = []
+    latest = max([d for _, d in sitemaps if d] + [newest_date or generated.strftime("%Y-%m-%d")])
+    core = [(site_url, latest)] + [(f"{site_url}{p.rsplit('/', 1)[0]}/", latest) for p in pages
+                                   if not p.startswith("issues/")]
+    step("sitemaps/core.xml", sha(FORMAT_VERSION, core), lambda p: write_urlset(p, core))
+    sitemaps.insert(0, (f"{site_url}sitemaps/core.xml", latest))
+    step("sitemap.xml", sha(FORMAT_VERSION, sitemaps), lambda p: write_sitemap_index(p, sitemaps))
+
+    for stale in set(state) - set(new_state):  # e.g. a year whose snapshots were removed
+        (out_dir / stale).unlink(missing_ok=True)
+    state_path.write_text(json.dumps(new_state, indent=1, sort_keys=True), encoding="utf-8")
+    written = [n for n, r in result.items() if r == "written"]
+    print(f"Feeds: {len(written)} of {len(result)} files rewritten" + (f" ({', '.join(written)})" if written else ""))
+    return result
@@ -0,0 +1,293 @@
+"""LLM backends shared by the selector and both summarizers.
+
+    LLM_BACKEND=gemini   google.generativeai (GEMINI_API_KEY, GEMINI_MODEL)
+    LLM_BACKEND=openai   any OpenAI-compatible /chat/completions endpoint
+                         (OPENAI_BASE_URL, OPENAI_API_KEY, OPENAI_MODEL)
+    LLM_BACKEND=local    deterministic stand-in with configurable latency and 429s,
+                         for offline runs and load tests (alias: fake)
+
+Each backend is created once per process and keeps its client (gRPC channel or
+pooled keep-alive HTTP connections) for every call. generate() returns the full
+text; stream() yields chunks as they arrive. Both record per-call latency and
+time-to-first-token in STATS.
+
+complete() is what callers use: it waits on the shared RPM/TPM limiter and the
+shared 429 cool-down, retries rate-limited calls, and counts tokens. `system` is sent
+the way each API expects it: Gemini's system_instruction, a system message for
+OpenAI-compatible servers, and prepended to the prompt for the local backend.
+"""
+import os, re, sys, json, time, random, hashlib, threading
+from pathlib import Path
+from functools import lru_cache
+
+if __package__ in (None, ""):  # allow `python app/llm.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.ratelimit import llm_limiter, is_rate_limited, AdaptiveBackoff
+from app.prompt_pack import count_tokens
+
+BACKEND = os.getenv("LLM_BACKEND", "gemini")
+RETRIES = int(os.getenv("LLM_RATE_RETRIES", "5"))            # attempts per call after a 429
+STREAM = os.getenv("LLM_STREAM", "0") == "1"                  # stream responses (measures time to first token)
+TIMEOUT = float(os.getenv("LLM_TIMEOUT_SECONDS", "120"))
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+OPENAI_POOL = int(os.getenv("OPENAI_POOL_SIZE", "8"))         # keep-alive connections
+LOCAL_LATENCY = float(os.getenv("FAKE_LLM_LATENCY", "1.0"))   # mean seconds per call
+LOCAL_429_RATE = float(os.getenv("FAKE_LLM_429_RATE", "0.0")) # share of calls answered with 429
+LOCAL_SEED = int(os.getenv("FAKE_LLM_SEED", "0"))
+
+class RateLimitError(Exception):
+    """A 429 from an HTTP backend or the local stand-in."""
+
+# --- JSON helpers (models wrap JSON in fences or reasoning tags) ---
+def strip_code_fences(s: str) -> str:
+    s = (s or "").strip()
+    s = re.sub(r"^```(json)?\s*|\s*```$", "", s, flags=re.IGNORECASE)
+    # strip potential <think>…</think> or similar reasoning wrappers
+    s = re.sub(r"<think>.*?</think>", "", s, flags=re.DOTALL | re.IGNORECASE)
+    return s.strip()
+
+def coerce_json(payload: str) -> dict:
+    s = strip_code_fences(payload)
+    try:
+        return json.loads(s)
+    except Exception:
+        pass
+    # try to extract the largest {...} block
+    m = re.search(r"\{.*\}", s, flags=re.DOTALL)
+    if m:
+        try:
+            return json.loads(m.group(0))
+        except Exception:
+            pass
+    return {}
+
+# --- Metrics ---
+class CallStats:
+    def __init__(self):
+        self.calls = self.retries = self.errors = self.prompt_tokens = self.output_tokens = 0
+        self.waited = 0.0
+        self.latencies, self.first_tokens = [], []
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for k, v in counts.items(): setattr(self, k, getattr(self, k) + v)
+
+    def timing(self, latency: float, first_token: float = None):
+        with self._lock:
+            self.latencies.append(latency)
+            if first_token is not None: self.first_tokens.append(first_token)
+
+    def report(self) -> str:
+        pct = lambda xs, q: sorted(xs)[min(len(xs) - 1, int(q * len(xs)))] if xs else 0.0
+        line = (f"LLM {BACKEND}: {self.calls} calls, {self.retries} rate-limit retries, {self.errors} errors, "
+                f"{self.prompt_tokens:,} in / {self.output_tokens:,} out tokens, "
+                f"latency p50 {pct(self.latencies, 0.5):.2f}s p95 {pct(self.latencies, 0.95):.2f}s")
+        if self.first_tokens: line += f", first token p50 {pct(self.first_tokens, 0.5):.2f}s"
+        return line + f", {self.waited:.1f}s waiting on limits"
+
+STATS = CallStats()
+BACKOFF = AdaptiveBackoff()
+
+# --- Backends ---
+class Backend:
+    name = model = ""
+
+    def generate(self, prompt: str, max_tokens: int, temperature: float, system: str = "") -> str:
+        t0 = time.perf_counter()
+        try:
+            return self._generate(prompt, max_tokens, temperature, system)
+        finally:
+            STATS.timing(time.perf_counter() - t0)
+
+    def stream(self, prompt: str, max_tokens: int, temperature: float, system: str = ""):
+        t0 = time.perf_counter(); first = None
+        try:
+            for chunk in self._stream(prompt, max_tokens, temperature, system):
+                if first is None: first = time.perf_counter() - t0
+                yield chunk
+        finally:
+            STATS.timing(time.perf_counter() - t0, first)
+
+    def _generate(self, prompt, max_tokens, temperature, system):
+        return "".join(self._stream(prompt, max_tokens, temperature, system))
+
+    def _stream(self, prompt, max_tokens, temperature, system):
+        yield self._generate(prompt, max_tokens, temperature, system)
+
+class GeminiBackend(Backend):
+    name = "gemini"
+
+    def __init__(self, model: str = GEMINI_MODEL):
+        import google.generativeai as genai
+        genai.configure(api_key=os.environ["GEMINI_API_KEY"])
+        self.genai = genai
+        self.model = model
+        self._clients, self._lock = {}, threading.Lock()
+
+    def client(self, system):
+        """One GenerativeModel per system instruction (it is fixed when the model object is built)."""
+        with self._lock:
+            if system not in self._clients:
+                self._clients[system] = self.genai.GenerativeModel(self.model, system_instruction=system or None)
+            return self._clients[system]
+
+    def _config(self, max_tokens, temperature):
+        return self.genai.types.GenerationConfig(temperature=temperature, top_p=0.9, max_output_tokens=max_tokens)
+
+    def _generate(self, prompt, max_tokens, temperature, system):
+        response = self.client(system).generate_content(prompt, generation_config=self._config(max_tokens, temperature),
+                                                        request_options={"timeout": TIMEOUT})
+        return response.text or ""
+
+    def _stream(self, prompt, max_tokens, temperature, system):
+        for chunk in self.client(system).generate_content(prompt, generation_config=self._config(max_tokens, temperature),
+                                                          stream=True, request_options={"timeout": TIMEOUT}):
+            if chunk.text: yield chunk.text
+
+class OpenAIBackend(Backend):
+    name = "openai"
+
+    def __init__(self, base_url: str = OPENAI_BASE_URL, model: str = OPENAI_MODEL):
+        import httpx
+        self.model = model
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        key = os.getenv("OPENAI_API_KEY", "")  # optional for local servers (vLLM, Ollama, llama.cpp)
+        self.client = httpx.Client(
+            timeout=TIMEOUT,
+            headers={"Authorization": f"Bearer {key}"} if key else {},
+            limits=httpx.Limits(max_connections=OPENAI_POOL, max_keepalive_connections=OPENAI_POOL),
+        )
+
+    def _body(self, prompt, max_tokens, temperature, system, stream):
+        messages = ([{"role": "system", "content": system}] if system else []) + [{"role": "user", "content": prompt}]
+        return {"model": self.model, "messages": messages,
+                "max_tokens": max_tokens, "temperature": temperature, "top_p": 0.9, "stream": stream}
+
+    @staticmethod
+    def _check(response):
+        if response.status_code == 429:
+            raise RateLimitError(f"429 from {response.url.host}: {response.text[:200]}")
+        response.raise_for_status()
+
+    def _generate(self, prompt, max_tokens, temperature, system):
+        r = self.client.post(self.url, json=self._body(prompt, max_tokens, temperature, system, False))
+        self._check(r)
+        return r.json()["choices"][0]["message"].get("content") or ""
+
+    def _stream(self, prompt, max_tokens, temperature, system):
+        with self.client.stream("POST", self.url, json=self._body(prompt, max_tokens, temperature, system, True)) as r:
+            if r.status_code >= 400: r.read()
+            self._check(r)
+            for line in r.iter_lines():
+                if not line.startswith("data:"): continue
+                data = line[5:].strip()
+                if data == "[DONE]": break
+                delta = (json.loads(data).get("choices") or [{}])[0].get("delta", {}).get("content")
+                if delta: yield delta
+
+class LocalBackend(Backend):
+    """Deterministic for a given prompt: selector prompts get valid picks/reasons, summary prompts get
+    summary_p1/summary_p2 of about the requested length (batch prompts one per `### id=` block)."""
+    name = "local"
+
+    def __init__(self, latency: float = LOCAL_LATENCY, rate_429: float = LOCAL_429_RATE, seed: int = LOCAL_SEED):
+        self.model = f"local-{latency:g}s"
+        self.latency = latency
+        self.rate_429 = rate_429
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _draw(self):
+        with self._lock:
+            return self.latency * (0.5 + self._rng.random()), self._rng.random() < self.rate_429
+
+    def _generate(self, prompt, max_tokens, temperature, system):
+        delay, limited = self._draw()
+        time.sleep(delay / 10 if limited else delay)
+        if limited: raise RateLimitError("429 Resource has been exhausted (local backend)")
+        return self.respond(f"{system}\n\n{prompt}" if system else prompt, max_tokens)
+
+    def _stream(self, prompt, max_tokens, temperature, system):
+        delay, limited = self._draw()
+        time.sleep(delay / 10 if limited else delay / 4)
+        if limited: raise RateLimitError("429 Resource has been exhausted (local backend)")
+        text = self.respond(f"{system}\n\n{prompt}" if system else prompt, max_tokens)
+        step = max(1, len(text) // 8)
+        for i in range(0, len(text), step):
+            time.sleep(delay * 3 / 4 / 8)
+            yield text[i:i + step]
+
+    @staticmethod
+    def respond(prompt: str, max_tokens: int) -> str:
+        seed = hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+        m = re.search(r"Pick exactly (\d+)\..*?indices from 1\.\.(\d+)", prompt, flags=re.S)
+        if m:
+            n, k = int(m.group(1)), int(m.group(2))
+            order = sorted(range(1, k + 1), key=lambda i: hashlib.sha1(f"{seed}{i}".encode()).digest())
+            picks = order[:n]
+            return json.dumps({"picks": picks, "reasons": {str(p): f"local pick {p}" for p in picks}})
+        m = re.search(r"length ≥ (\d+) tokens", prompt)
+        target = int(m.group(1)) if m else 200
+        ids = re.findall(r"^### id=(\S+)", prompt, flags=re.M)
+        if ids:
+            return json.dumps([{"id": i, **LocalBackend._summary(seed + i, prompt, target)} for i in ids])
+        return json.dumps(LocalBackend._summary(seed, prompt, min(max_tokens, target)))
+
+    @staticmethod
+    def _summary(seed: str, prompt: str, target: int) -> dict:
+        seed = hashlib.sha1(seed.encode("utf-8")).hexdigest()
+        words = target // 2 + 1  # ~one token per generated word
+        vocab = re.findall(r"[A-Za-z]{4,}", prompt)[:200] or ["placeholder"]
+        para = lambda salt: " ".join(vocab[int(seed[i % 40], 16) * (i + salt) % len(vocab)] for i in range(words)) + "."
+        return {"summary_p1": para(1), "summary_p2": para(2)}
+
+BACKENDS = {"gemini": GeminiBackend, "openai": OpenAIBackend, "local": LocalBackend, "fake": LocalBackend}
+
+@lru_cache(maxsize=1)
+def get_backend() -> Backend:
+    """Created on first use so importing callers needs no API key or network."""
+    if BACKEND not in BACKENDS:
+        raise SystemExit(f"Unknown LLM_BACKEND={BACKEND!r}; expected one of {', '.join(BACKENDS)}")
+    return BACKENDS[BACKEND]()
+
+def complete(prompt: str, max_tokens: int, temperature: float = 0.2, retries: int = RETRIES, system: str = "") -> str:
+    """One model call under the shared limiter and 429 cool-down; retries 429s, re-raises anything else."""
+    backend = get_backend()
+    prompt_tokens = count_tokens(prompt) + (count_tokens(system) if system else 0)
+    for attempt in range(retries + 1):
+        waited = BACKOFF.wait() + llm_limiter().acquire(prompt_tokens + max_tokens)
+        STATS.add(calls=1, waited=waited, prompt_tokens=prompt_tokens)
+        try:
+            if STREAM:
+                text = "".join(backend.stream(prompt, max_tokens, temperature, system))
+            else:
+                text = backend.generate(prompt, max_tokens, temperature, system)
+        except Exception as e:
+            if not is_rate_limited(e) or attempt == retries:
+                STATS.add(errors=1)
+                raise
+            STATS.add(retries=1)
+            BACKOFF.penalize()
+            continue
+        BACKOFF.relax()
+        STATS.add(output_tokens=count_tokens(text))
+        return text
+
+if __name__ == "__main__":
+    import argparse
+    from concurrent.futures import ThreadPoolExecutor
+    ap = argparse.ArgumentParser(description="Smoke-test / load-test the configured LLM backend")
+    ap.add_argument("--calls", type=int, default=1)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--prompt", default="Write TWO paragraphs in JSON (keys: summary_p1, summary_p2) "
+                                        "with a COMBINED length ≥ 120 tokens about data pipeline reliability.")
+    args = ap.parse_args()
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        outs = list(pool.map(lambda _: complete(args.prompt, 400), range(args.calls)))
+    print(outs[0][:300])
+    print(f"{args.calls} calls in {time.perf_counter() - t0:.1f}s")
+    print(STATS.report())
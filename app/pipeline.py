@@ -0,0 +1,286 @@
+"""Run the whole newsletter pipeline as a DAG: `python -m app.pipeline`.
+
+    collect_rss ─┐                       ┌─ rank (data/top10.json)
+                 ├─ export ─ dedup ──────┤                    ┌─ archive ─┐
+    collect_arxiv┘                       └─ select ─ summarize ┴───────────┴─ build
+
+Stages whose dependencies are done run in parallel on a thread pool (the two
+collectors, and the ranker alongside selection). Each stage declares the files it
+reads (data, config and its own code) and the env vars it depends on; their
+sha256 is recorded in data/pipeline_state.json after a successful run, together
+with the hashes of what it wrote. A stage is skipped when that key is unchanged
+and its outputs are still as it left them, so rerunning after a template edit
+only rebuilds the site, and a collection that brings nothing new stops at dedup.
+
+Collectors read the network, so they always run unless PIPELINE_COLLECT_TTL_HOURS
+says their last run is recent enough (or --offline skips them). With --stream the
+collect → export → dedup → rank chain is replaced by one `stream` stage in which
+items flow through dedup, sections, embedding and scoring while collection is
+still running (app/streaming.py).
+"""
+import os, sys, copy, json, time, hashlib, argparse
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+if __package__ in (None, ""):  # allow `python app/pipeline.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+STATE_FILE = Path(os.getenv("PIPELINE_STATE_FILE", "data/pipeline_state.json"))
+WORKERS = int(os.getenv("PIPELINE_WORKERS", "4"))                            # stages run at once
+COLLECT_TTL = float(os.getenv("PIPELINE_COLLECT_TTL_HOURS", "0")) * 3600     # 0 = always collect
+
+CAND = Path(os.getenv("CANDIDATES_FILE", "data/candidates.jsonl"))
+DEDUPED = Path("data/deduped.jsonl")
+CLUSTERS = Path(os.getenv("DEDUP_CLUSTERS_FILE", "data/dedup_clusters.json"))
+TOP10 = Path("data/top10.json")
+PICKS = Path("data/picks.json")          # selector output before summaries are added
+SELECTED = Path(os.getenv("TOP_FILE", "data/selected.json"))
+ISSUES = Path(os.getenv("ISSUES_DIR", "data/issues"))  # weekly snapshots: written by archive, read by build
+SITE = [Path("site/dist/index.html"), Path("site/dist/sitemap.xml"), Path("site/dist/robots.txt"),
+        Path("site/dist/llms.txt"), Path("site/dist/feed.xml"), Path("site/dist/atom.xml"), Path("site/dist/feed.json"),
+        Path("site/dist/sitemaps"), Path("site/dist/search"), Path("site/dist/assets"), Path("site/dist/_headers")]
+
+LLM_ENV = ("LLM_BACKEND", "GEMINI_MODEL", "OPENAI_BASE_URL", "OPENAI_MODEL")
+LLM_CODE = ["app/llm.py", "app/prompt_pack.py"]  # prompts are built and packed here for every LLM stage
+SITE_CODE = ["app/build_issue.py", "app/archive.py", "app/render.py", "app/assets.py", "app/feeds.py",
+             "app/search_index.py", "app/sections.py"]  # both site stages import all of these
+SITE_ENV = ("SITE_URL", "ASSET_MINIFY", "ASSET_COMPRESS_MIN_BYTES", "ASSET_BROTLI_QUALITY")
+
+# -------- stage bodies (modules are imported lazily so `--list` stays fast)
+def collect_rss():
+    from app.collector import rss_collect
+    rss_collect.main(export=False)
+
+def collect_arxiv():
+    from app.collector import arxiv_api_collect
+    arxiv_api_collect.main(export=False)
+
+def export():
+    from app.candidate_store import STORE_FILE, CandidateStore
+    if not STORE_FILE.exists():  # nothing collected yet: keep the committed candidates
+        print(f"Export: no {STORE_FILE}, keeping {CAND}")
+        return
+    store = CandidateStore()
+    n = store.export_jsonl(CAND)
+    store.close()
+    print(f"Export: wrote {CAND} with {n} items")
+
+def run_dedup():
+    from app.scorer.dedup import dedup
+    items = [json.loads(l) for l in CAND.read_text(encoding="utf-8").splitlines() if l.strip()]
+    kept, clusters = dedup(items)
+    DEDUPED.write_text("".join(json.dumps(it, ensure_ascii=False) + "\n" for it in kept), encoding="utf-8")
+    CLUSTERS.write_text(json.dumps(clusters, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Dedup: kept {len(kept)}/{len(items)} ({len(clusters)} clusters) → {DEDUPED}")
+
+def rank():
+    from app.scorer import semantic_rank
+    semantic_rank.main(DEDUPED, TOP10)
+
+def select():
+    from app.editorial import select_topN_per_section
+    select_topN_per_section.main(DEDUPED, PICKS)
+
+def summarize():
+    from app.summarizer import gemini_summary
+    gemini_summary.main(PICKS, SELECTED)
+
+def build():
+    from app import build_issue
+    build_issue.main(SELECTED)
+
+def snapshot_archive():
+    from app import archive
+    archive.snapshot(data_path=SELECTED)
+    archive.build()
+
+def stream():
+    from app import streaming
+    streaming.run(collect=True, deduped_path=DEDUPED, clusters_path=CLUSTERS, top_path=TOP10)
+
+def stream_offline():
+    from app import streaming
+    streaming.run(collect=False, deduped_path=DEDUPED, clusters_path=CLUSTERS, top_path=TOP10)
+
+class Stage:
+    def __init__(self, name, fn, deps=(), inputs=(), outputs=(), env=(), always=False, ttl=None):
+        self.name, self.fn, self.deps = name, fn, tuple(deps)
+        self.inputs, self.outputs, self.env = [Path(p) for p in inputs], [Path(p) for p in outputs], tuple(env)
+        self.always, self.ttl = always, ttl
+
+STAGES = [
+    Stage("collect_rss", collect_rss, inputs=["config/sources.yaml", "app/collector/rss_collect.py"],
+          env=("RSS_FETCH_MODE",), ttl=COLLECT_TTL),
+    Stage("collect_arxiv", collect_arxiv, inputs=["config/arxiv.yaml", "app/collector/arxiv_api_collect.py"],
+          ttl=COLLECT_TTL),
+    Stage("export", export, deps=["collect_rss", "collect_arxiv"], outputs=[CAND], always=True),
+    Stage("dedup", run_dedup, deps=["export"], inputs=[CAND, "app/scorer/dedup.py"], outputs=[DEDUPED, CLUSTERS],
+          env=("DEDUP_TITLE_THRESHOLD", "DEDUP_JACCARD", "DEDUP_CONFIRM_JACCARD", "DEDUP_TEXT_PREFIX", "DEDUP_EXACT_MAX")),
+    Stage("rank", rank, deps=["dedup"], inputs=[DEDUPED, "config/weights.yaml", "app/scorer/semantic_rank.py"],
+          outputs=[TOP10], env=("RANK_TOP_K", "RANK_DOMAIN_CAP", "MMR_POOL")),
+    Stage("select", select, deps=["dedup"],
+          inputs=[DEDUPED, "config/sections.yaml", "app/sections.py", "app/editorial/select_topN_per_section.py"] + LLM_CODE,
+          outputs=[PICKS], env=LLM_ENV + ("TOP_PER_SECTION", "SHORTLIST_PER_SECTION", "DOMAIN_CAP_PER_SECTION",
+                                          "SELECTOR_INPUT_TOKENS", "SELECTOR_EXCERPT_TOKENS")),
+    Stage("summarize", summarize, deps=["select"],
+          inputs=[PICKS, "app/summarizer/gemini_summary.py", "app/summarizer/groq_summary.py", "app/summarizer/engine.py",
+                  "app/summarizer/summary_cache.py"] + LLM_CODE,
+          outputs=[SELECTED], env=LLM_ENV + ("SUMMARY_TARGET_TOKENS", "SUMMARY_MAX_CHARS", "SUMMARY_INPUT_TOKENS",
+                                             "SUMMARY_MAX_TOKENS", "SUMMARY_EXPAND_CONTEXT_TOKENS", "SUMMARY_BATCH_SIZE",
+                                             "SUMMARY_BATCH_ARTICLE_TOKENS", "SUMMARY_BATCH_INPUT_TOKENS",
+                                             "SUMMARY_BATCH_MAX_OUTPUT")),
+    # the snapshot is stamped with its write time, so for archive the issues are an output (edits to
+    # them still trigger a rerun) rather than an input that would change on every run
+    Stage("archive", snapshot_archive, deps=["summarize"],
+          inputs=[SELECTED, "data/originals.json", "config/sections.yaml", "site/templates", "site/static"] + SITE_CODE,
+          outputs=[Path("site/dist/.build-manifest.json"), ISSUES], env=SITE_ENV + ("ARCHIVE_PAGE_SIZE",)),
+    Stage("build", build, deps=["summarize", "archive"],
+          inputs=[SELECTED, ISSUES, "data/originals.json", "config/sections.yaml", "site/templates", "site/static"] + SITE_CODE,
+          outputs=SITE, env=SITE_ENV + ("FEED_ISSUES",)),
+]
+BY_NAME = {s.name: s for s in STAGES}
+
+def streaming_graph(offline=False) -> list:
+    """STAGES with collect → export → dedup → rank fused into one streaming stage (app/streaming.py)."""
+    front = [BY_NAME[n] for n in ("collect_rss", "collect_arxiv", "export", "dedup", "rank")]
+    inputs = {str(p) for s in front for p in s.inputs if p != CAND} | {"app/streaming.py", "app/scorer/semantic_rank.py"}
+    fused = Stage("stream", stream_offline if offline else stream,
+                  inputs=sorted(inputs | ({str(CAND)} if offline else set())),  # online, the network is the input
+                  outputs=[DEDUPED, CLUSTERS, TOP10], env=tuple(e for s in front for e in s.env) + ("STREAM_BATCH",),
+                  ttl=None if offline else COLLECT_TTL)
+    rest = []
+    for s in STAGES:
+        if s in front: continue
+        s = copy.copy(s)
+        s.deps = tuple(dict.fromkeys("stream" if d in ("dedup", "rank") else d for d in s.deps))
+        rest.append(s)
+    return [fused] + rest
+
+# -------- content hashing
+def file_hash(path: Path) -> str:
+    if path.is_dir():
+        h = hashlib.sha256()
+        for p in sorted(q for q in path.rglob("*") if q.is_file()):
+            h.update(str(p.relative_to(path)).encode("utf-8") + b"\0" + file_hash(p).encode("ascii"))
+        return h.hexdigest()
+    if not path.exists(): return "missing"
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""): h.update(chunk)
+    return h.hexdigest()
+
+def stage_key(stage: Stage) -> str:
+    h = hashlib.sha256(stage.name.encode("utf-8"))
+    for p in stage.inputs: h.update(f"\0{p}={file_hash(p)}".encode("utf-8"))
+    for k in stage.env: h.update(f"\0{k}={os.getenv(k, '')}".encode("utf-8"))
+    return h.hexdigest()
+
+def load_state() -> dict:
+    try: return json.loads(STATE_FILE.read_text(encoding="utf-8"))
+    except Exception: return {}
+
+def save_state(state: dict):
+    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = STATE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2, sort_keys=True), encoding="utf-8")
+    tmp.replace(STATE_FILE)
+
+def up_to_date(stage: Stage, key: str, prev: dict) -> str:
+    """Reason to skip the stage, or "" if it has to run."""
+    if stage.always or not prev or prev.get("key") != key: return ""
+    if stage.ttl is not None:  # network-bound: only the TTL can make it fresh
+        return "fresh" if time.time() - prev.get("finished", 0) < stage.ttl else ""
+    if any(file_hash(p) != prev.get("outputs", {}).get(str(p)) for p in stage.outputs): return ""
+    return "unchanged"
+
+# -------- scheduler
+def run(stages: list, force=False, workers=WORKERS) -> list:
+    """Run stages (a dependency-closed subset of STAGES, in order); returns timing rows."""
+    state = load_state()
+    wanted = {s.name for s in stages}
+    status, rows = {}, {}
+    t0 = time.perf_counter()
+
+    def execute(stage):
+        key = stage_key(stage)
+        reason = "" if force else up_to_date(stage, key, state.get(stage.name))
+        if reason: return "skipped", reason, 0.0, None, None
+        start = time.perf_counter()
+        stage.fn()
+        secs = time.perf_counter() - start
+        record = {"key": key, "finished": time.time(), "seconds": round(secs, 3),
+                  "outputs": {str(p): file_hash(p) for p in stage.outputs}}
+        return "ran", "", secs, start - t0, record
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        pending = {}
+        while True:
+            for s in stages:
+                if s.name in status or s in pending.values(): continue
+                deps = [d for d in s.deps if d in wanted]
+                if any(status.get(d) in ("failed", "blocked") for d in deps):
+                    status[s.name] = "blocked"; rows[s.name] = (s.name, "blocked", "", 0.0, None)
+                elif all(status.get(d) in ("ran", "skipped") for d in deps):
+                    pending[pool.submit(execute, s)] = s
+            if not pending: break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                s = pending.pop(fut)
+                try:
+                    outcome, note, secs, started, record = fut.result()
+                except (Exception, SystemExit) as e:  # some stage mains SystemExit on missing input
+                    outcome, note, secs, started, record = "failed", f"{type(e).__name__}: {e}", 0.0, None, None
+                    print(f"[pipeline] {s.name} failed: {note}")
+                status[s.name] = outcome
+                rows[s.name] = (s.name, outcome, note, secs, started)
+                if record:
+                    state[s.name] = record
+                    save_state(state)  # a crash later keeps the stages that already finished
+    rows["total"] = ("total", "", "", time.perf_counter() - t0, 0.0)
+    return [rows[s.name] for s in stages if s.name in rows] + [rows["total"]]
+
+def report(rows: list) -> str:
+    lines = [f"{'stage':<14} {'status':<8} {'start':>7} {'seconds':>8}  note"]
+    for name, outcome, note, secs, started in rows:
+        start = f"{started:7.1f}" if started is not None else " " * 7
+        lines.append(f"{name:<14} {outcome:<8} {start} {secs:8.1f}  {note}")
+    busy = sum(r[3] for r in rows[:-1])
+    lines.append(f"stage time {busy:.1f}s in {rows[-1][3]:.1f}s wall")
+    return "\n".join(lines)
+
+def with_deps(names: list, graph: list) -> list:
+    by_name, keep, todo = {s.name: s for s in graph}, set(), list(names)
+    while todo:
+        n = todo.pop()
+        if n not in keep: keep.add(n); todo.extend(by_name[n].deps)
+    return [s for s in graph if s.name in keep]
+
+def main():
+    ap = argparse.ArgumentParser(description="Run the newsletter pipeline, skipping stages whose inputs are unchanged.")
+    ap.add_argument("stages", nargs="*", metavar="stage",
+                    help=f"run only these stages and what they depend on (default: all): {', '.join(BY_NAME)}, or stream")
+    ap.add_argument("--force", action="store_true", help="run every selected stage even if up to date")
+    ap.add_argument("--offline", action="store_true", help="leave out the collectors and use the existing store")
+    ap.add_argument("--stream", action="store_true",
+                    help="stream collection through dedup, sections, embedding and scoring (app/streaming.py)")
+    ap.add_argument("--workers", type=int, default=WORKERS)
+    ap.add_argument("--list", action="store_true", help="show each stage's dependencies and whether it is up to date")
+    args = ap.parse_args()
+    graph = streaming_graph(args.offline) if args.stream else STAGES
+    unknown = [n for n in args.stages if n not in {s.name for s in graph}]
+    if unknown: ap.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    stages = with_deps(args.stages, graph) if args.stages else list(graph)
+    if args.offline: stages = [s for s in stages if not s.name.startswith("collect_")]
+    if args.list:
+        state = load_state()
+        for s in stages:
+            reason = up_to_date(s, stage_key(s), state.get(s.name))
+            print(f"{s.name:<14} after {','.join(s.deps) or '-':<26} {reason or 'stale'}")
+        return
+    rows = run(stages, force=args.force, workers=args.workers)
+    print(report(rows))
+    if any(r[1] in ("failed", "blocked") for r in rows): raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Token-budget prompt packing shared by the selector and summarizers.
+
+count_tokens() approximates a SentencePiece/BPE tokenizer: words up to eight
+letters are one token, longer ones one more per eight letters, digits split in
+groups of three and every symbol counts on its own. On prose it agrees with the old "0.75 words per token"
+rule; unlike it, it does not undercount URLs, numbers and code.
+
+compress() keeps a text under a token budget by extracting its most informative
+sentences (frequent content words across the document, numbers, early position)
+and returning them in their original order.
+"""
+import re, math, threading
+from collections import Counter
+
+PIECE = re.compile(r"[A-Za-z]+|\d{1,3}|[^\sA-Za-z\d]")
+SENTENCE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])|\n{2,}")
+WORD = re.compile(r"[a-z][a-z0-9-]{2,}")
+STOP = frozenset("""the and for with that this from are was were has have had not but you your our their its into
+about over more than also can will would could should which when what where who how they them these those been being
+such there here other some any all each most many much very only just may might one two new use used using""".split())
+
+def count_tokens(text: str) -> int:
+    n = 0
+    for piece in PIECE.findall(text or ""):
+        n += 1 + (len(piece) - 1) // 8 if piece[0].isalpha() else 1
+    return n
+
+def sentences(text: str) -> list:
+    return [s.strip() for s in SENTENCE.split(re.sub(r"[ \t]+", " ", text or "")) if s.strip()]
+
+def compress(text: str, budget: int) -> str:
+    """Return text unchanged if it fits in `budget` tokens, else its best sentences up to the budget."""
+    if budget <= 0: return ""
+    if count_tokens(text) <= budget: return text
+    sents = sentences(text)
+    words = [WORD.findall(s.lower()) for s in sents]
+    df = Counter(w for ws in words for w in set(ws) if w not in STOP)
+    scored = []
+    for i, (s, ws) in enumerate(zip(sents, words)):
+        content = [w for w in ws if w not in STOP]
+        if not content: continue
+        score = sum(math.log1p(df[w]) for w in set(content)) / math.sqrt(len(content))
+        score += 0.5 * bool(re.search(r"\d", s))      # metrics, sizes, versions
+        score += 1.0 / (1 + i)                        # lead sentences carry the gist
+        scored.append((score, i))
+    keep, used = [], 0
+    for _, i in sorted(scored, reverse=True):
+        cost = count_tokens(sents[i])
+        if used + cost > budget: continue
+        keep.append(i); used += cost
+    if not keep:  # nothing fits (one huge sentence): hard-cut at ~4 chars/token
+        return text[:budget * 4]
+    return " ".join(sents[i] for i in sorted(keep))
+
+class PackStats:
+    """Input tokens before and after packing, per prompt kind."""
+    def __init__(self):
+        self.raw, self.sent, self.calls = Counter(), Counter(), Counter()
+        self._lock = threading.Lock()
+
+    def record(self, kind: str, raw: int, sent: int):
+        with self._lock:
+            self.raw[kind] += raw; self.sent[kind] += sent; self.calls[kind] += 1
+
+    def report(self) -> str:
+        if not self.calls: return "Prompt packing: no prompts"
+        parts = []
+        for kind in self.calls:
+            saved = self.raw[kind] - self.sent[kind]
+            pct = 100 * saved / self.raw[kind] if self.raw[kind] else 0
+            parts.append(f"{kind} {self.sent[kind]:,}/{self.raw[kind]:,} tokens over {self.calls[kind]} prompts "
+                         f"(saved {saved:,}, {pct:.0f}%)")
+        return "Prompt packing: " + "; ".join(parts)
+
+STATS = PackStats()
@@ -0,0 +1,75 @@
+"""Rate limiting shared by the collectors and LLM stages."""
+import os, time, random, threading
+from functools import lru_cache
+
+LLM_RPM = float(os.getenv("LLM_RPM", "15"))          # requests per minute across all LLM callers (0 = unlimited)
+LLM_TPM = float(os.getenv("LLM_TPM", "1000000"))     # prompt + max output tokens per minute (0 = unlimited)
+
+class TokenBucket:
+    """Thread-safe token bucket: refills at `rate` tokens/second and banks up to `burst` tokens.
+
+    acquire() reserves tokens up front (the balance may go negative), so concurrent
+    callers queue in arrival order instead of waking together and stampeding.
+    """
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    def acquire(self, n: float = 1.0) -> float:
+        """Block until `n` tokens are available; returns the seconds spent waiting."""
+        if self.rate <= 0: return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens -= n
+            wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        if wait: time.sleep(wait)
+        return wait
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limits, each a token bucket with a one-minute burst."""
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm / 60.0, max(1.0, rpm))
+        self.tokens = TokenBucket(tpm / 60.0, max(1.0, tpm))
+
+    def acquire(self, tokens: float = 0.0) -> float:
+        return self.requests.acquire() + (self.tokens.acquire(tokens) if tokens else 0.0)
+
+@lru_cache(maxsize=1)
+def llm_limiter() -> RateLimiter:
+    """Process-wide limiter so concurrent stages share one quota."""
+    return RateLimiter(LLM_RPM, LLM_TPM)
+
+def is_rate_limited(exc: Exception) -> bool:
+    """True for 429 / quota errors from Gemini (ResourceExhausted), HTTP clients and the local backend."""
+    name = type(exc).__name__
+    return ("ResourceExhausted" in name or "RateLimit" in name or getattr(exc, "code", None) == 429
+            or "429" in str(exc) or "quota" in str(exc).lower())
+
+class AdaptiveBackoff:
+    """Cool-down shared by every caller after a 429: doubles on repeated limits, halves on each success."""
+    def __init__(self, base: float = 2.0, cap: float = 60.0):
+        self.base, self.cap = base, cap
+        self.delay = 0.0
+        self._until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> float:
+        pause = self._until - time.monotonic()
+        if pause > 0: time.sleep(pause)
+        return max(0.0, pause)
+
+    def penalize(self):
+        with self._lock:
+            self.delay = min(self.cap, max(self.base, self.delay * 2))
+            self._until = max(self._until, time.monotonic() + self.delay * (0.5 + random.random() / 2))
+
+    def relax(self):
+        with self._lock:
+            self.delay = self.delay / 2 if self.delay >= self.base / 4 else 0.0
@@ -0,0 +1,117 @@
+"""Shared Jinja render engine for build_issue.py, archive.py and the feeds.
+
+One Environment per process renders every page: templates are compiled once and
+kept in the environment's cache, and FileSystemBytecodeCache stores the compiled
+code under data/jinja_cache so the next process skips compilation too. HTML and
+XML templates are autoescaped. Pages come out minified, with links to the
+fingerprinted stylesheet, script and fonts (app/assets.py).
+
+Per-item display fields that the templates used to derive with filter chains on
+every render (search doc id, formatted scores, date) are computed once in Python
+by prepare(); an item that appears on several pages (issue, section, source) is
+prepared only once.
+
+    python app/render.py --bench 5000    # render a synthetic 5,000-item archive three ways
+"""
+import os, sys, time, argparse
+from pathlib import Path
+from functools import lru_cache
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+
+if __package__ in (None, ""):  # allow `python app/render.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.search_index import doc_id
+from app import assets
+
+TEMPLATE_DIR = "site/templates"
+BYTECODE_DIR = Path(os.getenv("JINJA_CACHE_DIR", "data/jinja_cache"))
+
+def make_env(template_dir=TEMPLATE_DIR, bytecode_dir=BYTECODE_DIR) -> Environment:
+    bcc = None
+    if bytecode_dir:
+        bytecode_dir.mkdir(parents=True, exist_ok=True)
+        bcc = FileSystemBytecodeCache(str(bytecode_dir))
+    env = Environment(loader=FileSystemLoader(template_dir), bytecode_cache=bcc,
+                      autoescape=select_autoescape(["html", "xml"]))
+    env.globals.update(asset=assets.asset, inline_css=assets.inline_css, font_files=assets.font_files)
+    return env
+
+@lru_cache(maxsize=1)
+def get_env() -> Environment:
+    return make_env()
+
+def prepare(item: dict) -> dict:
+    """Add the fields issue.html displays; idempotent, so shared items are only prepared once."""
+    if "doc_id" in item: return item
+    item["doc_id"] = doc_id(item)  # the card's key into the search index
+    score = item.get("final_score")
+    item["score_attr"] = f"{score if score is not None else 0:.3f}"
+    item["score_label"] = f"{score:.2f}" if score is not None else ""
+    item["date"] = item["published"][:10] if item.get("published") else "Undated"
+    item["is_original"] = item.get("item_type", "curated") == "original"
+    return item
+
+def render(template: str, env: Environment = None, **ctx) -> str:
+    for group in ctx.get("groups", ()):
+        for item in group["items_list"]: prepare(item)
+    html = (env or get_env()).get_template(template).render(**ctx)
+    return assets.minify_html(html) if template.endswith(".html") else html
+
+# -------- benchmark
+def synthetic_issues(n_items: int, per_issue: int = 50) -> list:
+    """A deterministic archive of n_items spread over weekly issues."""
+    import random
+    from app.build_issue import SECS
+    rng = random.Random(7)
+    words = ("pipeline kafka lineage drift anomaly slo incident embedding retrieval evaluation gpu "
+             "schema quality observability spark flink latency agent model").split()
+    sources = [f"Source {k}" for k in range(40)]
+    issues = []
+    for w in range(0, n_items, per_issue):
+        week = f"{2020 + w // per_issue // 52}-W{w // per_issue % 52 + 1:02d}"
+        items = []
+        for k in range(min(per_issue, n_items - w)):
+            items.append({
+                "title": " ".join(rng.choice(words) for _ in range(8)).capitalize() + f" <{w + k}>",
+                "url": f"https://example.com/{w + k}", "source": rng.choice(sources),
+                "published": f"{week[:4]}-06-01T00:00:00Z", "final_score": rng.random(), "rank": k + 1,
+                "section_id": rng.choice(SECS["order"]),
+                "summary_p1": " ".join(rng.choice(words) for _ in range(80)) + ".",
+                "summary_p2": "Why it matters: " + " ".join(rng.choice(words) for _ in range(30)) + ".",
+            })
+        issues.append({"week": week, "generated_at": f"{week[:4]}-06-01T00:00:00", "items": items})
+    return issues
+
+def bench(n_items: int):
+    import copy, shutil, tempfile
+    from app import archive
+
+    issues = synthetic_issues(n_items)
+    t = time.perf_counter()
+    for i in issues:
+        for it in i["items"]: prepare(it)
+    prep = time.perf_counter() - t
+    page_list = list(archive.pages(issues))
+    print(f"{n_items} items in {len(issues)} issues → {len(page_list)} pages; prepare() {prep * 1000:.0f}ms once")
+
+    tmp = Path(tempfile.mkdtemp())
+    try:
+        def run(label, env_for_page):
+            pages = copy.deepcopy(page_list)
+            t = time.perf_counter()
+            size = sum(len(render(tpl, env_for_page(), **ctx)) for _, tpl, ctx in pages)
+            secs = time.perf_counter() - t
+            print(f"  {label:<44} {secs:6.2f}s  {len(pages) / secs:7.1f} pages/s  {size / 1e6:.1f}MB")
+            return secs
+        run("new Environment per page (old build_issue)", lambda: make_env(bytecode_dir=None))
+        make_env(bytecode_dir=tmp).get_template("archive.html")  # fill the bytecode cache
+        run("new Environment per page, warm bytecode cache", lambda: make_env(bytecode_dir=tmp))
+        shared = make_env(bytecode_dir=tmp)
+        run("one shared Environment (get_env)", lambda: shared)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Render engine benchmark.")
+    ap.add_argument("--bench", type=int, default=5000, metavar="ITEMS")
+    bench(ap.parse_args().bench)
@@ -0,0 +1,165 @@
+"""Near-duplicate detection for candidates.
+
+Small inputs use rapidfuzz's batched `process.cdist` over titles. Larger inputs switch
+to MinHash + LSH banding over title + text prefix shingles, so only items sharing a band
+bucket are compared and the work stays roughly linear in the number of candidates.
+
+On both paths a title match (`token_set_ratio > 90`) only merges two items when their
+title + text prefix MinHash similarity is at least DEDUP_CONFIRM_JACCARD, or when one
+of them has no text to compare. Different articles under the same generic title
+("Weekly update", "Release notes") are kept apart.
+"""
+import os, re, zlib
+import numpy as np
+from rapidfuzz import fuzz, process
+
+THRESHOLD = float(os.getenv("DEDUP_TITLE_THRESHOLD", "90"))  # title token_set_ratio; strictly greater merges
+JACCARD = float(os.getenv("DEDUP_JACCARD", "0.8"))           # MinHash similarity that merges regardless of title
+CONFIRM = float(os.getenv("DEDUP_CONFIRM_JACCARD", "0.3"))   # MinHash similarity a title match also needs
+PREFIX_CHARS = int(os.getenv("DEDUP_TEXT_PREFIX", "500"))
+EXACT_MAX = int(os.getenv("DEDUP_EXACT_MAX", "1000"))        # above this, use LSH instead of the full matrix
+NUM_PERM, BANDS = 128, 32                                    # 4 rows per band → candidate threshold ≈ 0.42
+
+_PRIME = np.uint64(4294967311)  # smallest prime above 2**32
+_rng = np.random.default_rng(1)
+_A = _rng.integers(1, 2**31, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 2**31, NUM_PERM, dtype=np.uint64)
+
+def _tokens(s):
+    return re.findall(r"\w+", (s or "").lower())
+
+def shingles(item, k=3):
+    toks = _tokens(item.get("title", "") + " " + (item.get("text", "") or "")[:PREFIX_CHARS])
+    grams = {" ".join(toks[i:i + k]) for i in range(max(1, len(toks) - k + 1))}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+def minhash(hashes):
+    if not len(hashes): return np.full(NUM_PERM, _PRIME, dtype=np.uint64)
+    return ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+
+def _has_text(item):
+    return bool((item.get("text") or "").strip())
+
+def _confirmed(a, b, sim, confirm=CONFIRM):
+    """Whether a title match is backed by content: similar text prefixes, or nothing to compare."""
+    return sim >= confirm or not (_has_text(a) and _has_text(b))
+
+def _exact(items, titles, threshold):
+    scores = process.cdist(titles, titles, scorer=fuzz.token_set_ratio, workers=-1)
+    sigs = {}  # MinHash only for items that have a title match to confirm
+    sig = lambda i: sigs[i] if i in sigs else sigs.setdefault(i, minhash(shingles(items[i])))
+    kept, merged_into = [], {}
+    for i in range(len(titles)):
+        if kept:
+            row = scores[i, kept]
+            above = np.flatnonzero(row > threshold)
+            match = next(((kept[p], float(row[p])) for p in above[np.argsort(-row[above], kind="stable")]
+                          if _confirmed(items[i], items[kept[p]], float((sig(i) == sig(kept[p])).mean()))), None)
+            if match is not None:
+                merged_into[i] = match; continue
+        kept.append(i)
+    return kept, merged_into
+
+def _lsh(items, titles, threshold, jaccard):
+    sigs = np.vstack([minhash(shingles(it)) for it in items])
+    rows = NUM_PERM // BANDS
+    buckets = {}
+    kept, merged_into = [], {}
+    for i, title in enumerate(titles):
+        keys = [(b, sigs[i, b * rows:(b + 1) * rows].tobytes()) for b in range(BANDS)]
+        keys.append(("title", " ".join(sorted(set(_tokens(title))))))  # same words, any order
+        cands = {j for key in keys for j in buckets.get(key, ())}
+        best = None
+        for j in sorted(cands):
+            ratio = fuzz.token_set_ratio(title, titles[j])
+            sim = float((sigs[i] == sigs[j]).mean())
+            if (ratio > threshold and _confirmed(items[i], items[j], sim)) or sim >= jaccard:
+                score = max(ratio, 100 * sim)
+                if best is None or score > best[1]: best = (j, score)
+        if best is not None:
+            merged_into[i] = best; continue
+        kept.append(i)
+        for key in keys:  # only kept items are indexed, mirroring "compare against what we kept"
+            buckets.setdefault(key, []).append(i)
+    return kept, merged_into
+
+class Deduper:
+    """Incremental dedup for items that arrive one at a time (app/streaming.py).
+
+    While at most `exact_max` items have been seen, each title is compared with every
+    kept title, so the result equals dedup() over the same arrival order. Past that,
+    new items are only compared with kept items sharing a MinHash band or a sorted-title
+    bucket, as in the batch LSH path.
+    """
+    def __init__(self, threshold=THRESHOLD, jaccard=JACCARD, exact_max=EXACT_MAX):
+        self.threshold, self.jaccard, self.exact_max = threshold, jaccard, exact_max
+        self.kept, self.titles, self.sigs = [], [], []
+        self.buckets, self.merged = {}, {}
+        self.seen = 0
+
+    @staticmethod
+    def _keys(title, sig):
+        rows = NUM_PERM // BANDS
+        keys = [(b, sig[b * rows:(b + 1) * rows].tobytes()) for b in range(BANDS)]
+        keys.append(("title", " ".join(sorted(set(_tokens(title))))))
+        return keys
+
+    def add(self, item) -> bool:
+        """Return True if item is new (kept), False if it was merged into an earlier one."""
+        self.seen += 1
+        title = item.get("title", "")
+        sig = minhash(shingles(item))
+        keys = self._keys(title, sig)
+        best = None
+        if self.seen <= self.exact_max:
+            if self.titles:
+                row = process.cdist([title], self.titles, scorer=fuzz.token_set_ratio)[0]
+                above = np.flatnonzero(row > self.threshold)
+                best = next(((int(j), float(row[j])) for j in above[np.argsort(-row[above], kind="stable")]
+                             if _confirmed(item, self.kept[j], float((sig == self.sigs[j]).mean()))), None)
+        else:
+            for j in sorted({j for key in keys for j in self.buckets.get(key, ())}):
+                ratio = fuzz.token_set_ratio(title, self.titles[j])
+                sim = float((sig == self.sigs[j]).mean())
+                if (ratio > self.threshold and _confirmed(item, self.kept[j], sim)) or sim >= self.jaccard:
+                    score = max(ratio, 100 * sim)
+                    if best is None or score > best[1]: best = (j, score)
+        if best is not None:
+            j, score = best
+            self.merged.setdefault(j, []).append(
+                {"title": title, "url": item.get("url", ""), "similarity": round(score, 1)})
+            return False
+        j = len(self.kept)
+        self.kept.append(item); self.titles.append(title); self.sigs.append(sig)
+        for key in keys: self.buckets.setdefault(key, []).append(j)
+        return True
+
+    def replace(self, old, new) -> bool:
+        """Swap a kept item for a newer copy of it (same URL), re-keying its title and MinHash; False if old was not kept."""
+        j = next((j for j, it in enumerate(self.kept) if it is old), None)
+        if j is None: return False
+        for key in self._keys(self.titles[j], self.sigs[j]):
+            bucket = self.buckets.get(key, [])
+            if j in bucket: bucket.remove(j)
+        title, sig = new.get("title", ""), minhash(shingles(new))
+        self.kept[j], self.titles[j], self.sigs[j] = new, title, sig
+        for key in self._keys(title, sig): self.buckets.setdefault(key, []).append(j)
+        return True
+
+    def clusters(self):
+        return [{"title": self.titles[j], "url": self.kept[j].get("url", ""), "merged": m}
+                for j, m in sorted(self.merged.items())]
+
+def dedup(items, threshold=THRESHOLD, jaccard=JACCARD):
+    """Return (kept_items, clusters). Order of kept items is preserved; each cluster lists what was merged."""
+    titles = [it.get("title", "") for it in items]
+    if len(items) <= EXACT_MAX:
+        kept, merged_into = _exact(items, titles, threshold)
+    else:
+        kept, merged_into = _lsh(items, titles, threshold, jaccard)
+
+    clusters = {k: [] for k in kept}
+    for i, (k, score) in merged_into.items():
+        clusters[k].append({"title": titles[i], "url": items[i].get("url", ""), "similarity": round(score, 1)})
+    out = [{"title": titles[k], "url": items[k].get("url", ""), "merged": m} for k, m in clusters.items() if m]
+    return [items[k] for k in kept], out
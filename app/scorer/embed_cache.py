@@ -0,0 +1,84 @@
+"""On-disk embedding cache for semantic_rank.py.
+
+Vectors live in one append-only float32 file that is opened with np.memmap;
+a small JSON index maps sha256(text) → row. The index also records the model
+name and library version, and the whole cache is reset when either changes.
+"""
+import os, json, time, hashlib
+from pathlib import Path
+import numpy as np
+
+CACHE_DIR = Path(os.getenv("EMBED_CACHE_DIR", "data/embed_cache"))
+
+def content_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+class EmbeddingCache:
+    def __init__(self, model: str, version: str = "", root: Path = CACHE_DIR):
+        self.root = root
+        self.index_path = root / "index.json"
+        self.vec_path = root / "vectors.f32"
+        self.model = model
+        self.version = version
+        self.hits = self.misses = 0
+        self.embed_seconds = 0.0
+        self._load()
+
+    def _load(self):
+        idx = {}
+        if self.index_path.exists():
+            try:
+                idx = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except Exception:
+                idx = {}
+        if idx.get("model") != self.model or idx.get("version") != self.version:
+            idx = {"model": self.model, "version": self.version, "dim": 0, "embed_seconds": 0.0, "keys": {}}
+            self.vec_path.unlink(missing_ok=True)
+        self.index = idx
+        self.dim = idx["dim"]
+        n = len(idx["keys"])
+        self.vectors = (np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+                        if n and self.vec_path.exists() else np.zeros((0, self.dim), dtype=np.float32))
+
+    def embed(self, texts, embed_fn):
+        """Return an (n, dim) float32 matrix for texts, calling embed_fn(list_of_texts) only for cache misses."""
+        keys = [content_key(t) for t in texts]
+        rows = self.index["keys"]
+        missing = list(dict.fromkeys(k for k in keys if k not in rows))
+        self.misses += len(missing)
+        self.hits += len(keys) - len(missing)
+
+        if missing:
+            by_key = dict(zip(keys, texts))
+            t0 = time.perf_counter()
+            new = np.vstack([np.asarray(v, dtype=np.float32) for v in embed_fn([by_key[k] for k in missing])])
+            took = time.perf_counter() - t0
+            self.embed_seconds += took
+            self._append(missing, new, took)
+
+        if not keys: return np.zeros((0, self.dim), dtype=np.float32)
+        return np.asarray(self.vectors[[rows[k] for k in keys]])
+
+    def _append(self, keys, new, took):
+        self.root.mkdir(parents=True, exist_ok=True)
+        start = len(self.index["keys"])
+        self.index["dim"] = self.dim = new.shape[1]
+        with self.vec_path.open("ab") as f:
+            f.truncate(start * self.dim * 4)  # drop rows orphaned by an interrupted run
+            f.write(np.ascontiguousarray(new, dtype=np.float32).tobytes())
+        for i, k in enumerate(keys):
+            self.index["keys"][k] = start + i
+        self.index["embed_seconds"] = self.index.get("embed_seconds", 0.0) + took
+        tmp = self.index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.index), encoding="utf-8")
+        tmp.replace(self.index_path)
+        n = len(self.index["keys"])
+        self.vectors = np.memmap(self.vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+
+    def summary(self) -> str:
+        total = self.hits + self.misses
+        n = len(self.index["keys"])
+        saved = self.hits * self.index.get("embed_seconds", 0.0) / n if n else 0.0
+        rate = 100.0 * self.hits / total if total else 0.0
+        return (f"Embedding cache: {self.hits}/{total} hits ({rate:.0f}%), embedded {self.misses} new "
+                f"in {self.embed_seconds:.1f}s, ~{saved:.1f}s saved ({self.model})")
@@ -1,7 +1,12 @@
-import json, re, yaml
+import os, sys, json, re, yaml
 from pathlib import Path
 from datetime import datetime, timezone
-from rapidfuzz import fuzz
+
+if __package__ in (None, ""):  # allow `python app/scorer/score.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app.scorer.dedup import dedup
+
+CLUSTERS = Path(os.getenv("DEDUP_CLUSTERS_FILE", "data/dedup_clusters.json"))
 
 W = yaml.safe_load(Path("config/weights.yaml").read_text())["weights"]
 SEC_MULT = yaml.safe_load(Path("config/weights.yaml").read_text()).get("security_multiplier", 1.1)
@@ -49,12 +54,10 @@ def domain(url):
 def main():
     lines = Path("data/candidates.jsonl").read_text(encoding="utf-8").splitlines()
     items = [json.loads(l) for l in lines if l.strip()]
-    # de-dup near-identical titles
-    deduped = []
-    for x in items:
-        if any(fuzz.token_set_ratio(x["title"], y["title"]) > 90 for y in deduped):
-            continue
-        deduped.append(x)
+    # de-dup near-identical items; clusters record what was merged into each survivor
+    deduped, clusters = dedup(items)
+    CLUSTERS.write_text(json.dumps(clusters, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Dedup: kept {len(deduped)}/{len(items)} ({len(clusters)} clusters) → {CLUSTERS}")
     # score
     scored = []
     for it in deduped:
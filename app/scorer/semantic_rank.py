@@ -1,11 +1,20 @@
-import json, re, math, yaml
+import os, sys, json, re, yaml
 from pathlib import Path
 from datetime import datetime, timezone
-from fastembed import TextEmbedding
+from functools import lru_cache
+from importlib.metadata import version
 import numpy as np
 
+if __package__ in (None, ""):  # allow `python app/scorer/semantic_rank.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app.scorer.embed_cache import EmbeddingCache
+
 IN  = Path("data/candidates.jsonl")
 OUT = Path("data/top10.json")
+MODEL = "BAAI/bge-small-en-v1.5"
+TOP_K = int(os.getenv("RANK_TOP_K", "10"))         # raise for archive builds
+DOMAIN_CAP = int(os.getenv("RANK_DOMAIN_CAP", "3"))
+POOL = os.getenv("MMR_POOL", "capped")              # capped: cap per domain first | all: MMR over every candidate
 
 # -------- 1) Axes & keywords
 AXIS_PROMPTS = {
@@ -29,130 +38,170 @@ LEX = {
     "biz":   ["launch","pricing","general availability","GA","customers","revenue","cost","partnership","integration","roadmap"],
 }
 
-# -------- 2) Small helpers
-def _cos(a,b): return float(np.dot(a,b) / (np.linalg.norm(a)*np.linalg.norm(b) + 1e-8))
+# every distinct keyword once, plus a keyword × list membership matrix so per-list hits are one matmul
+VOCAB = list(dict.fromkeys(w for words in LEX.values() for w in words))
+MEMBERS = np.array([[w in LEX[k] for k in LEX] for w in VOCAB], dtype=np.float64)
 
+# -------- 2) Small helpers
 def _days_old(iso):
     dt = datetime.fromisoformat(iso.replace("Z","")).astimezone(timezone.utc)
     return max(0, (datetime.now(timezone.utc) - dt).days)
 
-def _kw_score(text, words):
-    t = text.lower()
-    hits = sum(t.count(w) for w in words)
-    # length-normalized (diminishing returns)
-    return min(1.0, hits / (1 + math.log10(len(t) + 10)))
+def _kw_scores(texts):
+    """Per-list keyword scores for lowercased texts → {list_name: (n,) array}, length-normalized."""
+    counts = np.array([[t.count(w) for w in VOCAB] for t in texts], dtype=np.float64).reshape(len(texts), len(VOCAB))
+    norm = 1 + np.log10(np.array([len(t) for t in texts], dtype=np.float64) + 10)  # diminishing returns
+    return dict(zip(LEX, np.minimum(1.0, (counts @ MEMBERS) / norm[:, None]).T))
+
+def _cos_matrix(docs, anchors):
+    docs, anchors = np.asarray(docs, dtype=np.float64), np.asarray(anchors, dtype=np.float64)
+    norms = np.linalg.norm(docs, axis=1)[:, None] * np.linalg.norm(anchors, axis=1)[None, :]
+    return (docs @ anchors.T) / (norms + 1e-8)
 
 def _sigmoid(z):  # smooth calibration to 0..1
-    return 1 / (1 + math.exp(-z))
+    return 1 / (1 + np.exp(-z))
+
+def score_batch(items, doc_emb, axis_emb, W):
+    """Score all items at once (keywords + semantics + time + security); returns the `rows` list."""
+    texts = [(it.get("title","") + " " + it.get("text","")).lower() for it in items]
+    kw = _kw_scores(texts)
+    sims = _cos_matrix(doc_emb, np.vstack([axis_emb["tech"], axis_emb["app"], axis_emb["biz"]]))
+
+    # combine per-axis, calibrate with sigmoid
+    tech = _sigmoid(2.2*sims[:, 0] + 1.2*kw["tech"])
+    app  = _sigmoid(2.2*sims[:, 1] + 1.2*(kw["app"] + 0.5*kw["sec"]))
+    biz  = _sigmoid(2.0*sims[:, 2] + 1.0*kw["biz"])
+
+    # freshness bonus (0..1 over 0–7 days)
+    timely = np.maximum(0.0, 1.0 - np.array([_days_old(it["published"]) for it in items], dtype=np.float64)/7.0)
 
-def _mmr_select(rows, embeddings, k=10, diversity=0.3):
-    """Greedy selection: score - diversity * max_sim_with_selected."""
+    # security multiplier if security words present
+    sec_mult = np.where(kw["sec"] > 0, 1.10, 1.00)
+
+    base = (
+        W["technical_innovation"]*tech +
+        W["practical_applicability"]*app +
+        W["educational_value"]*0.05 +  # small bias towards longer/contextual items
+        W["timeliness"]*timely +
+        W["community_impact"]*0.0      # placeholder
+    )
+    final = np.minimum(1.0, base * sec_mult)
+
+    rows = []
+    for i, it in enumerate(items):
+        # 2-sentence preview (fallback to slice)
+        sents = re.split(r"(?<=[.!?])\s+", it.get("text","").strip())
+        p1 = (" ".join(sents[:2]) or it.get("text","")[:240]).strip()
+        p2 = "Why it matters: implications for enterprises/security/business."
+        rows.append({
+            "title": it["title"],
+            "url": it["url"],
+            "source": it["source"],
+            "published": it["published"],
+            "tech": round(float(tech[i]),2), "app": round(float(app[i]),2), "biz": round(float(biz[i]),2),
+            "final_score": round(float(final[i]),3),
+            "summary_p1": p1, "summary_p2": p2
+        })
+    return rows
+
+def _mmr_select(rows, embeddings, k=10, diversity=0.3, domains=None, cap=None):
+    """Greedy selection: score - diversity * max_sim_with_selected.
+
+    Keeps a running max-similarity vector updated with one mat-vec per pick, so memory
+    is O(n) and work is O(k·n·d). With `domains`/`cap`, a domain is masked out once it
+    has `cap` picks, which lets MMR run over the full pool instead of a pre-capped subset.
+    """
+    scores = np.array([r["final_score"] for r in rows], dtype=np.float64)
+    available = np.ones(len(rows), dtype=bool)
+    max_sim = np.zeros(len(rows), dtype=np.float64)  # no penalty before the first pick
+    per = {}
     selected = []
-    selected_idx = []
-    sims = embeddings @ embeddings.T
     for _ in range(min(k, len(rows))):
-        best_i, best_val = None, -1e9
-        for i, r in enumerate(rows):
-            if i in selected_idx: continue
-            penal = 0.0 if not selected_idx else max(sims[i, j] for j in selected_idx)
-            val = r["final_score"] - diversity * penal
-            if val > best_val:
-                best_val, best_i = val, i
-        selected_idx.append(best_i)
+        if not available.any(): break
+        val = np.where(available, scores - diversity * max_sim, -np.inf)
+        best_i = int(np.argmax(val))  # first max, same tie-break as the old loop
+        available[best_i] = False
         selected.append(rows[best_i])
+        sims = embeddings @ embeddings[best_i]
+        max_sim = sims if len(selected) == 1 else np.maximum(max_sim, sims)
+        if domains is not None and cap:
+            d = domains[best_i]; per[d] = per.get(d, 0) + 1
+            if per[d] >= cap: available &= domains != d
     # re-rank by original score
     selected.sort(key=lambda x: x["final_score"], reverse=True)
     for i, r in enumerate(selected, 1):
         r["rank"] = i
     return selected
 
-# -------- 3) Load items
-lines = IN.read_text(encoding="utf-8").splitlines() if IN.exists() else []
-items = [json.loads(l) for l in lines if l.strip()]
+# -------- 3) Lazily-initialized resources (importing this module stays cheap)
+@lru_cache(maxsize=1)
+def get_embedder():
+    """Fast, tiny embedding model (downloads once in CI); only loaded when the cache misses."""
+    from fastembed import TextEmbedding
+    return TextEmbedding(MODEL)
 
-if not items:
-    OUT.write_text("[]", encoding="utf-8")
-    raise SystemExit("No candidates found. Did collector run?")
+def embed(batch):
+    return get_embedder().embed(batch)
 
-# -------- 4) Build texts for embedding (title + first 1.5k chars)
-def clip(t, n=1500): return (t or "")[:n]
-texts = [ (it.get("title","") + " — " + clip(it.get("text",""))) for it in items ]
-
-# Fast, tiny embedding model (downloads once in CI)
-embedder = TextEmbedding("BAAI/bge-small-en-v1.5")
-doc_emb = np.vstack([np.array(e) for e in embedder.embed(texts)])
-
-# Anchor embeddings for each axis
-axis_emb = {k: np.array(next(embedder.embed([v]))) for k,v in AXIS_PROMPTS.items()}
+@lru_cache(maxsize=1)
+def get_cache():
+    return EmbeddingCache(MODEL, version=version("fastembed"))
 
-# -------- 5) Score each item (keywords + semantics + time + security)
-rows = []
-for it, emb in zip(items, doc_emb):
-    text = (it.get("title","") + " " + it.get("text","")).lower()
+@lru_cache(maxsize=1)
+def load_weights():
+    return yaml.safe_load(Path("config/weights.yaml").read_text())["weights"]
 
-    # keyword signals
-    kw_tech = _kw_score(text, LEX["tech"])
-    kw_app  = _kw_score(text, LEX["app"]) + 0.5 * _kw_score(text, LEX["sec"])
-    kw_biz  = _kw_score(text, LEX["biz"])
+def load_items(path=IN):
+    lines = path.read_text(encoding="utf-8").splitlines() if path.exists() else []
+    return [json.loads(l) for l in lines if l.strip()]
 
-    # semantic similarity to axis prompts
-    sim_tech = _cos(emb, axis_emb["tech"])
-    sim_app  = _cos(emb, axis_emb["app"])
-    sim_biz  = _cos(emb, axis_emb["biz"])
-
-    # combine per-axis, calibrate with sigmoid
-    tech = _sigmoid(2.2*sim_tech + 1.2*kw_tech)
-    app  = _sigmoid(2.2*sim_app  + 1.2*kw_app)
-    biz  = _sigmoid(2.0*sim_biz  + 1.0*kw_biz)
-
-    # freshness bonus (0..1 over 0–7 days)
-    timely = max(0.0, 1.0 - _days_old(it["published"])/7.0)
+# -------- 4) Embeddings for items (title + first 1.5k chars) and axis anchors
+def clip(t, n=1500): return (t or "")[:n]
 
-    # security multiplier if security words present
-    sec_flag = _kw_score(text, LEX["sec"]) > 0
-    sec_mult = 1.10 if sec_flag else 1.00
+def embed_items(items):
+    cache = get_cache()
+    texts = [ (it.get("title","") + " — " + clip(it.get("text",""))) for it in items ]
+    doc_emb = cache.embed(texts, embed)
+    axis_emb = dict(zip(AXIS_PROMPTS, cache.embed(list(AXIS_PROMPTS.values()), embed)))
+    return doc_emb, axis_emb
 
-    # weights (tuneable)
-    W = yaml.safe_load(Path("config/weights.yaml").read_text())["weights"]
-    base = (
-        W["technical_innovation"]*tech +
-        W["practical_applicability"]*app +
-        W["educational_value"]*0.05 +  # small bias towards longer/contextual items
-        W["timeliness"]*timely +
-        W["community_impact"]*0.0      # placeholder
-    )
-    final = min(1.0, base * sec_mult)
-
-    # 2-sentence preview (fallback to slice)
-    sents = re.split(r"(?<=[.!?])\s+", it.get("text","").strip())
-    p1 = (" ".join(sents[:2]) or it.get("text","")[:240]).strip()
-    p2 = "Why it matters: implications for enterprises/security/business."
-
-    rows.append({
-        "title": it["title"],
-        "url": it["url"],
-        "source": it["source"],
-        "published": it["published"],
-        "tech": round(tech,2), "app": round(app,2), "biz": round(biz,2),
-        "final_score": float(round(final,3)),
-        "summary_p1": p1, "summary_p2": p2
-    })
-
-# -------- 6) Diversity: cap 3 per domain + MMR for coverage
+# -------- 5) Diversity: cap per domain + MMR for coverage
 def domain(u):
     m = re.search(r"https?://([^/]+)/?", u or ""); return m.group(1).lower() if m else "unknown"
 
-per, capped, emb_kept = {}, [], []
-for r, e in sorted(zip(rows, doc_emb), key=lambda x: x[0]["final_score"], reverse=True):
-    d = domain(r["url"]); per[d] = per.get(d,0) + 1
-    if per[d] <= 3:  # source cap
-        capped.append(r); emb_kept.append(e)
-if len(capped) > 10:
-    top10 = _mmr_select(capped, np.vstack(emb_kept), k=10, diversity=0.35)
-else:
-    top10 = sorted(capped, key=lambda r: r["final_score"], reverse=True)[:10]
-    for i, r in enumerate(top10, 1): r["rank"] = i
-
-OUT.write_text(json.dumps(top10, ensure_ascii=False, indent=2), encoding="utf-8")
-print(f"Wrote {OUT} (n={len(top10)})")
-
+def rank(items, top_k=TOP_K, pool=POOL, domain_cap=DOMAIN_CAP):
+    """Embed, score and diversify items; returns the ranked top-k rows."""
+    doc_emb, axis_emb = embed_items(items)
+    rows = score_batch(items, doc_emb, axis_emb, load_weights())
+    return pick(rows, doc_emb, top_k, pool, domain_cap)
+
+def pick(rows, doc_emb, top_k=TOP_K, pool=POOL, domain_cap=DOMAIN_CAP):
+    """Diversify scored rows (aligned with their embeddings) into the ranked top-k."""
+    if pool == "all":  # MMR over every candidate, domain cap enforced while picking
+        doms = np.array([domain(r["url"]) for r in rows])
+        return _mmr_select(rows, doc_emb, k=top_k, diversity=0.35, domains=doms, cap=domain_cap)
+
+    per, capped, emb_kept = {}, [], []
+    for r, e in sorted(zip(rows, doc_emb), key=lambda x: x[0]["final_score"], reverse=True):
+        d = domain(r["url"]); per[d] = per.get(d,0) + 1
+        if per[d] <= domain_cap:  # source cap
+            capped.append(r); emb_kept.append(e)
+    if len(capped) > top_k:
+        return _mmr_select(capped, np.vstack(emb_kept), k=top_k, diversity=0.35)
+    top = sorted(capped, key=lambda r: r["final_score"], reverse=True)[:top_k]
+    for i, r in enumerate(top, 1): r["rank"] = i
+    return top
+
+def main(src=IN, out=OUT):
+    items = load_items(src)
+    if not items:
+        out.write_text("[]", encoding="utf-8")
+        raise SystemExit("No candidates found. Did collector run?")
+
+    top10 = rank(items)
+    print(get_cache().summary())
+    out.write_text(json.dumps(top10, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"Wrote {out} (n={len(top10)})")
+
+if __name__ == "__main__":
+    main()
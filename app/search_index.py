@@ -0,0 +1,121 @@
+"""Prebuilt client-side search index, written by build_issue.py to site/dist/search/.
+
+Cards no longer carry a `data-haystack` copy of their text. Instead every item of
+the current issue and of the archived issues (app/archive.py) is tokenised,
+stemmed and put into an inverted index sharded per section:
+
+    search/manifest.json   {"v": hash, "stop": [...], "shards": {section: {"file", "docs", "terms"}}}
+    search/<section>.json  {"d": [[id, title, url, source, date, page], ...],
+                            "t": [[term, [doc, +gap, +gap, ...]], ...]}   # terms sorted, postings gap-encoded
+
+The page fetches the manifest on the first keystroke and then only the shards it
+needs (the selected section, or all of them), so page weight does not grow with
+the archive and a query is a binary search per token over sorted terms plus a
+postings intersection. Every query token is prefix-matched, so results appear
+while a word is still being typed.
+
+stem() is Porter's step 1 (plurals, -ed/-ing, -y); the copy in site/static/js/site.js must
+stay in sync with it. Stop words travel in the manifest so both sides drop the same ones.
+"""
+import re, sys, json, hashlib
+from pathlib import Path
+
+if __package__ in (None, ""):  # allow `python app/search_index.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.prompt_pack import STOP
+
+OUT_DIR = Path("site/dist/search")
+TOKEN = re.compile(r"[a-z0-9]+")
+
+def _cons(w, i):
+    if w[i] in "aeiou": return False
+    if w[i] == "y": return i == 0 or not _cons(w, i - 1)
+    return True
+
+def _measure(w):
+    """Porter's m: the number of vowel→consonant transitions."""
+    n, prev_vowel = 0, False
+    for i in range(len(w)):
+        vowel = not _cons(w, i)
+        if prev_vowel and not vowel: n += 1
+        prev_vowel = vowel
+    return n
+
+def _has_vowel(w):
+    return any(not _cons(w, i) for i in range(len(w)))
+
+def stem(w: str) -> str:
+    if len(w) <= 3: return w
+    if w.endswith("sses") or w.endswith("ies"): w = w[:-2]
+    elif w.endswith("s") and not w.endswith("ss"): w = w[:-1]
+    fix = False
+    if w.endswith("eed"):
+        if _measure(w[:-3]) > 0: w = w[:-1]
+    elif w.endswith("ed") and _has_vowel(w[:-2]): w, fix = w[:-2], True
+    elif w.endswith("ing") and _has_vowel(w[:-3]): w, fix = w[:-3], True
+    if fix:
+        if w.endswith(("at", "bl", "iz")): w += "e"
+        elif len(w) > 1 and w[-1] == w[-2] and _cons(w, len(w) - 1) and w[-1] not in "lsz": w = w[:-1]
+        elif _measure(w) == 1 and len(w) >= 3 and _cons(w, len(w) - 3) and not _cons(w, len(w) - 2) \
+                and _cons(w, len(w) - 1) and w[-1] not in "wxy": w += "e"
+    if w.endswith("y") and _has_vowel(w[:-1]): w = w[:-1] + "i"
+    return w
+
+def terms(text: str) -> set:
+    return {stem(t) for t in TOKEN.findall((text or "").lower()) if len(t) > 1 and t not in STOP}
+
+def doc_id(item: dict) -> str:
+    return hashlib.sha1((item.get("url") or item.get("title", "")).encode("utf-8")).hexdigest()[:10]
+
+def item_text(item: dict) -> str:
+    return " ".join([item.get("title", ""), item.get("source", ""), item.get("summary_p1", ""),
+                     item.get("summary_p2", ""), item.get("editor_reason", "")])
+
+def _write_if_changed(path: Path, text: str) -> bool:
+    """Keep files (and their mtimes / HTTP validators) untouched when the content is the same."""
+    if path.exists() and path.read_text(encoding="utf-8") == text: return False
+    path.write_text(text, encoding="utf-8")
+    return True
+
+def shard(docs: list) -> dict:
+    """docs: [(item, page)] → {"d": [...], "t": [[term, gap-encoded postings], ...]}."""
+    postings = {}
+    for n, (item, _) in enumerate(docs):
+        for t in terms(item_text(item)):
+            postings.setdefault(t, []).append(n)
+    encoded = [[t, [p[0]] + [b - a for a, b in zip(p, p[1:])]] for t, p in sorted(postings.items())]
+    return {"d": [[doc_id(it), it.get("title", ""), it.get("url", ""), it.get("source", ""),
+                   (it.get("published") or "")[:10], page] for it, page in docs],
+            "t": encoded}
+
+def write_index(current: list, out_dir: Path = OUT_DIR) -> dict:
+    """Index the current issue (page "") and every archived issue; returns the manifest."""
+    from app.archive import ISSUES_DIR, load_issues  # archive imports build_issue, which imports us
+    docs, seen = [], set()
+    archived = [(it, f"issues/{i['week']}/") for i in reversed(load_issues()) for it in i["items"]] \
+        if ISSUES_DIR.exists() else []
+    for item, page in [(it, "") for it in current] + archived:
+        key = doc_id(item)
+        if key in seen: continue  # current items are also in this week's snapshot
+        seen.add(key)
+        docs.append((item, page))
+
+    by_section = {}
+    for item, page in docs:
+        by_section.setdefault(item.get("section_id") or "other", []).append((item, page))
+    out_dir.mkdir(parents=True, exist_ok=True)
+    shards, changed, size = {}, 0, 0
+    for sid, section_docs in sorted(by_section.items()):
+        data = shard(section_docs)
+        body = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+        changed += _write_if_changed(out_dir / f"{sid}.json", body)
+        size += len(body.encode("utf-8"))
+        shards[sid] = {"file": f"{sid}.json?v={hashlib.sha1(body.encode('utf-8')).hexdigest()[:8]}",
+                       "docs": len(section_docs), "terms": len(data["t"])}
+    manifest = {"stop": sorted(STOP), "shards": shards}
+    manifest["v"] = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()[:8]
+    _write_if_changed(out_dir / "manifest.json", json.dumps(manifest, separators=(",", ":")))
+    for stale in set(p.name for p in out_dir.glob("*.json")) - {"manifest.json"} - {f"{s}.json" for s in shards}:
+        (out_dir / stale).unlink()
+    print(f"Search index: {len(docs)} docs in {len(shards)} shards, {size / 1024:.0f}KiB, {changed} shards rewritten")
+    return manifest
@@ -0,0 +1,199 @@
+"""Streaming front half of the pipeline: `python -m app.pipeline --stream`.
+
+Instead of collect → candidates.jsonl → dedup → rank, items flow through bounded
+queues while the collectors are still fetching:
+
+    store window ┐
+    rss (extract)├─► raw ─► dedup + sections ─► unique ─► embed + score ─► rows
+    arxiv        ┘       (Deduper, micro-batched classify)   (embedding cache, score_batch)
+
+The items already in the candidate store for the current window are fed first, so
+CPU work starts before the first response comes back; when a collector fetches one
+of them again, the fresh copy replaces the seeded one and is re-scored if it changed.
+Dedup, section assignment,
+embedding and per-item scoring all run per micro-batch; only the final diversified
+ranking (MMR over every row) waits for the end of the stream. Outputs are the same
+files the batch stages write: candidates.jsonl, deduped.jsonl, dedup_clusters.json
+and top10.json. Items are deduped in arrival order, so when near-duplicates come
+from different feeds the one kept may differ from a batch run.
+"""
+import os, sys, json, time, queue, threading
+from pathlib import Path
+
+if __package__ in (None, ""):  # allow `python app/streaming.py` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from app.candidate_store import CAND, STORE_FILE, WINDOW_DAYS, CandidateStore, canonical_url
+from app.scorer.dedup import Deduper
+from app.sections import get_classifier
+
+BATCH = int(os.getenv("STREAM_BATCH", "32"))              # items per classify / embed / score call
+BATCH_WAIT = float(os.getenv("STREAM_BATCH_WAIT", "0.5"))  # seconds to wait for a batch to fill
+QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "1024"))   # back-pressure on the collectors
+
+DONE = object()
+SEEDED = "_seeded"  # marks items fed from the store; stripped before dedup
+
+def batches(q: queue.Queue, size=BATCH, wait=BATCH_WAIT):
+    """Yield lists of up to `size` items from q, flushing early after `wait` seconds, until DONE."""
+    while True:
+        first = q.get()
+        if first is DONE: return
+        batch, deadline = [first], time.monotonic() + wait
+        while len(batch) < size:
+            try:
+                it = q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if it is DONE:
+                yield batch
+                return
+            batch.append(it)
+        yield batch
+
+class Busy:
+    """Wall-clock time each stream stage spent working (not waiting on its queue)."""
+    def __init__(self):
+        self.seconds, self.items = {}, {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, items=0):
+        with self._lock:
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.items[name] = self.items.get(name, 0) + items
+
+    def report(self, wall) -> str:
+        parts = [f"{k} {v:.1f}s" + (f"/{self.items[k]} items" if self.items[k] else "") for k, v in self.seconds.items()]
+        return (f"Stream: {wall:.1f}s wall, stage busy time {sum(self.seconds.values()):.1f}s "
+                f"({'; '.join(parts)})")
+
+def run(collect=True, deduped_path=Path("data/deduped.jsonl"), clusters_path=Path("data/dedup_clusters.json"),
+        top_path=Path("data/top10.json")):
+    from app.scorer import semantic_rank as sr  # numpy/fastembed import stays out of `--list`
+    import numpy as np
+
+    raw, unique = queue.Queue(QUEUE_SIZE), queue.Queue(QUEUE_SIZE)
+    busy, t0 = Busy(), time.perf_counter()
+    kept, rows, embs, clusters, errors = [], [], [], [], []
+
+    def guarded(name, fn, src=None, dst=None):
+        def body():
+            try: fn()
+            except BaseException as e:  # surfaced after the join so the pipeline marks the stage failed
+                errors.append((name, e))
+                if src is not None:  # keep upstream from blocking on a full queue, let downstream finish
+                    while src.get() is not DONE: pass
+                if dst is not None: dst.put(DONE)
+        return threading.Thread(target=body, name=name, daemon=True)
+
+    # -- producers
+    has_store = STORE_FILE.exists()  # checked before the collectors create it
+
+    def seed():
+        if not has_store:  # offline without a store: start from the exported candidates
+            if collect or not CAND.exists(): return
+            for line in CAND.read_text(encoding="utf-8").splitlines():
+                if line.strip(): raw.put({**json.loads(line), SEEDED: True})
+            return
+        store = CandidateStore()
+        for it in store.iter_items(days=WINDOW_DAYS): raw.put({**it, SEEDED: True})
+        store.close()
+
+    def rss():
+        from app.collector import rss_collect
+        t = time.perf_counter()
+        rss_collect.stream(raw.put)
+        busy.add("collect_rss", time.perf_counter() - t)
+
+    def arxiv():
+        from app.collector import arxiv_api_collect
+        t = time.perf_counter()
+        arxiv_api_collect.main(export=False, on_item=raw.put)
+        busy.add("collect_arxiv", time.perf_counter() - t)
+
+    # -- consumers
+    def refresh(old, new):
+        """The collector's copy merged over a seeded item, or None if it changes nothing.
+
+        A new dict: the seeded one may be on its way through embed_score on another thread.
+        """
+        new = {k: v for k, v in new.items() if v or k != "text"}  # like the store, empty text never overwrites
+        if all(old.get(k) == v for k, v in new.items()): return None
+        return {**old, **new}
+
+    def dedup_sections():
+        deduper, clf = Deduper(), get_classifier()
+        seen, seeded = {}, set()  # canon -> (item, kept by the deduper); canons whose entry is still the store copy
+        for batch in batches(raw):
+            t = time.perf_counter()
+            fresh = []
+            for it in batch:
+                from_store = it.pop(SEEDED, False)
+                canon = canonical_url(it.get("url", ""))
+                if canon in seen:
+                    old, kept_old = seen[canon]
+                    if canon in seeded and not from_store:  # a collector refreshed a seeded item: its copy wins
+                        seeded.discard(canon)
+                        merged = refresh(old, it)
+                        if merged is not None:
+                            seen[canon] = (merged, kept_old)
+                            if kept_old and deduper.replace(old, merged):
+                                fresh.append(merged)  # re-classified, re-scored and replaces the seeded row
+                    continue
+                kept_new = deduper.add(it)
+                seen[canon] = (it, kept_new)
+                if from_store: seeded.add(canon)
+                if kept_new: fresh.append(it)
+            for it, sec in zip(fresh, clf.classify_many(fresh)):
+                it["section_id"], it["section_title"], it["section_index"] = sec["id"], sec["title"], sec["index"]
+            busy.add("dedup+sections", time.perf_counter() - t, len(batch))
+            for it in fresh: unique.put(it)
+        unique.put(DONE)
+        clusters.extend(deduper.clusters())
+
+    def embed_score():
+        t = time.perf_counter()
+        cache, weights = sr.get_cache(), sr.load_weights()
+        axis_emb = dict(zip(sr.AXIS_PROMPTS, cache.embed(list(sr.AXIS_PROMPTS.values()), sr.embed)))
+        busy.add("embed+score", time.perf_counter() - t)
+        at = {}  # canon -> position in kept/rows/embs; a refreshed item overwrites its earlier row
+        for batch in batches(unique):
+            t = time.perf_counter()
+            doc_emb = cache.embed([it.get("title", "") + " — " + sr.clip(it.get("text", "")) for it in batch], sr.embed)
+            for it, row, emb in zip(batch, sr.score_batch(batch, doc_emb, axis_emb, weights), doc_emb):
+                canon = canonical_url(it.get("url", ""))
+                if canon in at:
+                    kept[at[canon]], rows[at[canon]], embs[at[canon]] = it, row, emb
+                else:
+                    at[canon] = len(kept)
+                    kept.append(it); rows.append(row); embs.append(emb)
+            busy.add("embed+score", time.perf_counter() - t, len(batch))
+
+    producers = [guarded("seed", seed)]
+    if collect: producers += [guarded("collect_rss", rss), guarded("collect_arxiv", arxiv)]
+    consumers = [guarded("dedup+sections", dedup_sections, raw, unique), guarded("embed+score", embed_score, unique)]
+    for th in consumers + producers: th.start()
+    for th in producers: th.join()
+    raw.put(DONE)
+    for th in consumers: th.join()
+    if errors:
+        name, e = errors[0]
+        raise RuntimeError(f"stream stage {name} failed: {type(e).__name__}: {e}") from e
+
+    # barrier: diversified ranking needs every row
+    t = time.perf_counter()
+    top = sr.pick(rows, np.vstack(embs), sr.TOP_K, sr.POOL, sr.DOMAIN_CAP) if rows else []
+    if STORE_FILE.exists():
+        store = CandidateStore()
+        store.export_jsonl(CAND)
+        store.close()
+    deduped_path.write_text("".join(json.dumps(it, ensure_ascii=False) + "\n" for it in kept), encoding="utf-8")
+    clusters_path.write_text(json.dumps(clusters, ensure_ascii=False, indent=2), encoding="utf-8")
+    top_path.write_text(json.dumps(top, ensure_ascii=False, indent=2), encoding="utf-8")
+    busy.add("rank+write", time.perf_counter() - t)
+
+    print(sr.get_cache().summary())
+    print(f"Stream: {len(kept)} unique items ({len(clusters)} clusters) → {deduped_path}, {top_path}")
+    print(busy.report(time.perf_counter() - t0))
+
+if __name__ == "__main__":
+    run(collect="--offline" not in sys.argv)
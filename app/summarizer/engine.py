@@ -0,0 +1,383 @@
+"""Summarization pipeline shared by gemini_summary.py and groq_summary.py.
+
+Those scripts only hold their prompt, guidelines and fallback text; Summarizer does the
+rest: cache and near-duplicate lookups, batching of short articles, length repair and
+the concurrent run below.
+
+Each article is a chain of tasks on a bounded thread pool: the first call, then up
+to `max_expansions` expansion calls. An expansion is submitted as a new task as soon
+as its article's previous call returns, so one slow or short article never holds up
+the others, and results are still returned in input order.
+
+Model calls go through app/llm.py, so every worker shares the process-wide RPM/TPM
+limiter and 429 cool-down: the pool slows down together instead of every worker
+hammering the quota.
+"""
+import os, re, sys, json, time, hashlib, threading
+from pathlib import Path
+from functools import lru_cache
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+if __package__ in (None, ""):  # allow `python app/summarizer/...` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app import llm
+from app.candidate_store import STORE_FILE, CandidateStore
+from app.summarizer.summary_cache import SummaryCache, NEAR_BITS, content_key, hamming
+from app.prompt_pack import STATS as PACK_STATS, compress, count_tokens
+
+# --- Config ---
+CANDIDATES = Path("data/candidates.jsonl")
+WORKERS = int(os.getenv("SUMMARY_WORKERS", "4"))              # articles in flight
+SUMMARY_TARGET_TOKENS = int(os.getenv("SUMMARY_TARGET_TOKENS", "520"))  # ~500+ tokens
+MAX_CHARS = int(os.getenv("SUMMARY_MAX_CHARS", "24000"))                # give model plenty of context
+MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "1400"))               # room for long output
+INPUT_TOKENS = int(os.getenv("SUMMARY_INPUT_TOKENS", "2500"))           # article tokens sent, best sentences first
+EXPAND_CONTEXT_TOKENS = int(os.getenv("SUMMARY_EXPAND_CONTEXT_TOKENS", "500"))  # source facts added to expansions
+RETRIES = 2  # extra expansion attempts if too short
+BATCH_SIZE = int(os.getenv("SUMMARY_BATCH_SIZE", "6"))                  # short articles per request (1 = off)
+BATCH_ARTICLE_TOKENS = int(os.getenv("SUMMARY_BATCH_ARTICLE_TOKENS", "700"))  # articles up to this size are batched
+BATCH_INPUT_TOKENS = int(os.getenv("SUMMARY_BATCH_INPUT_TOKENS", "4000"))     # article tokens per batch request
+BATCH_MAX_OUTPUT = int(os.getenv("SUMMARY_BATCH_MAX_OUTPUT", "8192"))         # output tokens per batch request
+
+def plan_batches(items: list, cost, max_items: int, max_tokens: int) -> list:
+    """Greedily split items (in order) into batches of at most max_items and max_tokens by cost(item)."""
+    batches, cur, used = [], [], 0
+    for it in items:
+        c = cost(it)
+        if cur and (len(cur) >= max_items or used + c > max_tokens):
+            batches.append(cur); cur, used = [], 0
+        cur.append(it); used += c
+    if cur: batches.append(cur)
+    return batches
+
+def parse_batch(payload: str, ids: list) -> dict:
+    """Map id -> object from a batch response that should be a JSON array of objects with an "id" field.
+
+    When the array does not parse (truncated output, stray text), each {...} object is
+    salvaged on its own with coerce_json, so one bad item does not sink the batch.
+    """
+    s = llm.strip_code_fences(payload)
+    try:
+        objs = json.loads(s)
+        if isinstance(objs, dict): objs = next((v for v in objs.values() if isinstance(v, list)), [objs])
+    except Exception:
+        objs = [llm.coerce_json(m.group(0)) for m in re.finditer(r"\{[^{}]*\}", s, flags=re.S)]
+    wanted = set(map(str, ids))
+    return {str(o["id"]): o for o in objs if isinstance(o, dict) and str(o.get("id")) in wanted}
+
+class Throughput:
+    """Counts and model traffic since reset(), over the wall time spent inside timed() blocks only."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.articles = self.expansions = self.batched = 0
+        self.seconds = 0.0
+        self._llm = (llm.STATS.calls, llm.STATS.retries, llm.STATS.prompt_tokens, llm.STATS.output_tokens)
+
+    @contextmanager
+    def timed(self):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds += time.perf_counter() - t0
+
+    def add(self, **counts):
+        with self._lock:
+            for k, v in counts.items(): setattr(self, k, getattr(self, k) + v)
+
+    def report(self) -> str:
+        minutes = max(1e-9, self.seconds / 60)
+        s = llm.STATS
+        calls, retries, tin, tout = (now - then for now, then in
+                                     zip((s.calls, s.retries, s.prompt_tokens, s.output_tokens), self._llm))
+        return (f"{self.articles} articles in {minutes * 60:.1f}s: {self.articles / minutes:.1f} articles/min, "
+                f"{(tin + tout) / minutes:,.0f} tokens/min ({tin:,} in / {tout:,} out), "
+                f"{calls} calls, {self.batched} articles batched, {self.expansions} expansions, "
+                f"{retries} rate-limit retries\n{s.report()}")
+
+class SummaryEngine:
+    def __init__(self, workers: int = WORKERS):
+        self.workers = max(1, workers)
+        self.stats = Throughput()
+
+    def call(self, prompt: str, max_tokens: int, temperature: float = 0.2, system: str = "") -> str:
+        return llm.complete(prompt, max_tokens, temperature, system=system)
+
+    def run(self, jobs: list, first, expand, needs_more, max_expansions: int, on_done=None) -> list:
+        """Return first(job), expanded via expand(job, data) while needs_more(data), for each job in order.
+
+        on_done(index, data) is called on the calling thread as each job finishes, in completion order.
+        """
+        results = [None] * len(jobs)
+        tries = [0] * len(jobs)
+        with self.stats.timed(), ThreadPoolExecutor(max_workers=self.workers) as pool:
+            pending = {pool.submit(first, job): i for i, job in enumerate(jobs)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    i = pending.pop(fut)
+                    data = fut.result()
+                    if needs_more(data) and tries[i] < max_expansions:
+                        tries[i] += 1
+                        self.stats.add(expansions=1)
+                        pending[pool.submit(expand, jobs[i], data)] = i
+                    else:
+                        results[i] = data
+                        self.stats.add(articles=1)
+                        if on_done: on_done(i, data)
+        return results
+
+@lru_cache(maxsize=1)
+def get_engine() -> SummaryEngine:
+    return SummaryEngine()
+
+# --- Helpers ---
+def cache_key(title: str, url: str, text: str):
+    """(key, simhash) of what the model actually sees; see app/summarizer/summary_cache.py."""
+    return content_key(title, url, text[:MAX_CHARS])
+
+def est_tokens(text: str) -> int:
+    return count_tokens(text)
+
+_text_index = None
+
+def load_full_text_if_missing(title: str, url: str, text: str) -> str:
+    """O(1) lookup in the candidate store; falls back to indexing candidates.jsonl once."""
+    global _text_index
+    if text: return text
+    if _text_index is None:
+        if STORE_FILE.exists():
+            _text_index = CandidateStore()
+        else:
+            _text_index = {}
+            if CANDIDATES.exists():
+                for line in CANDIDATES.read_text(encoding="utf-8").splitlines():
+                    if not line.strip(): continue
+                    obj = json.loads(line)
+                    _text_index.setdefault(obj.get("url"), obj)
+    obj = _text_index.get(url)
+    return (obj or {}).get("text", "")
+
+def pack(kind: str, text: str, budget: int) -> str:
+    packed = compress(text[:MAX_CHARS], budget)
+    PACK_STATS.record(kind, count_tokens(text[:MAX_CHARS]), count_tokens(packed))
+    return packed
+
+def is_short(data: dict) -> bool:
+    return est_tokens(data.get("summary_p1","") + " " + data.get("summary_p2","")) < SUMMARY_TARGET_TOKENS
+
+class Summarizer:
+    """Two-paragraph article summaries; only the prompt, guidelines and fallback differ per publication."""
+
+    def __init__(self, sys_prompt: str, guidelines: str, fallback_p2: str):
+        self.sys_prompt, self.guidelines, self.fallback_p2 = sys_prompt, guidelines, fallback_p2
+        self.prompt_version = hashlib.sha1(
+            f"{sys_prompt}{self.user_prompt('', '', '', 0)}{INPUT_TOKENS}".encode("utf-8")).hexdigest()[:12]
+
+    def load_cache(self) -> SummaryCache:
+        """Entries are scoped to the model, prompt text and target length; anything else is a miss."""
+        return SummaryCache(llm.get_backend().model, self.prompt_version, SUMMARY_TARGET_TOKENS)
+
+    def user_prompt(self, title: str, url: str, text: str, min_tokens: int) -> str:
+        return f"""
+Title: {title}
+URL: {url}
+
+Article (truncated to provide context):
+{text[:MAX_CHARS]}
+
+Write TWO paragraphs in JSON (keys: summary_p1, summary_p2) with a COMBINED length ≥ {min_tokens} tokens.
+{self.guidelines}
+Return ONLY JSON.
+""".strip()
+
+    def call_single(self, title: str, url: str, text: str, min_tokens: int) -> dict:
+        try:
+            prompt = self.user_prompt(title, url, pack("summary", text, INPUT_TOKENS), min_tokens)
+            data = llm.coerce_json(get_engine().call(prompt, MAX_TOKENS, temperature=0.2, system=self.sys_prompt))
+            if not isinstance(data, dict):
+                data = {}
+            p1 = (data.get("summary_p1") or "").strip()
+            p2 = (data.get("summary_p2") or "").strip()
+            return {"summary_p1": p1, "summary_p2": p2}
+        except Exception as e:
+            print(f"LLM error: {str(e)[:100]}...")
+            return {"summary_p1": "", "summary_p2": ""}
+
+    def ensure_length(self, data: dict, title: str, url: str, text: str, min_tokens: int) -> dict:
+        comb = (data.get("summary_p1","") + " " + data.get("summary_p2","")).strip()
+        if est_tokens(comb) >= min_tokens:
+            return data
+        # Ask the model to EXPAND, preserving JSON shape
+        short_tokens = est_tokens(comb)
+        try:
+            # the previous output carries most of the article already; only a few source sentences are re-sent
+            expand_prompt = f"""Expand the previous summaries while keeping the same JSON keys and style.
+Target combined length ≥ {min_tokens} tokens (currently ~{short_tokens}).
+Add concrete method details, dataset names/sizes, metrics, latency/cost/security notes, and deployment caveats if present.
+Return ONLY JSON with keys summary_p1 and summary_p2.
+
+Previous summaries:
+{json.dumps(data, ensure_ascii=False)}
+
+Context:
+Title: {title}
+URL: {url}
+Key source sentences:
+{pack("expansion", text, EXPAND_CONTEXT_TOKENS)}
+"""
+            data2 = llm.coerce_json(get_engine().call(expand_prompt, MAX_TOKENS, temperature=0.25, system=self.sys_prompt))
+            # fallback merge if needed
+            p1 = (data2.get("summary_p1") or data.get("summary_p1","")).strip()
+            p2 = (data2.get("summary_p2") or data.get("summary_p2","")).strip()
+            return {"summary_p1": p1, "summary_p2": p2}
+        except Exception as e:
+            print(f"LLM expansion error: {str(e)[:100]}...")
+            return data
+
+    def batch_prompt(self, batch: list, min_tokens: int) -> str:
+        """batch is [(id, title, url, packed_text)]."""
+        blocks = "\n\n".join(f"### id={i}\nTitle: {title}\nURL: {url}\nArticle:\n{text}" for i, title, url, text in batch)
+        return f"""
+Summarize each of the {len(batch)} articles below independently.
+
+{blocks}
+
+For EACH article write TWO paragraphs with a COMBINED length ≥ {min_tokens} tokens.
+{self.guidelines}
+Return ONLY a JSON array with one object per article, in any order:
+[{{"id": "<id>", "summary_p1": "...", "summary_p2": "..."}}]
+""".strip()
+
+    def call_batch(self, batch: list) -> dict:
+        """id -> {summary_p1, summary_p2} for the items the model answered; missing ids fall back to single calls."""
+        budget = min(BATCH_MAX_OUTPUT, len(batch) * MAX_TOKENS)
+        try:
+            payload = get_engine().call(self.batch_prompt(batch, SUMMARY_TARGET_TOKENS), budget, temperature=0.2,
+                                        system=self.sys_prompt)
+        except Exception as e:
+            print(f"LLM batch error: {str(e)[:100]}...")
+            return {}
+        out = {}
+        for i, obj in parse_batch(payload, [b[0] for b in batch]).items():
+            p1, p2 = (obj.get("summary_p1") or "").strip(), (obj.get("summary_p2") or "").strip()
+            if p1 and p2: out[i] = {"summary_p1": p1, "summary_p2": p2}
+        return out
+
+    def summarize_batches(self, jobs: list) -> dict:
+        """Summarize short articles several per request; returns job -> data for those that came back."""
+        if BATCH_SIZE <= 1: return {}
+        short = []
+        for job in jobs:
+            packed = compress(job[2][:MAX_CHARS], INPUT_TOKENS)
+            if count_tokens(packed) <= BATCH_ARTICLE_TOKENS:
+                short.append((job, packed))
+        per_item_output = SUMMARY_TARGET_TOKENS * 3 // 2
+        batches = [b for b in plan_batches(short, lambda s: count_tokens(s[1]) + 30,
+                                           min(BATCH_SIZE, max(1, BATCH_MAX_OUTPUT // per_item_output)),
+                                           BATCH_INPUT_TOKENS) if len(b) > 1]
+        if not batches: return {}
+        requests = [[(f"a{n}", job[0], job[1], packed) for n, (job, packed) in enumerate(b, 1)] for b in batches]
+        with ThreadPoolExecutor(max_workers=get_engine().workers) as pool:
+            answers = list(pool.map(self.call_batch, requests))
+        done = {}
+        for b, answer in zip(batches, answers):
+            for n, (job, packed) in enumerate(b, 1):
+                if f"a{n}" in answer:  # unanswered ones are packed and recorded again by call_single
+                    done[job] = answer[f"a{n}"]
+                    PACK_STATS.record("summary", count_tokens(job[2][:MAX_CHARS]), count_tokens(packed))
+        get_engine().stats.add(batched=len(done))
+        print(f"Batched {sum(map(len, batches))} short articles into {len(batches)} requests; {len(done)} answered")
+        return done
+
+    def finalize(self, data: dict, title: str) -> dict:
+        # final guardrail
+        if not data.get("summary_p1") or not data.get("summary_p2"):
+            data = {
+                "summary_p1": f"What's new: {title}. Details not available (source text limited).",
+                "summary_p2": self.fallback_p2,
+            }
+        return data
+
+    def summarize_all(self, articles: list, cache: SummaryCache) -> list:
+        """Fill summary_p1/summary_p2 on each article in place; returns the same list.
+
+        Articles are keyed on content, so syndicated copies and near-duplicates (in the cache or
+        earlier in this run) share one summary. Misses are summarized concurrently by the engine and
+        each result is written to the cache as soon as it finishes, so an interrupted run resumes
+        where it stopped.
+        """
+        done, jobs, sims, twins, keys = {}, {}, {}, {}, []
+        for art in articles:
+            title, url = art.get("title",""), art.get("url","")
+            text = load_full_text_if_missing(title, url, art.get("text",""))
+            key, sh = cache_key(title, url, text)
+            keys.append(key)
+            if key in done or key in jobs or key in twins: continue
+            twin = next((k for k, other in sims.items()
+                         if sh is not None and other is not None and hamming(sh, other) <= NEAR_BITS), None)
+            if (hit := cache.get(key)) is not None:
+                print(f"Cache hit: {title[:60]}")
+                done[key] = hit
+            elif twin is not None:
+                twins[key] = (twin, sh)
+            elif (near := cache.near(sh)) is not None:
+                print(f"Near-duplicate cache hit: {title[:60]}")
+                done[key] = near[1]
+                cache.put(key, near[1], sh)
+            else:
+                jobs[key], sims[key] = (title, url, text), sh
+
+        if jobs:
+            print(f"Summarizing {len(jobs)} articles with {get_engine().workers} workers…")
+            job_keys = list(jobs)
+            get_engine().stats.reset()  # report this run only, not cache lookups or earlier runs
+            with get_engine().stats.timed():
+                batched = self.summarize_batches(list(jobs.values()))
+
+            def store(i, data):
+                key = job_keys[i]
+                done[key] = self.finalize(data, jobs[key][0])
+                cache.put(key, done[key], sims[key])
+
+            get_engine().run(
+                list(jobs.values()),
+                first=lambda job: batched.get(job) or self.call_single(*job, SUMMARY_TARGET_TOKENS),
+                expand=lambda job, data: self.ensure_length(data, *job, SUMMARY_TARGET_TOKENS),
+                needs_more=is_short,
+                max_expansions=RETRIES,
+                on_done=store,
+            )
+            print(get_engine().stats.report())
+            print(PACK_STATS.report())
+
+        for key, (twin, sh) in twins.items():
+            done[key] = done[twin]
+            cache.put(key, done[key], sh)
+        if twins: print(f"Reused {len(twins)} summaries for near-duplicate articles in this run")
+
+        for art, key in zip(articles, keys):
+            summary = done[key]
+            art["summary_p1"] = summary["summary_p1"]
+            art["summary_p2"] = summary["summary_p2"]
+        return articles
+
+    def main(self, src: Path, dst: Path = None, missing: str = None):
+        dst = dst or src  # summaries are written back into the input file by default
+        if not src.exists():
+            print(missing or f"No {src} found.")
+            return
+
+        articles = json.loads(src.read_text(encoding="utf-8"))
+        cache = self.load_cache()
+        print(f"Processing {len(articles)} articles with {llm.get_backend().name} {llm.get_backend().model}…")
+        self.summarize_all(articles, cache)
+
+        dst.write_text(json.dumps(articles, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(cache.summary())
+        cache.close()
+        print(f"✅ Summarized {len(articles)} articles (target ≥ {SUMMARY_TARGET_TOKENS} tokens each)")
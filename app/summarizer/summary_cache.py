@@ -0,0 +1,184 @@
+"""Crash-safe summary cache shared by gemini_summary.py and groq_summary.py.
+
+Each summary is committed to SQLite (WAL mode) the moment it is produced, so an
+interrupted run keeps everything it paid for and a rerun resumes with the articles
+that are still missing. Rows are keyed on (key, model, prompt_version, target_tokens):
+changing the model, the prompt text or the target length simply stops matching old
+rows, which then age out through size-based LRU eviction.
+
+Keys are content-addressed: a hash of the normalised article text when there is
+enough of it, otherwise of the canonical URL (app/candidate_store.py) and title. So
+the same article under abs/pdf links or tracking parameters is summarised once, and
+an article that changes under the same URL gets a fresh summary. Each row also
+stores a 64-bit SimHash of the text; a miss whose SimHash is within NEAR_BITS of a
+cached row reuses that row (syndicated copies, trivial edits).
+
+It behaves like the dict the summarizers used before (`in`, `[]`, `[]=`).
+"""
+import os, re, sys, json, time, sqlite3, hashlib, threading
+from pathlib import Path
+import numpy as np
+
+if __package__ in (None, ""):  # allow `python app/summarizer/...` from the repo root
+    sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from app.candidate_store import canonical_url
+
+CACHE_FILE = Path(os.getenv("SUMMARY_CACHE_FILE", "data/summary_cache.sqlite"))
+MAX_MB = float(os.getenv("SUMMARY_CACHE_MAX_MB", "64"))
+NEAR_BITS = int(os.getenv("SUMMARY_NEAR_DUP_BITS", "3"))    # SimHash Hamming distance treated as the same article (-1 = off)
+MIN_TEXT = 200                                               # shorter texts are keyed on URL + title instead
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS summaries (
+    key            TEXT NOT NULL,
+    model          TEXT NOT NULL,
+    prompt_version TEXT NOT NULL,
+    target_tokens  INTEGER NOT NULL,
+    simhash        INTEGER,
+    sh0            INTEGER, sh1 INTEGER, sh2 INTEGER, sh3 INTEGER,
+    data           TEXT NOT NULL,
+    bytes          INTEGER NOT NULL,
+    created_at     REAL NOT NULL,
+    used_at        REAL NOT NULL,
+    PRIMARY KEY (key, model, prompt_version, target_tokens)
+);
+CREATE INDEX IF NOT EXISTS summaries_used ON summaries (used_at);
+"""
+NEAR_INDEXES = "".join(f"CREATE INDEX IF NOT EXISTS summaries_sh{i} ON summaries (sh{i});" for i in range(4))
+
+def normalize_text(text: str) -> str:
+    return " ".join(re.findall(r"\w+", (text or "").lower()))
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over word 3-shingles of already-normalised text."""
+    words = text.split()
+    grams = {" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))}
+    h = np.array([int.from_bytes(hashlib.blake2b(g.encode("utf-8"), digest_size=8).digest(), "big") for g in grams],
+                 dtype=np.uint64)
+    bits = np.unpackbits(h.byteswap().view(np.uint8).reshape(-1, 8), axis=1)  # (n, 64), msb first
+    return int("".join("1" if v > 0 else "0" for v in bits.sum(axis=0, dtype=np.int64) * 2 - len(h)), 2)
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def _blocks(sh: int):
+    return [(sh >> (48 - 16 * i)) & 0xFFFF for i in range(4)]  # distance ≤ 3 ⇒ at least one block equal
+
+def _signed(sh: int) -> int:
+    return sh - (1 << 64) if sh >= 1 << 63 else sh  # SQLite INTEGER is signed 64-bit
+
+def content_key(title: str, url: str, text: str):
+    """Return (key, simhash or None) for an article, as described in the module docstring."""
+    norm = normalize_text(text)
+    if len(norm) >= MIN_TEXT:
+        return "t:" + hashlib.sha1(norm.encode("utf-8")).hexdigest(), simhash(norm)
+    return "u:" + hashlib.sha1(f"{canonical_url(url)}|{title.strip().lower()}".encode("utf-8")).hexdigest(), None
+
+class SummaryCache:
+    def __init__(self, model: str, prompt_version: str, target_tokens: int,
+                 path: Path = CACHE_FILE, max_mb: float = MAX_MB):
+        self.scope = (model, prompt_version, int(target_tokens))
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = self.near_hits = self.misses = self.writes = self.evicted = 0
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False, timeout=30)  # waits out other writers
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+        cols = {r[1] for r in self._db.execute("PRAGMA table_info(summaries)")}
+        for col in ("simhash", "sh0", "sh1", "sh2", "sh3"):  # caches written before content keys
+            if col not in cols: self._db.execute(f"ALTER TABLE summaries ADD COLUMN {col} INTEGER")
+        self._db.executescript(NEAR_INDEXES)
+        self._bytes = self._total()  # kept up to date by put/_evict so writes don't re-sum the table
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM summaries WHERE key=? AND model=? AND prompt_version=? AND target_tokens=?",
+                (key, *self.scope),
+            ).fetchone()
+            if row:
+                with self._db:
+                    self._db.execute(
+                        "UPDATE summaries SET used_at=? WHERE key=? AND model=? AND prompt_version=? AND target_tokens=?",
+                        (time.time(), key, *self.scope),
+                    )
+            if row: self.hits += 1
+            else: self.misses += 1
+        return json.loads(row[0]) if row else None
+
+    def near(self, sh, max_bits: int = NEAR_BITS):
+        """(key, data) of the closest cached row within max_bits of SimHash sh, or None."""
+        if sh is None or max_bits < 0: return None
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, simhash, data FROM summaries WHERE model=? AND prompt_version=? AND target_tokens=? "
+                "AND (sh0=? OR sh1=? OR sh2=? OR sh3=?)",
+                (*self.scope, *_blocks(sh)),
+            ).fetchall()
+        best = min(((hamming(sh, other & (1 << 64) - 1), key, data) for key, other, data in rows if other is not None),
+                   default=None)
+        if best is None or best[0] > max_bits: return None
+        with self._lock:
+            self.near_hits += 1
+        return best[1], json.loads(best[2])
+
+    def put(self, key: str, data: dict, sh=None):
+        blob = json.dumps(data, ensure_ascii=False)
+        size, now = len(blob.encode("utf-8")), time.time()
+        near = [None] * 5 if sh is None else [_signed(sh), *_blocks(sh)]
+        with self._lock, self._db:
+            old = self._db.execute(
+                "SELECT bytes FROM summaries WHERE key=? AND model=? AND prompt_version=? AND target_tokens=?",
+                (key, *self.scope),
+            ).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO summaries (key, model, prompt_version, target_tokens, simhash, sh0, sh1, sh2, sh3, "
+                "data, bytes, created_at, used_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, *self.scope, *near, blob, size, now, now),
+            )
+            self.writes += 1
+            self._bytes += size - (old[0] if old else 0)
+            self._evict()
+
+    def _total(self) -> int:
+        return self._db.execute("SELECT COALESCE(SUM(bytes), 0) FROM summaries").fetchone()[0]
+
+    def _evict(self):
+        if self._bytes <= self.max_bytes: return
+        total = self._bytes = self._total()  # other processes may share the file: re-sum only when over the limit
+        if total <= self.max_bytes: return
+        freed, doomed = 0, []
+        for rowid, size in self._db.execute("SELECT rowid, bytes FROM summaries ORDER BY used_at"):
+            if total - freed <= self.max_bytes * 0.9: break  # evict down to 90% so we don't thrash at the limit
+            doomed.append((rowid,)); freed += size
+        self._db.executemany("DELETE FROM summaries WHERE rowid=?", doomed)
+        self.evicted += len(doomed)
+        self._bytes = total - freed
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM summaries WHERE key=? AND model=? AND prompt_version=? AND target_tokens=?",
+                (key, *self.scope),
+            ).fetchone() is not None
+
+    def __getitem__(self, key):
+        data = self.get(key)
+        if data is None: raise KeyError(key)
+        return data
+
+    def __setitem__(self, key, data):
+        self.put(key, data)
+
+    def summary(self) -> str:
+        with self._lock:
+            n, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM summaries").fetchone()
+        return (f"Summary cache: {self.hits} hits, {self.near_hits} near-duplicate hits, {self.writes} written, {self.evicted} evicted; "
+                f"{n} entries, {size / 1024:.0f}KiB ({self.scope[0]}, prompt {self.scope[1]})")
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
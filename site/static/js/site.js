@@ -0,0 +1,240 @@
+(function(){
+  const root=document.documentElement;
+  const btn=document.getElementById('theme');
+  const saved=localStorage.getItem('theme');
+  if(saved) root.setAttribute('data-theme', saved);
+  if(btn){
+    btn.setAttribute('aria-pressed', (root.getAttribute('data-theme') || 'light') === 'dark');
+    btn.addEventListener('click', function(){
+      const next=(root.getAttribute('data-theme') || 'light') === 'dark' ? 'light' : 'dark';
+      root.setAttribute('data-theme', next);
+      btn.setAttribute('aria-pressed', next === 'dark');
+      localStorage.setItem('theme', next);
+    });
+  }
+})();
+
+(function(){
+  const body=document.body;
+  const btn=document.getElementById('skim');
+  if(!btn) return;
+  const saved=localStorage.getItem('skim') === '1';
+  if(saved) body.classList.add('skim');
+  btn.setAttribute('aria-pressed', saved);
+  btn.addEventListener('click', function(){
+    body.classList.toggle('skim');
+    const on=body.classList.contains('skim');
+    btn.setAttribute('aria-pressed', on);
+    localStorage.setItem('skim', on ? '1' : '0');
+  });
+})();
+
+(function(){
+  const q=document.getElementById('q');
+  const source=document.getElementById('source');
+  const section=document.getElementById('section');
+  const sort=document.getElementById('sort');
+  const reset=document.getElementById('reset');
+  const cards=[...document.querySelectorAll('.card')];
+  const blocks=[...document.querySelectorAll('.sec-block')];
+  const sourceNames=[...new Set(cards.map(c=>c.dataset.source).filter(Boolean))].sort();
+  const sectionNames=[...new Map(cards.map(c=>[c.dataset.section, c.dataset.sectionTitle])).entries()];
+
+  sourceNames.forEach(function(name){
+    const option=document.createElement('option');
+    option.value=name;
+    option.textContent=name;
+    source.appendChild(option);
+  });
+  sectionNames.forEach(function(pair){
+    const option=document.createElement('option');
+    option.value=pair[0];
+    option.textContent=pair[1] || pair[0];
+    section.appendChild(option);
+  });
+
+  // Search runs against the prebuilt index in search/ (app/search_index.py), fetched on first use.
+  const results=document.getElementById('results');
+  const root=document.body.dataset.root || '';
+  const onPage=new Set(cards.map(c=>c.dataset.doc).filter(Boolean));
+  const shards={};
+  let manifest=null, stop=null, seq=0;
+
+  // Porter step 1; keep in sync with stem() in app/search_index.py
+  function cons(w,i){
+    if('aeiou'.includes(w[i])) return false;
+    if(w[i] === 'y') return i === 0 || !cons(w,i-1);
+    return true;
+  }
+  function measure(w){
+    let n=0, prev=false;
+    for(let i=0;i<w.length;i++){ const v=!cons(w,i); if(prev && !v) n++; prev=v; }
+    return n;
+  }
+  function hasVowel(w){
+    for(let i=0;i<w.length;i++) if(!cons(w,i)) return true;
+    return false;
+  }
+  function stem(w){
+    if(w.length <= 3) return w;
+    if(w.endsWith('sses') || w.endsWith('ies')) w=w.slice(0,-2);
+    else if(w.endsWith('s') && !w.endsWith('ss')) w=w.slice(0,-1);
+    let fix=false;
+    if(w.endsWith('eed')){ if(measure(w.slice(0,-3)) > 0) w=w.slice(0,-1); }
+    else if(w.endsWith('ed') && hasVowel(w.slice(0,-2))){ w=w.slice(0,-2); fix=true; }
+    else if(w.endsWith('ing') && hasVowel(w.slice(0,-3))){ w=w.slice(0,-3); fix=true; }
+    if(fix){
+      const n=w.length;
+      if(/(at|bl|iz)$/.test(w)) w+='e';
+      else if(n > 1 && w[n-1] === w[n-2] && cons(w,n-1) && !'lsz'.includes(w[n-1])) w=w.slice(0,-1);
+      else if(measure(w) === 1 && n >= 3 && cons(w,n-3) && !cons(w,n-2) && cons(w,n-1) && !'wxy'.includes(w[n-1])) w+='e';
+    }
+    if(w.endsWith('y') && hasVowel(w.slice(0,-1))) w=w.slice(0,-1)+'i';
+    return w;
+  }
+
+  function fetchJSON(path, opts){
+    return fetch(root+'search/'+path, opts).then(function(r){
+      if(!r.ok) throw new Error(path+': '+r.status);
+      return r.json();
+    });
+  }
+  function loadManifest(){
+    manifest=manifest || fetchJSON('manifest.json', {cache:'no-cache'}).then(function(m){ stop=new Set(m.stop); return m; });
+    manifest.catch(function(){ manifest=null; });
+    return manifest;
+  }
+  function shard(m, id){
+    return shards[id] || (shards[id]=fetchJSON(m.shards[id].file).then(function(s){
+      s.t.forEach(function(entry){ let doc=0; entry[1]=entry[1].map(gap=>doc+=gap); });
+      s.terms=s.t.map(entry=>entry[0]);
+      return s;
+    }));
+  }
+  function prefixed(s, word){
+    const hits=new Set();
+    new Set([word, stem(word)]).forEach(function(p){
+      let lo=0, hi=s.terms.length;
+      while(lo < hi){ const mid=(lo+hi)>>1; if(s.terms[mid] < p) lo=mid+1; else hi=mid; }
+      for(let i=lo; i<s.terms.length && s.terms[i].startsWith(p); i++) s.t[i][1].forEach(d=>hits.add(d));
+    });
+    return hits;
+  }
+  // [id, title, url, source, date, page] of every indexed item matching all words, or null for an empty query
+  async function search(text, sec){
+    const m=await loadManifest();
+    const words=text.match(/[a-z0-9]+/g) || [];
+    const typing=!/\s$/.test(text);
+    const tokens=words.filter((w,i)=>(typing && i === words.length-1) || (w.length > 1 && !stop.has(w)));
+    if(!tokens.length) return null;
+    const ids=m.shards[sec] ? [sec] : Object.keys(m.shards);
+    const found=[];
+    (await Promise.all(ids.map(id=>shard(m, id)))).forEach(function(s){
+      let docs=null;
+      for(const t of tokens){
+        const hits=prefixed(s, t);
+        docs=docs ? new Set([...docs].filter(d=>hits.has(d))) : hits;
+        if(!docs.size) break;
+      }
+      docs.forEach(d=>found.push(s.d[d]));
+    });
+    return found;
+  }
+
+  function showResults(docs){
+    results.replaceChildren(...docs.slice(0, 30).map(function(d){
+      const li=document.createElement('li');
+      const link=document.createElement('a');
+      link.href=d[2] || root+d[5];
+      link.textContent=d[1];
+      const meta=document.createElement('span');
+      meta.textContent=[d[3], d[4]].filter(Boolean).join(' · ');
+      li.append(link, meta);
+      if(d[5]){
+        const issue=document.createElement('a');
+        issue.href=root+d[5];
+        issue.textContent='Issue '+d[5].split('/')[1];
+        li.append(issue);
+      }
+      return li;
+    }));
+    results.hidden=!docs.length;
+  }
+
+  async function apply(){
+    const raw=(q.value || '').toLowerCase();
+    const needle=raw.trim();
+    const src=source.value;
+    const sec=section.value;
+    const mode=sort.value;
+    const run=++seq;
+    let match=()=>true, elsewhere=[];
+    if(needle){
+      try{
+        const found=await search(raw, sec);
+        if(found){
+          const ids=new Set(found.map(d=>d[0]));
+          match=card=>ids.has(card.dataset.doc);
+          elsewhere=found.filter(d=>!onPage.has(d[0]) && (!src || d[3] === src));
+        }
+      }catch(err){  // no index (e.g. opened from disk): fall back to the card text
+        match=card=>card.textContent.toLowerCase().includes(needle);
+      }
+      if(run !== seq) return;  // a newer keystroke already re-filtered
+    }
+    showResults(elsewhere);
+    cards.forEach(function(card){
+      const visible=match(card) &&
+        (!src || card.dataset.source === src) &&
+        (!sec || card.dataset.section === sec);
+      card.hidden=!visible;
+    });
+    blocks.forEach(function(block){
+      const list=block.querySelector('.list');
+      const visible=[...list.querySelectorAll('.card')].filter(c=>!c.hidden);
+      visible.sort(function(a,b){
+        if(mode === 'score') return parseFloat(b.dataset.score || 0) - parseFloat(a.dataset.score || 0);
+        if(mode === 'date') return (b.dataset.date || '').localeCompare(a.dataset.date || '');
+        return parseInt(a.dataset.rank || '999', 10) - parseInt(b.dataset.rank || '999', 10);
+      });
+      visible.forEach(el=>list.appendChild(el));
+      block.hidden=visible.length === 0;
+    });
+  }
+
+  q.addEventListener('focus', function(){ loadManifest().catch(()=>{}); }, {once:true});
+  [q, source, section, sort].forEach(el=>el.addEventListener('input', apply));
+  reset.addEventListener('click', function(){
+    q.value='';
+    source.value='';
+    section.value='';
+    sort.value='rank';
+    apply();
+  });
+  apply();
+})();
+
+(function(){
+  const btn=document.getElementById('searchBtn');
+  const q=document.getElementById('q');
+  if(btn && q){
+    btn.addEventListener('click', function(){
+      q.scrollIntoView({behavior:'smooth', block:'center'});
+      setTimeout(function(){ q.focus(); }, 350);
+    });
+  }
+})();
+
+(function(){
+  const links=[...document.querySelectorAll('.cats a')];
+  const headings=[...document.querySelectorAll('.section-title')];
+  if(!links.length || !headings.length) return;
+  const observer=new IntersectionObserver(function(entries){
+    entries.forEach(function(entry){
+      if(entry.isIntersecting){
+        links.forEach(link=>link.classList.toggle('active', link.dataset.sec === entry.target.id));
+      }
+    });
+  }, {rootMargin:'-42% 0px -50% 0px'});
+  headings.forEach(h=>observer.observe(h));
+})();
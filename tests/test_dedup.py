@@ -0,0 +1,44 @@
+"""Batch dedup and the incremental Deduper used by app/streaming.py."""
+from app.scorer.dedup import Deduper, dedup
+
+def item(n, title, text=""):
+    return {"title": title, "url": f"https://example.com/{n}", "text": text}
+
+def test_deduper_replace_rekeys_the_kept_item():
+    d = Deduper()
+    old = item(1, "Kafka consumer lag alerts", "old text")
+    assert d.add(old)
+    new = {**old, "title": "Streaming backpressure in Flink jobs", "text": "new text"}
+    assert d.replace(old, new)
+    assert d.kept == [new] and d.titles == [new["title"]]
+    assert not d.add(item(2, "Streaming backpressure in Flink jobs"))  # matches the new title now
+    assert d.add(item(3, "Kafka consumer lag alerts"))                 # and no longer the old one
+    assert not d.replace(item(4, "never added"), new)
+
+def test_deduper_matches_batch_dedup():
+    items = [item(1, "Kafka consumer lag alerts"), item(2, "Alerts for Kafka consumer lag"),
+             item(3, "Streaming backpressure in Flink jobs")]
+    d = Deduper()
+    assert [it for it in items if d.add(it)] == dedup(items)[0]
+
+BODY = "The team moved the ingestion jobs from cron to an event-driven scheduler and cut lag by half. " * 4
+
+def test_same_generic_title_different_content_is_kept(monkeypatch):
+    items = [item(1, "Weekly update", "Kafka 3.9 ships tiered storage and faster consumer rebalancing."),
+             item(2, "Weekly update", "Our anomaly detector now flags late partitions in the warehouse."),
+             item(3, "Weekly update", "")]  # no text to compare: the title decides
+    assert dedup(items)[0] == items[:2]
+    import app.scorer.dedup as d
+    monkeypatch.setattr(d, "EXACT_MAX", 0)  # the LSH path agrees
+    assert dedup(items)[0] == items[:2]
+    inc = Deduper()
+    assert [it for it in items if inc.add(it)] == items[:2]
+
+def test_same_title_same_content_is_merged(monkeypatch):
+    items = [item(1, "Event-driven ingestion at scale", BODY),
+             item(2, "Event driven ingestion at scale", BODY + " Syndicated from the company blog.")]
+    kept, clusters = dedup(items)
+    assert kept == items[:1] and clusters[0]["merged"][0]["url"] == items[1]["url"]
+    import app.scorer.dedup as d
+    monkeypatch.setattr(d, "EXACT_MAX", 0)
+    assert dedup(items)[0] == items[:1]
@@ -0,0 +1,146 @@
+"""llm.complete retries and the summarization engine, on the local backend (no network, no API key)."""
+import re, json, time, random
+
+import pytest
+
+from app import llm
+from app.ratelimit import AdaptiveBackoff, RateLimiter
+from app.summarizer import engine
+from app.summarizer.engine import SummaryEngine, Summarizer
+from app.summarizer.summary_cache import SummaryCache
+from app.prompt_pack import PackStats
+
+class Flaky(llm.Backend):
+    """Answers 429 for the first `limited` calls, then echoes the prompt."""
+    name = model = "flaky"
+
+    def __init__(self, limited, error=None):
+        self.limited, self.calls = limited, 0
+        self.error = error or llm.RateLimitError("429 Resource has been exhausted")
+
+    def _generate(self, prompt, max_tokens, temperature, system):
+        self.calls += 1
+        if self.calls <= self.limited: raise self.error
+        return f"ok: {prompt}"
+
+class Echo(llm.Backend):
+    """Summaries quote their article's title. Batches come back reversed and without their last article."""
+    name = model = "echo"
+
+    def __init__(self):
+        self.prompts, self.systems = [], set()
+
+    def _generate(self, prompt, max_tokens, temperature, system):
+        self.prompts.append(prompt); self.systems.add(system)
+        para = lambda title: " ".join([title] * 200)
+        blocks = re.findall(r"^### id=(\S+)\nTitle: (.*)$", prompt, flags=re.M)
+        if blocks:
+            return json.dumps([{"id": i, "summary_p1": para(t), "summary_p2": para(t)} for i, t in blocks[-2::-1]])
+        title = re.search(r"^Title: (.*)$", prompt, flags=re.M).group(1)
+        return json.dumps({"summary_p1": para(title), "summary_p2": para(title)})
+
+@pytest.fixture
+def backend(monkeypatch):
+    """Install a backend; no shared quota and a millisecond cool-down so retries are instant."""
+    monkeypatch.setattr(llm, "llm_limiter", lambda: RateLimiter(0, 0))
+    monkeypatch.setattr(llm, "BACKOFF", AdaptiveBackoff(base=0.001, cap=0.01))
+    monkeypatch.setattr(llm, "STATS", llm.CallStats())
+    def use(b):
+        monkeypatch.setattr(llm, "get_backend", lambda: b)
+        return b
+    return use
+
+def test_complete_retries_after_429(backend):
+    b = backend(Flaky(limited=2))
+    assert llm.complete("hello", 10, retries=3) == "ok: hello"
+    assert b.calls == 3
+    assert (llm.STATS.calls, llm.STATS.retries, llm.STATS.errors) == (3, 2, 0)
+    assert llm.BACKOFF.delay > 0  # penalized twice, relaxed once
+
+def test_complete_gives_up_after_retries(backend):
+    b = backend(Flaky(limited=10))
+    with pytest.raises(llm.RateLimitError):
+        llm.complete("hello", 10, retries=2)
+    assert b.calls == 3 and llm.STATS.errors == 1
+
+def test_complete_does_not_retry_other_errors(backend):
+    b = backend(Flaky(limited=10, error=ValueError("bad request")))
+    with pytest.raises(ValueError):
+        llm.complete("hello", 10, retries=5)
+    assert b.calls == 1 and llm.STATS.retries == 0
+
+def test_system_prompt_reaches_each_backend(backend):
+    b = backend(Flaky(limited=0))
+    seen = []
+    b._generate = lambda prompt, max_tokens, temperature, system: seen.append(system) or "ok"
+    llm.complete("hello", 10, system="be terse")
+    assert seen == ["be terse"]
+    openai = llm.OpenAIBackend.__new__(llm.OpenAIBackend)
+    openai.model = "m"
+    assert openai._body("hi", 10, 0.2, "be terse", False)["messages"] == [
+        {"role": "system", "content": "be terse"}, {"role": "user", "content": "hi"}]
+    assert openai._body("hi", 10, 0.2, "", False)["messages"] == [{"role": "user", "content": "hi"}]
+    local = llm.LocalBackend(latency=0)
+    assert local.generate("hi", 10, 0.2, system="be terse") == local.respond("be terse\n\nhi", 10)
+
+def test_local_backend_429s_are_retried(backend):
+    backend(llm.LocalBackend(latency=0.001, rate_429=0.5, seed=1))
+    prompt = "Write TWO paragraphs in JSON (keys: summary_p1, summary_p2) with a COMBINED length ≥ 40 tokens."
+    outs = [llm.coerce_json(llm.complete(prompt, 200, retries=20)) for _ in range(10)]
+    assert all(o["summary_p1"] and o["summary_p2"] for o in outs)
+    assert llm.STATS.retries > 0
+
+def test_engine_run_returns_results_in_input_order():
+    rng = random.Random(7)
+    delays = [rng.uniform(0, 0.02) for _ in range(20)]
+    done = []
+
+    def first(job):
+        time.sleep(delays[job])  # later jobs often finish first
+        return {"job": job, "calls": 1}
+
+    def expand(job, data):
+        return {"job": job, "calls": data["calls"] + 1}
+
+    results = SummaryEngine(workers=6).run(
+        list(range(20)), first, expand, needs_more=lambda d: d["job"] % 3 == 0 and d["calls"] < 3,
+        max_expansions=2, on_done=lambda i, d: done.append(i))
+    assert [r["job"] for r in results] == list(range(20))
+    assert [r["calls"] for r in results] == [3 if j % 3 == 0 else 1 for j in range(20)]
+    assert sorted(done) == list(range(20))
+
+def test_batched_summaries_land_on_their_own_articles(backend, tmp_path, monkeypatch):
+    b = backend(Echo())
+    monkeypatch.setattr(engine, "get_engine", lambda e=SummaryEngine(workers=4): e)
+    summarizer = Summarizer("system", "- guidelines", "fallback")
+    articles = [{"title": f"Article {n}", "url": f"https://example.com/{n}", "text": f"Pipeline notes number {n}."}
+                for n in range(9)]
+    cache = SummaryCache("echo", summarizer.prompt_version, engine.SUMMARY_TARGET_TOKENS, path=tmp_path / "c.sqlite")
+    summarizer.summarize_all(articles, cache)
+    cache.close()
+    assert b.systems == {"system"}
+    batches = [p for p in b.prompts if "### id=" in p]
+    assert batches and len(b.prompts) == 2 * len(batches)  # each batch's missing article is asked on its own
+    for art in articles:
+        assert art["summary_p1"] == art["summary_p2"] == " ".join([art["title"]] * 200)
+
+def test_packing_is_recorded_once_per_article(backend, tmp_path, monkeypatch):
+    backend(Echo())
+    monkeypatch.setattr(engine, "get_engine", lambda e=SummaryEngine(workers=4): e)
+    monkeypatch.setattr(engine, "PACK_STATS", stats := PackStats())
+    summarizer = Summarizer("system", "- guidelines", "fallback")
+    articles = [{"title": f"Article {n}", "url": f"https://example.com/{n}", "text": f"Pipeline notes number {n}."}
+                for n in range(9)]
+    cache = SummaryCache("echo", summarizer.prompt_version, engine.SUMMARY_TARGET_TOKENS, path=tmp_path / "c.sqlite")
+    summarizer.summarize_all(articles, cache)
+    cache.close()
+    assert stats.calls["summary"] == len(articles)  # batch misses are counted by their single call only
+
+def test_throughput_times_only_the_runs():
+    eng = SummaryEngine(workers=2)
+    time.sleep(0.2)  # setup before run() is not part of the window
+    for _ in range(2):
+        eng.stats.reset()
+        eng.run([0.05, 0.05], first=lambda d: time.sleep(d) or {}, expand=None, needs_more=lambda d: False,
+                max_expansions=0)
+        assert 0.04 < eng.stats.seconds < 0.15 and eng.stats.articles == 2
@@ -0,0 +1,82 @@
+"""TokenBucket / RateLimiter refill and the 429 helpers, on a fake clock."""
+import pytest
+
+from app import ratelimit
+from app.ratelimit import AdaptiveBackoff, RateLimiter, TokenBucket, is_rate_limited
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.slept = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(ratelimit.time, "monotonic", c.monotonic)
+    monkeypatch.setattr(ratelimit.time, "sleep", c.sleep)
+    return c
+
+def test_bucket_spends_burst_then_waits_for_refill(clock):
+    bucket = TokenBucket(rate=2.0, burst=2)
+    assert bucket.acquire() == 0 and bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(0.5)  # one token at 2/s
+    assert clock.slept == [pytest.approx(0.5)]
+
+def test_bucket_refill_is_capped_at_burst(clock):
+    bucket = TokenBucket(rate=1.0, burst=3)
+    for _ in range(3): bucket.acquire()
+    clock.now += 60  # idle for a minute: banks 3 tokens, not 60
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 0]
+    assert bucket.acquire() == pytest.approx(1.0)
+
+def test_zero_rate_is_unlimited(clock):
+    bucket = TokenBucket(rate=0, burst=1)
+    assert sum(bucket.acquire() for _ in range(100)) == 0 and not clock.slept
+
+def test_limiter_enforces_tokens_per_minute(clock):
+    limiter = RateLimiter(rpm=600, tpm=1200)  # 10 requests/s, 20 tokens/s, one minute of burst each
+    assert limiter.acquire(1200) == 0
+    assert limiter.acquire(100) == pytest.approx(5.0)  # request bucket is fine, token bucket owes 100
+    clock.now += 10
+    assert limiter.acquire(100) == pytest.approx(0.0)
+
+def test_limiter_enforces_requests_per_minute(clock):
+    limiter = RateLimiter(rpm=2, tpm=0)
+    assert limiter.acquire() == 0 and limiter.acquire() == 0
+    assert limiter.acquire() == pytest.approx(30.0)
+
+@pytest.mark.parametrize("exc, limited", [
+    (type("ResourceExhausted", (Exception,), {})("quota"), True),
+    (type("RateLimitError", (Exception,), {})("slow down"), True),
+    (Exception("HTTP 429 Too Many Requests"), True),
+    (Exception("Quota exceeded for metric"), True),
+    (type("HTTPError", (Exception,), {"code": 429})("x"), True),
+    (Exception("HTTP 500 Internal Server Error"), False),
+    (ValueError("bad json"), False),
+])
+def test_is_rate_limited(exc, limited):
+    assert is_rate_limited(exc) is limited
+
+def test_backoff_doubles_on_429_and_halves_on_success(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit.random, "random", lambda: 1.0)  # no jitter: pause == delay
+    backoff = AdaptiveBackoff(base=2.0, cap=10.0)
+    assert backoff.wait() == 0
+    delays = []
+    for _ in range(4):
+        backoff.penalize(); delays.append(backoff.delay)
+    assert delays == [2.0, 4.0, 8.0, 10.0]
+    assert backoff.wait() == pytest.approx(10.0)  # every caller sits out the cool-down
+    assert backoff.wait() == 0
+    backoff.relax(); backoff.relax()
+    assert backoff.delay == 2.5
+    backoff.relax(); backoff.relax(); backoff.relax()
+    assert backoff.delay == 0.3125
+    backoff.relax()  # below a quarter of the base: cool-down is over
+    assert backoff.delay == 0.0
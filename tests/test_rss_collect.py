@@ -0,0 +1,131 @@
+"""collect_async / AsyncFetcher against local http.server feeds: order, per-host cap, failing hosts."""
+import time, socket, asyncio, threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app.collector import rss_collect
+from app.collector.http_cache import HttpCache
+from app.candidate_store import CandidateStore
+
+ARTICLES = 6
+DELAY = 0.15  # seconds per article; the first article is the slowest so completion order is reversed
+
+class FeedServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), Handler)
+        self.base = f"http://127.0.0.1:{self.server_port}"
+        self.lock = threading.Lock()
+        self.in_flight = self.peak = 0
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, *args): pass
+
+    def do_GET(self):
+        srv = self.server
+        if self.path == "/feed.xml":
+            items = "".join(f"<item><title>Post {n}</title><link>{srv.base}/a/{n}</link>"
+                            f"<pubDate>{formatdate()}</pubDate></item>" for n in range(ARTICLES))
+            return self.reply(f'<?xml version="1.0"?><rss version="2.0"><channel><title>t</title>{items}'
+                              f"</channel></rss>".encode(), "application/rss+xml")
+        with srv.lock:
+            srv.in_flight += 1
+            srv.peak = max(srv.peak, srv.in_flight)
+        try:
+            n = int(self.path.rsplit("/", 1)[-1])
+            time.sleep(DELAY * (ARTICLES - n) / ARTICLES)
+            self.reply(f"<html><body><p>article {self.path}</p></body></html>".encode(), "text/html")
+        finally:
+            with srv.lock:
+                srv.in_flight -= 1
+
+    def reply(self, body, ctype):
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture
+def servers():
+    started = [FeedServer(), FeedServer()]
+    for srv in started:
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield started
+    for srv in started:
+        srv.shutdown(); srv.server_close()
+
+@pytest.fixture
+def dead_url():
+    """A local port with nothing listening: connections are refused straight away."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    return f"http://127.0.0.1:{port}/feed.xml"
+
+@pytest.fixture
+def cache(tmp_path):
+    c = HttpCache(tmp_path / "http_cache.sqlite")
+    yield c
+    c.close()
+
+def collect(sources, cache):
+    return asyncio.run(rss_collect.collect_async(sources, cache))
+
+def test_output_keeps_feed_and_article_order(servers, cache):
+    a, b = servers
+    sources = [{"name": "A", "url": f"{a.base}/feed.xml"}, {"name": "B", "url": f"{b.base}/feed.xml"}]
+    items, bodies = collect(sources, cache)
+    expected = [f"{srv.base}/a/{n}" for srv in (a, b) for n in range(ARTICLES)]
+    assert [it["url"] for it in items] == expected
+    assert [it["source"] for it in items] == ["A"] * ARTICLES + ["B"] * ARTICLES
+    for it, body in zip(items, bodies):
+        assert f"article /a/{it['url'].rsplit('/', 1)[-1]}" in body.decode()
+
+def test_per_host_cap(servers, cache, monkeypatch):
+    monkeypatch.setattr(rss_collect, "PER_HOST", 2)
+    a, _ = servers
+    items, bodies = collect([{"name": "A", "url": f"{a.base}/feed.xml"}], cache)
+    assert len(items) == ARTICLES and all(bodies)
+    assert a.peak == 2  # concurrent, but never above the cap
+
+def test_failing_host_does_not_abort_the_run(servers, dead_url, cache):
+    a, b = servers
+    sources = [{"name": "A", "url": f"{a.base}/feed.xml"}, {"name": "down", "url": dead_url},
+               {"name": "B", "url": f"{b.base}/feed.xml"}]
+    items, bodies = collect(sources, cache)
+    assert [it["source"] for it in items] == ["A"] * ARTICLES + ["B"] * ARTICLES
+    assert all(bodies)
+    assert cache.stats.counts["down"]["error"] == 1
+
+def test_failing_host_is_served_from_cache(servers, dead_url, cache):
+    a, _ = servers
+    feed = f"{a.base}/feed.xml"
+    cache.resolve(dead_url, "down", None, 200, {}, rss_collect.httpx.get(feed).content)  # an earlier good fetch
+    items, _ = collect([{"name": "down", "url": dead_url}], cache)
+    assert len(items) == ARTICLES
+    assert cache.stats.counts["down"]["stale"] == 1
+
+def extract_or_crash(html, **settings):
+    if b"/a/0<" in html: raise RuntimeError("worker crashed")
+    return html.decode()
+
+def test_stream_keeps_items_whose_extraction_failed(servers, tmp_path, monkeypatch):
+    a, _ = servers
+    (tmp_path / "sources.yaml").write_text(f"sources:\n  - name: A\n    url: {a.base}/feed.xml\n")
+    monkeypatch.setattr(rss_collect, "SOURCES", tmp_path / "sources.yaml")
+    monkeypatch.setattr(rss_collect, "STORE_RAW", False)
+    monkeypatch.setattr(rss_collect, "extract", extract_or_crash)
+    monkeypatch.setattr(rss_collect, "HttpCache", lambda: HttpCache(tmp_path / "http_cache.sqlite"))
+    monkeypatch.setattr(rss_collect, "CandidateStore", lambda: CandidateStore(tmp_path / "candidates.sqlite"))
+    emitted = []
+    rss_collect.stream(emitted.append, workers=2)
+    texts = {it["url"].rsplit("/", 1)[-1]: it["text"] for it in emitted}
+    assert sorted(texts) == [str(n) for n in range(ARTICLES)]
+    assert texts["0"] == "" and all("article /a/" in texts[str(n)] for n in range(1, ARTICLES))
+    store = CandidateStore(tmp_path / "candidates.sqlite")
+    assert len(list(store.iter_items())) == ARTICLES
+    store.close()
@@ -0,0 +1,24 @@
+"""SummaryCache counters under concurrent workers, and size-based eviction."""
+from concurrent.futures import ThreadPoolExecutor
+
+from app.summarizer.summary_cache import SummaryCache
+
+def summary(n, words=50):
+    return {"summary_p1": f"item {n} " + "word " * words, "summary_p2": "why it matters"}
+
+def test_counters_survive_concurrent_lookups(tmp_path):
+    cache = SummaryCache("m", "v", 100, path=tmp_path / "c.sqlite")
+    for n in range(0, 200, 2): cache.put(f"k{n}", summary(n))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(cache.get, [f"k{n}" for _ in range(5) for n in range(200)]))
+    assert (cache.hits, cache.misses) == (500, 500)
+    cache.close()
+
+def test_eviction_keeps_the_cache_under_its_limit(tmp_path):
+    cache = SummaryCache("m", "v", 100, path=tmp_path / "c.sqlite", max_mb=0.02)  # ~20KiB
+    for n in range(100): cache.put(f"k{n}", summary(n))
+    cache.put("k99", summary(99, words=10))  # replacing a row adjusts the running total instead of adding to it
+    assert cache.evicted > 0
+    assert cache._bytes == cache._total() <= cache.max_bytes
+    assert cache.get("k99") is not None and cache.get("k0") is None  # least recently used go first
+    cache.close()